@@ -0,0 +1,9 @@
+"""
+Benchmarks for purere, on generated corpora so that every run sees exactly the same input.
+
+Usage:
+    python -m benchmarks run -o results.json
+    python -m benchmarks compare old.json new.json
+
+See `python -m benchmarks --help` and the README for the options.
+"""
@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import sys
+
+from . import compare, run
+from .corpora import GENERATORS
+
+
+def run_args(args):
+    # the options of the run command, to pass on to the process of another revision
+    res = ["--repeat", str(args.repeat), "--size", str(args.size)]
+    for name in args.corpus or []:
+        res += ["--corpus", name]
+    if args.filter:
+        res += ["-k", args.filter]
+    return res
+
+
+def get_results(source, args):
+    # source is either a file written by run, or a git revision
+    if os.path.exists(source):
+        return run.load(source)
+    sys.stderr.write(f"running the benchmarks on revision {source}\n")
+    return run.run_revision(source, run_args(args))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks for purere.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument("--repeat", type=int, default=5, help="number of repetitions of every benchmark")
+    options.add_argument("--size", type=int, default=100000, help="number of characters in every corpus")
+    options.add_argument("--corpus", action="append", choices=sorted(GENERATORS), help="only use these corpora")
+    options.add_argument("-k", "--filter", help="only benchmark the patterns containing this string")
+
+    run_parser = commands.add_parser("run", parents=[options], help="time all benchmarks and save them as JSON")
+    run_parser.add_argument("-o", "--output", help="JSON file to write, defaults to stdout")
+    run_parser.add_argument("--module", choices=["purere", "re"], default="purere", help="the module to benchmark")
+    run_parser.add_argument("--revision", help="benchmark the purere of this git revision instead of the checkout")
+    run_parser.add_argument("-q", "--quiet", action="store_true", help="do not print the times while running")
+
+    compare_parser = commands.add_parser(
+        "compare", parents=[options], help="compare two runs, given as JSON files or git revisions"
+    )
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown that is reported")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        if args.revision:
+            data = run.run_revision(args.revision, run_args(args))
+        else:
+            log = None if args.quiet else sys.stderr
+            data = run.run(args.module, args.repeat, args.size, args.corpus, args.filter, log=log)
+        if args.output:
+            run.save(data, args.output)
+        else:
+            json.dump(data, sys.stdout, indent=1)
+        return 0
+
+    old = get_results(args.old, args)
+    new = get_results(args.new, args)
+    rows = compare.compare(old, new, threshold=args.threshold)
+    compare.report(old, new, rows, sys.stdout)
+    return 1 if any(status in ("regression", "changed") for _, _, status in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+The patterns that are benchmarked. Every case is a name and a function to time, which returns a small summary of its
+result (like the number of matches) that should be the same for every revision.
+"""
+
+import os
+import sys
+
+from .corpora import GENERATORS, corpus
+
+# Patterns that are common in the wild, these are searched for in every corpus
+regexes = r"""
+[\w\.+-]+@[\w\.-]+\.[\w\.-]+
+[\w]+://[^/\s?#]+[^\s?#]+(?:\?[^\s#]*)?(?:#[^\s]*)?
+(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9])\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9])
+""".strip().split(
+    "\n"
+)
+
+# Patterns that fit one kind of corpus
+corpus_regexes = {
+    "logs": [
+        r"^(\d{4}-\d\d-\d\d) (\d\d:\d\d:\d\d),\d+ (ERROR|WARNING)",
+        r"took (\d+)ms",
+        r"\[worker-(\d+)\].*?:",
+    ],
+    "html": [
+        r"<([a-z]+)([^>]*)>",
+        r"""href=["']([^"']+)["']""",
+        r"&(\w+);",
+    ],
+    "source": [
+        r"\b(?:def|class)\s+(\w+)",
+        r"""(?:[rbf]?)'[^'\\\n]*(?:\\.[^'\\\n]*)*'""",
+        r"\b0x[0-9a-f]+|\b\d+(?:\.\d+)?",
+        r"#[^\n]*",
+    ],
+    "unicode": [
+        r"\w+",
+        r"(?i)straße|москва|σας",
+        r"\d+",
+        r"[^\W\d_]+(?=[.!?。…])",
+    ],
+}
+
+
+def _re_benchmarks():
+    # the benchmarks from CPython's re test suite, as (pattern, string)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    from tests.re_tests import benchmarks
+
+    return benchmarks
+
+
+def _span(match):
+    return None if match is None else list(match.span())
+
+
+def cases(regex, size=100000, corpora=None, pattern_filter=None):
+    """
+    Yields (name, function) for every benchmark, where regex is the module to test (purere or re).
+    The functions compile their patterns up front, except for the compile benchmarks.
+    """
+    corpora = list(GENERATORS) if corpora is None else corpora
+    texts = {name: corpus(name, size) for name in corpora}
+    purge = regex.purge
+
+    def wanted(pattern):
+        return pattern_filter is None or pattern_filter in pattern
+
+    patterns = [p for p in regexes + [p for name in corpora for p in corpus_regexes[name]] if wanted(p)]
+    for pattern in patterns:
+
+        def compile(pattern=pattern):
+            purge()
+            return regex.compile(pattern).groups
+
+        yield f"compile {pattern}", compile
+
+    for name, text in texts.items():
+        for pattern in [p for p in regexes + corpus_regexes[name] if wanted(p)]:
+            compiled = regex.compile(pattern, regex.M)
+            yield f"search {name} {pattern}", lambda p=compiled, s=text: _span(p.search(s, len(s) // 2))
+            yield f"findall {name} {pattern}", lambda p=compiled, s=text: len(p.findall(s))
+            yield f"sub {name} {pattern}", lambda p=compiled, s=text: p.subn("<\\g<0>>", s)[1]
+            yield f"split {name} {pattern}", lambda p=compiled, s=text: len(p.split(s))
+
+    padding = " " * 10000
+    for pattern, string in _re_benchmarks():
+        if not wanted(pattern):
+            continue
+        compiled = regex.compile(pattern)
+        padded = padding + string + padding
+
+        def match(p=compiled, s=string, padded=padded, start=len(padding), end=len(padding) + len(string)):
+            return bool(p.match(s) and p.fullmatch(s) and p.match(padded, start) and p.fullmatch(padded, start, end))
+
+        yield f"match re_tests {pattern}", match
+        yield f"search re_tests {pattern}", lambda p=compiled, s=padded: _span(p.search(s))
@@ -0,0 +1,48 @@
+"""
+Compares two benchmark results, as written by run.py.
+"""
+
+
+def compare(old, new, threshold=0.1):
+    """
+    Returns a list of (name, ratio, status) for every benchmark in both results, sorted from slowest to fastest.
+    ratio is the median time of new over that of old. status is "regression" when new is more than threshold slower and
+    its fastest repetition is slower than the slowest of old, so that noise is not reported, "improvement" for the
+    opposite, "changed" when the results differ and "" otherwise.
+    """
+    rows = []
+    for name, before in old["results"].items():
+        after = new["results"].get(name)
+        if after is None:
+            continue
+        ratio = after["median"] / before["median"] if before["median"] else float("inf")
+        if before.get("result") != after.get("result"):
+            status = "changed"
+        elif ratio > 1 + threshold and after["min"] > max(before["times"]):
+            status = "regression"
+        elif ratio < 1 / (1 + threshold) and max(after["times"]) < before["min"]:
+            status = "improvement"
+        else:
+            status = ""
+        rows.append((name, ratio, status))
+    rows.sort(key=lambda row: -row[1])
+    return rows
+
+
+def describe(data):
+    meta = data["meta"]
+    return f"{meta['module']} {meta.get('revision') or meta.get('version')} ({meta['implementation']}, {meta['date']})"
+
+
+def report(old, new, rows, out):
+    out.write(f"old: {describe(old)}\nnew: {describe(new)}\n\n")
+    for name, ratio, status in rows:
+        old_ms = old["results"][name]["median"] * 1000
+        new_ms = new["results"][name]["median"] * 1000
+        out.write(f"{old_ms:10.3f} ms {new_ms:10.3f} ms {ratio:7.2f}x  {status:11s} {name}\n")
+    counts = {status: sum(row[2] == status for row in rows) for status in ["regression", "improvement", "changed"]}
+    missing = set(old["results"]) ^ set(new["results"])
+    out.write(
+        f"\n{counts['regression']} regressions, {counts['improvement']} improvements, "
+        f"{counts['changed']} changed results, {len(missing)} benchmarks in only one of the runs\n"
+    )
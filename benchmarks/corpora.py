@@ -0,0 +1,126 @@
+"""
+Generates the texts the benchmarks run on. The same name, size and seed always give the same text, so results of
+different runs and revisions can be compared without storing the corpora.
+"""
+
+import random
+
+LEVELS = ["DEBUG", "INFO", "INFO", "INFO", "WARNING", "ERROR"]
+WORDS = """
+the of and to in is that for it as was with be by on not he this are or his from at which but have an they you were
+her she there one all we their has been if more when will would who so no out up into do any time about my then can
+request server client worker session cache timeout retry connection handler payload response status queue
+""".split()
+NAMES = ["alice", "bob", "carol", "dave", "eve", "mallory", "trent", "peggy", "victor", "walter"]
+DOMAINS = ["example.com", "example.org", "mail.example.net", "test.co.uk", "a-b.example.io"]
+TAGS = ["div", "span", "p", "a", "li", "ul", "td", "tr", "table", "section", "article", "em", "strong"]
+KEYWORDS = ["def", "return", "if", "else", "elif", "for", "while", "in", "not", "and", "or", "import", "class"]
+# words in a few scripts, with combining characters, non-ASCII digits and characters outside the BMP
+UNICODE_WORDS = """
+naïve café façade Ærøskøbing Straße μῆνιν ἄειδε θεὰ Ελληνικά Россия москва Україна 東京 北京市 한국어 日本語の文章
+ﬁle ǅemal Ǆ ß ΣΑΣ ς ۱۲۳ ٤٥٦ ४२ १९४७ ௭ 𝟘𝟙𝟚 😀 🎉 👩‍💻 🇳🇱 ॐ नमस्ते مرحبا שלום
+""".split()
+
+
+def _word(rng):
+    return rng.choice(WORDS)
+
+
+def _email(rng):
+    return f"{rng.choice(NAMES)}{rng.choice(['', '.', '+', '_'])}{rng.choice(NAMES)}@{rng.choice(DOMAINS)}"
+
+
+def _ip(rng):
+    return ".".join(str(rng.randrange(256)) for _ in range(4))
+
+
+def _url(rng):
+    path = "/".join(_word(rng) for _ in range(rng.randrange(1, 4)))
+    query = f"?{_word(rng)}={rng.randrange(1000)}" if rng.random() < 0.5 else ""
+    fragment = f"#{_word(rng)}" if rng.random() < 0.2 else ""
+    return f"{rng.choice(['http', 'https', 'ftp'])}://{rng.choice(DOMAINS)}/{path}{query}{fragment}"
+
+
+def logs(rng):
+    # a line of an application log
+    date = f"2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}"
+    clock = f"{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d},{rng.randrange(1000):03d}"
+    message = " ".join(_word(rng) for _ in range(rng.randrange(3, 10)))
+    extra = rng.choice(
+        [
+            f"user {_email(rng)} from {_ip(rng)}",
+            f"GET {_url(rng)} {rng.choice([200, 200, 301, 404, 500])} took {rng.randrange(2000)}ms",
+            f"retrying in {rng.random() * 10:.2f}s (attempt {rng.randrange(1, 6)})",
+            f"version 1.{rng.randrange(20)}.{rng.randrange(100)} on 999.{rng.randrange(999)}.1.1",
+        ]
+    )
+    return f"{date} {clock} {rng.choice(LEVELS)} [worker-{rng.randrange(16)}] {message}: {extra}\n"
+
+
+def html(rng, depth=0):
+    # an element with attributes, text, links and nested elements
+    tag = rng.choice(TAGS)
+    attrs = ""
+    if rng.random() < 0.6:
+        attrs += f' class="{_word(rng)} {_word(rng)}-{rng.randrange(10)}"'
+    if tag == "a" or rng.random() < 0.1:
+        attrs += f' href="{_url(rng)}"'
+    if rng.random() < 0.2:
+        attrs += f" id='{_word(rng)}{rng.randrange(100)}'"
+    children = []
+    for _ in range(rng.randrange(1, 5)):
+        if depth < 3 and rng.random() < 0.4:
+            children.append(html(rng, depth + 1))
+        else:
+            text = " ".join(_word(rng) for _ in range(rng.randrange(2, 12)))
+            if rng.random() < 0.2:
+                text += f" &amp; mail {_email(rng)} &lt;{rng.randrange(100)}&gt;"
+            children.append(text)
+    indent = "  " * depth
+    inner = f"\n{indent}  ".join(children)
+    return f"{indent}<{tag}{attrs}>\n{indent}  {inner}\n{indent}</{tag}>\n"
+
+
+def source(rng):
+    # a python function with strings, numbers, comments and operators
+    name = f"{_word(rng)}_{_word(rng)}"
+    args = ", ".join(f"{_word(rng)}{i}" for i in range(rng.randrange(4)))
+    lines = [f"def {name}({args}):", f'    """{" ".join(_word(rng) for _ in range(6)).capitalize()}."""']
+    for _ in range(rng.randrange(2, 8)):
+        kind = rng.random()
+        var = f"{_word(rng)}_{rng.randrange(10)}"
+        if kind < 0.3:
+            lines.append(f"    {var} = {rng.randrange(10**6)} * {rng.random():.4f} + 0x{rng.randrange(4096):x}")
+        elif kind < 0.5:
+            lines.append(f"    {var} = {rng.choice(['f', 'r', 'b', ''])}'{' '.join(_word(rng) for _ in range(3))}'")
+        elif kind < 0.7:
+            lines.append(f"    {rng.choice(KEYWORDS[2:5])} {var} {rng.choice(['==', '!=', '<=', '>>'])} {rng.randrange(99)}:")
+            lines.append(f"        return {var}  # {' '.join(_word(rng) for _ in range(4))}")
+        else:
+            lines.append(f"    {var}.{_word(rng)}({_word(rng)}=[{rng.randrange(9)}, {rng.randrange(9)}])")
+    lines.append(f"    return {name}")
+    return "\n".join(lines) + "\n\n"
+
+
+def unicode(rng):
+    # a sentence mixing scripts, ASCII words and numbers
+    words = [rng.choice(UNICODE_WORDS) if rng.random() < 0.6 else _word(rng) for _ in range(rng.randrange(4, 14))]
+    if rng.random() < 0.3:
+        words.append(str(rng.randrange(10**4)))
+    return " ".join(words) + rng.choice([".", "!", "?", "。", "…"]) + "\n"
+
+
+GENERATORS = {"logs": logs, "html": html, "source": source, "unicode": unicode}
+
+
+def corpus(name, size=100000, seed=0):
+    """Returns the corpus called name of size characters, name is one of GENERATORS"""
+    rng = random.Random(f"{name}-{seed}")
+    generate = GENERATORS[name]
+    parts = []
+    length = 0
+    while length < size:
+        part = generate(rng)
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)[:size]
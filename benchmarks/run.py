@@ -0,0 +1,127 @@
+"""
+Times every case several times and saves the statistics as JSON.
+
+The file looks like {"meta": {...}, "results": {name: {"times": [...], "min": ..., "median": ..., "mean": ...,
+"stdev": ..., "number": ..., "result": ...}}}, where times are the seconds of a single call in every repetition.
+"""
+
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import cases
+
+# Calls are repeated until a repetition takes at least this many seconds, to get above the resolution of the clock
+MIN_TIME = 0.02
+
+
+def _number(function):
+    # the number of calls in one repetition, as in timeit.Timer.autorange
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        if time.perf_counter() - start >= MIN_TIME or number >= 10**6:
+            return number
+        number *= 10
+
+
+def measure(function, repeat=5):
+    """Returns (times, number), the seconds per call in every repetition and the number of calls per repetition"""
+    number = _number(function)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return times, number
+
+
+def summarize(times):
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def _revision():
+    # the git revision of the purere that is benchmarked, if it is in a git repository
+    root = os.path.dirname(os.path.dirname(os.path.abspath(cases.__file__)))
+    try:
+        out = subprocess.run(
+            ["git", "describe", "--always", "--dirty"], cwd=root, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run(module="purere", repeat=5, size=100000, corpora=None, pattern_filter=None, log=None):
+    """Runs all benchmarks on module (purere or re) and returns the results as a JSON-able dict"""
+    if module == "re":
+        import re as regex
+    else:
+        import purere as regex
+
+        if hasattr(regex, "set_disk_cache"):
+            # compiling should generate the code every time
+            regex.set_disk_cache(None)
+
+    results = {}
+    for name, function in cases.cases(regex, size=size, corpora=corpora, pattern_filter=pattern_filter):
+        times, number = measure(function, repeat=repeat)
+        results[name] = dict(times=times, number=number, result=function(), **summarize(times))
+        if log is not None:
+            log.write(f"{results[name]['median'] * 1000:10.3f} ms  {name}\n")
+            log.flush()
+    meta = {
+        "module": module,
+        "version": getattr(regex, "__version__", None),
+        "revision": _revision() if module == "purere" else None,
+        "python": sys.version,
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "repeat": repeat,
+        "size": size,
+    }
+    return {"meta": meta, "results": results}
+
+
+def save(data, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+
+def load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_revision(revision, args, repo=None):
+    """
+    Runs the benchmarks on the purere of a git revision, in a separate process. The benchmarks themselves are the ones
+    of this checkout, so the same cases are timed for every revision. args are passed on to `python -m benchmarks run`.
+    """
+    repo = repo or os.path.dirname(os.path.dirname(os.path.abspath(cases.__file__)))
+    with tempfile.TemporaryDirectory(prefix="purere-bench-") as directory:
+        archive = subprocess.run(["git", "archive", revision], cwd=repo, capture_output=True, check=True).stdout
+        subprocess.run(["tar", "-x", "-C", directory], input=archive, check=True)
+        shutil.rmtree(os.path.join(directory, "benchmarks"), ignore_errors=True)
+        shutil.copytree(os.path.join(repo, "benchmarks"), os.path.join(directory, "benchmarks"))
+        output = os.path.join(directory, "results.json")
+        subprocess.run([sys.executable, "-m", "benchmarks", "run", "-o", output] + list(args), cwd=directory, check=True)
+        data = load(output)
+    data["meta"]["revision"] = revision
+    return data
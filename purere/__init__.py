@@ -1,6 +1,11 @@
 from . import compiler
 from . import topy
 from . import constants
+from . import dfa
+from . import pikevm
+from . import cache
+import os
+import time
 
 from .stdlib import sre_parse
 
@@ -13,73 +18,94 @@ class MappingProxyType(dict):
         raise TypeError("Not alowed to change")
 
     
-__version__ = "0.0.2"
+__version__ = "0.2.0"
 
 class Match:
-    def __init__(self, pattern_info, arg_info, regs):
-        self._pattern_info = pattern_info
-        self._arg_info = arg_info
-        self.regs = regs
-
-        self._groupindex = self._pattern_info["groupindex"]
-
-        self.string = arg_info["string"]
-
-        self.pos, self.endpos = arg_info["pos"], arg_info["endpos"]
-        self.span = lambda group=0: regs[group]
-        self.start, self.end = (
-            lambda group=0: regs[group][0],
-            lambda group=0: regs[group][1],
-        )
-        self.re = pattern_info["pattern"]
-        self._basetype = pattern_info["basetype"]
-        try:
-            lastmark, self.lastindex = max(
-                (max(reg), -i - 1) for i, reg in enumerate(self.regs[1:])
+    # Many matches are created while searching, so everything that is not needed right away is computed on access
+    __slots__ = ("re", "string", "pos", "endpos", "_marks", "_lastindex")
+
+    def __init__(self, pattern, string, pos, endpos, marks):
+        self.re = pattern
+        self.string = string
+        self.pos = pos
+        self.endpos = endpos
+        # start and end of every group after each other, -1 for groups that did not match
+        self._marks = marks
+        self._lastindex = -1
+
+    @property
+    def regs(self):
+        marks = self._marks
+        return tuple((marks[i], marks[i + 1]) for i in range(0, len(marks), 2))
+
+    @property
+    def _groupindex(self):
+        return self.re.groupindex
+
+    @property
+    def _basetype(self):
+        return self.re._basetype
+
+    @property
+    def lastindex(self):
+        if self._lastindex == -1:
+            # the group that ended last, the outer one if groups end at the same place
+            marks = self._marks
+            lastmark, lastindex = max(
+                ((max(marks[i], marks[i + 1]), -i // 2) for i in range(2, len(marks), 2)), default=(-1, 0)
             )
-            self.lastindex *= -1
-            if lastmark == -1:
-                self.lastindex = None
-        except ValueError as e:
-            self.lastindex = None
-        self.lastgroup = None
-        if self.lastindex and self.lastindex in self._groupindex.values():
-            self.lastgroup = next(
-                key
-                for key, value in self._groupindex.items()
-                if value == self.lastindex
-            )
-
-    def group(self, *groups, default=None):
-        if not groups:
-            groups = [0]
-        try:
-            groups = [self._groupindex[g] if isinstance(g, str) else g for g in groups]
-        except KeyError as e:
-            raise IndexError("no such group")
+            self._lastindex = None if lastmark == -1 else -lastindex
+        return self._lastindex
+
+    @property
+    def lastgroup(self):
+        lastindex = self.lastindex
+        if lastindex:
+            for key, value in self._groupindex.items():
+                if value == lastindex:
+                    return key
+        return None
+
+    def _index(self, group):
+        # converts a group name or number to the index of its start in _marks
+        if isinstance(group, str):
+            try:
+                group = self._groupindex[group]
+            except KeyError:
+                raise IndexError("no such group")
         try:
-            groups = [i.__index__() for i in groups]
+            group = group.__index__()
         except AttributeError:
             raise IndexError("no such group")
-        for i in groups:
-            if i < 0 or i >= len(self.regs):
-                raise IndexError("no such group")
-        res = tuple(
-            [
-                self._basetype(self.string[slice(*self.regs[group])])
-                if self.regs[group][0] != -1
-                else default
-                for group in groups
-            ]
-        )
+        if group < 0 or 2 * group >= len(self._marks):
+            raise IndexError("no such group")
+        return 2 * group
+
+    def span(self, group=0):
+        i = self._index(group)
+        return self._marks[i], self._marks[i + 1]
+
+    def start(self, group=0):
+        return self._marks[self._index(group)]
 
-        return res if len(res) > 1 else res[0]
+    def end(self, group=0):
+        return self._marks[self._index(group) + 1]
+
+    def _get(self, i, default):
+        # the group starting at index i of _marks
+        start = self._marks[i]
+        if start == -1:
+            return default
+        return self._basetype(self.string[start : self._marks[i + 1]])
+
+    def group(self, *groups, default=None):
+        if len(groups) <= 1:
+            return self._get(self._index(groups[0]) if groups else 0, default)
+        indices = [self._index(group) for group in groups]
+        return tuple(self._get(i, default) for i in indices)
 
     def groups(self, default=None):
-        return tuple(
-            self._basetype(self.string[slice(*reg)]) if reg[0] != -1 else default
-            for reg in self.regs[1:]
-        )
+        return tuple(self._get(i, default) for i in range(2, len(self._marks), 2))
 
     def groupdict(self, default=None):
         names = self._groupindex.keys()
@@ -106,31 +132,139 @@ class Match:
         return self.group(g)
 
     def _findall_out(self):
-        if len(self.regs) == 1:
-            return self.group(0, default="")
+        if len(self._marks) == 2:
+            return self._get(0, "")
+        elif len(self._marks) == 4:
+            return self._get(2, "")
         else:
-            return self.group(*range(1, len(self.regs)), default="")
+            return self.groups(default="")
 
     def __repr__(self):
         return f"<purere.Match object; span={repr(self.span())}, match={repr(self.group(0))}>"
 
 
+class StreamMatch(Match):
+    """
+    A match of Pattern.finditer_stream. Positions are offsets in the whole stream, while string only holds the block of
+    the stream that was in memory when the match was found, starting at offset.
+    """
+
+    __slots__ = ("offset",)
+
+    def __init__(self, pattern, string, offset, marks):
+        super().__init__(pattern, string, 0, offset + len(string), marks)
+        self.offset = offset
+
+    def _get(self, i, default):
+        start = self._marks[i]
+        if start == -1:
+            return default
+        return self._basetype(self.string[start - self.offset : self._marks[i + 1] - self.offset])
+
+
+def _chunks(source, chunk_size):
+    # the blocks of a file-like object, or the items of an iterable
+    if hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        for chunk in source:
+            if chunk:
+                yield chunk
+
+
+def _forget_done(done, pos, strict=False):
+    # Removes the states before pos from done (and at pos if strict), see topy.memo_layout for the layout
+    if not done:
+        return done
+    base, memo, scale, kept = done
+    if isinstance(memo, bytearray):
+        if pos < base:
+            return None
+        # deleting from the start of a bytearray does not move the rest
+        del memo[: (pos - base) * scale]
+        done[0] = pos
+        if strict:
+            memo[:scale] = bytes(len(memo[:scale]))
+    elif strict or len(memo) > 2 * kept + 256:
+        # rebuilding the set takes as long as filling it, so only do so once it doubled in size
+        limit = (pos + 1 if strict else pos) * scale
+        done[1] = {key for key in memo if key >= limit}
+        done[3] = len(done[1])
+    return done
+
+
+def _copy_done(done):
+    return done and [done[0], done[1].copy(), done[2], done[3]]
+
+
+class MatchStats:
+    """
+    What the generated code of a pattern compiled with the STATS flag did, summed over all calls.
+    visits[i] is the number of times part i of the code ran, pushes and pops count the states that went on and off the
+    stack, done_hits and done_misses the popped states that were or were not tried before. max_stack and max_done are
+    the largest stack and done seen.
+    """
+
+    __slots__ = ("part_comments", "visits", "calls", "pushes", "pops", "done_hits", "done_misses", "max_stack", "max_done")
+
+    def __init__(self, part_comments):
+        # the `# ^` comments of every part in the generated code
+        self.part_comments = part_comments
+        self.reset()
+
+    def reset(self):
+        self.visits = [0] * len(self.part_comments)
+        self.calls = self.pushes = self.pops = self.done_hits = self.done_misses = 0
+        self.max_stack = self.max_done = 0
+
+    def add(self, pops, pushes, hits, misses, maxstack, donesize):
+        # called by the generated code before it returns
+        self.calls += 1
+        self.pops += pops
+        self.pushes += pushes
+        self.done_hits += hits
+        self.done_misses += misses
+        self.max_stack = max(self.max_stack, maxstack)
+        self.max_done = max(self.max_done, donesize)
+
+    def hot_parts(self, n=5):
+        """Returns (part, visits, opcodes) for the n most visited parts, where opcodes are the VM instructions of the
+        part as in the `# ^` comments of the generated code"""
+        order = sorted(range(len(self.visits)), key=lambda i: -self.visits[i])
+        return [(i, self.visits[i], self.part_comments[i]) for i in order[:n] if self.visits[i]]
+
+    def __repr__(self):
+        return (
+            f"<MatchStats calls={self.calls} visits={sum(self.visits)} pushes={self.pushes} pops={self.pops} "
+            f"done_hits={self.done_hits} done_misses={self.done_misses} max_stack={self.max_stack} "
+            f"max_done={self.max_done}>"
+        )
+
+
 class _Scanner:
-    def __init__(self, pattern, string, pos=0, endpos=None):
+    def __init__(self, pattern, string, pos=0, endpos=None, budget=None):
         self._pos = pos
         self._curpos = pos
         self._last_empty = False
         self.pattern = pattern
         self._string = string
+        # what is searched, see Pattern._subject
+        self._subject = pattern._subject(string)
         self._fin = False
         self._endpos = endpos
         self._done = None
+        self._budget = budget
         
-    def _run(self, f):
+    def _next(self, f):
+        # returns the next (start, end, marks), or None
         if self._fin:
             return
         res,done = f(
-            self._string, self._curpos, self._endpos, nonempty_first=self._last_empty,done=self._done
+            self._subject, self._curpos, self._endpos, nonempty_first=self._last_empty, done=self._done, budget=self._budget
         )
         
         if (not self.pattern._info["has_assert"]) and done:
@@ -139,17 +273,27 @@ class _Scanner:
 
             
         if res:
-            # fix starting position
-            res.pos = self._pos
-            span = res.span()
-            self._curpos = span[1]
-            self._last_empty = span[0] == span[1]
+            self._curpos = res[1]
+            self._last_empty = res[0] == res[1]
             return res
         else:
             self._fin = True
             self._curpos = len(self._string)
             return
 
+    def _run(self, f):
+        res = self._next(f)
+        if res:
+            return self.pattern._new_match(self._string, self._pos, self._endpos, *res)
+
+    def _iter(self):
+        # all following search results as (start, end, marks)
+        while True:
+            res = self._next(self.pattern._search)
+            if res is None:
+                return
+            yield res
+
     def match(self):
         return self._run(self.pattern._match)
 
@@ -157,6 +301,150 @@ class _Scanner:
         return self._run(self.pattern._search)
 
 
+class _BufferView:
+    # A bytes-like object without find, like a memoryview of a part of a buffer. Slices are bytes, and only the parts
+    # that are sliced or searched are copied.
+    __slots__ = ("buffer",)
+
+    # The size of the blocks that find copies
+    block_size = 1 << 16
+
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer).cast("B")
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return bytes(self.buffer[key])
+        return self.buffer[key]
+
+    def find(self, sub, start=0, end=None):
+        end = len(self.buffer) if end is None else min(end, len(self.buffer))
+        # the blocks overlap, so occurrences that start in a block are found in that block
+        while start + len(sub) <= end:
+            stop = min(start + self.block_size + len(sub) - 1, end)
+            i = bytes(self.buffer[start:stop]).find(sub)
+            if i != -1:
+                return start + i
+            start += self.block_size
+        return -1
+
+
+class _CharsetTable(dict):
+    # Table for str.translate that maps the characters accepted by checker to chr(1) and all others to chr(0).
+    # Entries are only added when a character is first seen.
+    def __init__(self, checker):
+        self.checker = checker
+
+    def __missing__(self, key):
+        res = self[key] = "\x01" if self.checker(chr(key), 0) else "\x00"
+        return res
+
+
+class _CharsetScanner:
+    # Finds the positions of the characters accepted by checker using translate and find, so the search does not
+    # have to call checker for every position.
+    def __init__(self, checker, isbytes):
+        if isbytes:
+            self.table = bytes(1 if checker(bytes((c,)), 0) else 0 for c in range(256))
+            self.mark = b"\x01"
+        else:
+            self.table = _CharsetTable(checker)
+            self.mark = "\x01"
+
+    # The largest block that is translated at once, so a large string is never copied as a whole
+    max_block = 1 << 20
+
+    def candidates(self, s, pos, endpos):
+        # Blocks of growing size, so finding the first candidate does not need to translate the whole string
+        size = 256
+        while pos < endpos:
+            end = min(pos + size, endpos)
+            block = s[pos:end].translate(self.table)
+            i = block.find(self.mark)
+            while i != -1:
+                yield pos + i
+                i = block.find(self.mark, i + 1)
+            pos = end
+            size = min(2 * size, self.max_block)
+
+
+class _LiteralScanner:
+    # Finds the positions where one of a set of literals starts, every match starts at one of these.
+    # Small sets use find for every literal, larger sets an Aho-Corasick automaton.
+    find_limit = 16
+
+    def __init__(self, literals):
+        self.literals = literals
+        self.automaton = len(literals) > self.find_limit
+        if self.automaton:
+            # All literals are cut to the same length, so the hits are found in order of their start
+            self.length = min(len(lit) for lit in literals)
+            self.goto = [{}]
+            self.fail = [0]
+            for lit in literals:
+                node = 0
+                for c in lit[: self.length]:
+                    if c not in self.goto[node]:
+                        self.goto.append({})
+                        self.fail.append(0)
+                        self.goto[node][c] = len(self.goto) - 1
+                    node = self.goto[node][c]
+            self.final = {node for node in range(len(self.goto)) if not self.goto[node]}
+            # breadth first, so the fail links of shorter nodes are known
+            todo = list(self.goto[0].values())
+            for node in todo:
+                for c, child in self.goto[node].items():
+                    fail = self.fail[node]
+                    while fail and c not in self.goto[fail]:
+                        fail = self.fail[fail]
+                    self.fail[child] = self.goto[fail].get(c, 0)
+                    todo.append(child)
+            # transitions, also those following fail links, are cached here
+            self.delta = [dict(goto) for goto in self.goto]
+
+    def step(self, node, c):
+        start = node
+        while node and c not in self.goto[node]:
+            node = self.fail[node]
+        res = self.goto[node].get(c, 0)
+        self.delta[start][c] = res
+        return res
+
+    def candidates(self, s, pos, endpos):
+        if self.automaton:
+            delta = self.delta
+            final = self.final
+            length = self.length
+            node = 0
+            for i in range(pos, endpos):
+                c = s[i]
+                nextnode = delta[node].get(c)
+                node = self.step(node, c) if nextnode is None else nextnode
+                if node in final:
+                    yield i - length + 1
+            return
+        # Look in blocks of growing size, so finding the next candidate does not need to scan the whole string
+        size = 256
+        while pos < endpos:
+            end = min(pos + size, endpos)
+            found = []
+            for lit in self.literals:
+                # occurrences that start before end
+                last = min(end + len(lit) - 1, endpos)
+                loc = s.find(lit, pos, last)
+                while loc >= 0:
+                    found.append(loc)
+                    loc = s.find(lit, loc + 1, last)
+            # no literal is a prefix of another, so they never start at the same position
+            found.sort()
+            yield from found
+            pos = end
+            size *= 2
+
+
 class Pattern:    
     def __init__(self, info,func):
         self._info = info
@@ -171,12 +459,37 @@ class Pattern:
         self.groups = self._info["groups"] - 1
         self.groupindex = MappingProxyType(self._info["groupdict"])
         self._basetype = str if isinstance(self.pattern, str) else bytes
-        self.pattern_info = {
-            "pattern": self,
-            "groups": self.groups,
-            "groupindex": self.groupindex,
-            "basetype": self._basetype,
-        }
+        # Optional automaton that can replace the generated function, see dfa.py
+        self._engine = None
+        # Finds the characters that can start a match, if this is a limited set
+        checker = info["prefix_checker"]
+        self._charset = _CharsetScanner(checker, self._basetype == bytes) if checker else None
+        # Finds the places where a match can start, if the pattern starts with one of a few literals
+        self._literals = _LiteralScanner(info["literals"]) if info.get("literals") else None
+        # The generated function that counts its steps, only compiled when a timeout or max_steps is given
+        self._budget_function = None
+        # Counters of the generated code, only for patterns compiled with the STATS flag
+        self._stats = None
+        if info.get("part_comments") is not None:
+            stats = self._stats = MatchStats(info["part_comments"])
+            self._match_function = lambda s, **kwargs: func(s, stats=stats, **kwargs)
+
+    def stats(self):
+        "Returns the MatchStats of the generated code, the pattern has to be compiled with the STATS flag"
+        if self._stats is None:
+            raise ValueError("Statistics are only collected for patterns compiled with the STATS flag")
+        return self._stats
+
+    # Set below get_headers, the standalone code can not compile the function that counts steps
+    _make_budget = None
+
+    def _budget(self, timeout, max_steps):
+        # None without limits, so that the generated function without any counting is used
+        if timeout is None and max_steps is None:
+            return None
+        if self._make_budget is None:
+            raise TypeError("timeout and max_steps are not supported by standalone or bundled patterns")
+        return self._make_budget(timeout, max_steps)
 
     def _check_type(self, s):
         if self.flags & BYTEPATTERN and isinstance(s, str):
@@ -184,162 +497,360 @@ class Pattern:
         elif not (self.flags & BYTEPATTERN) and not isinstance(s, str):
             raise TypeError("Can only match str types with string pattern")
 
-    def _match(self, string, pos=0, endpos=None, nonempty=False, full=False, done=None,nonempty_first = None):
+    def _new_match(self, string, pos, endpos, start, ending, marks):
+        if endpos is None:
+            endpos = len(string)
+        if not marks:
+            return Match(self, string, pos, endpos, (start, ending))
+        flat = [start, ending]
+        for i in range(0, len(marks), 2):
+            if marks[i] is None:
+                flat += (-1, -1)
+            else:
+                flat += (marks[i], marks[i + 1])
+        return Match(self, string, pos, endpos, tuple(flat))
+
+    # The internal _match and _search methods return (start, end, marks) instead of a Match, together with done
+    def _match(self, string, pos=0, endpos=None, nonempty=False, full=False, done=None,nonempty_first = None, budget=None):
+        if budget is None and self._engine is not None and (self._engine.captures or not self.groups) and type(string) in self._engine.types:
+            # Without groups (or with an engine that tracks them) the automaton gives the complete answer on its own
+            res = self._engine.match(string, pos=pos, endpos=endpos, full=full, nonempty=nonempty)
+            if res is None:
+                return None,None
+            return (pos, res[0], res[1]),None
         # last coordinate is a dummy
-        if done:
-            # remove old stuff we will never see to keep memory footprint reasonable
-            done = {(a,b,c,d) for a,b,c,d in done if b>=pos}
-        success, ending, marks, done = self._match_function(
-            string, pos=pos, endpos=endpos, nonempty=nonempty, full=full, done = done
-        )
-        if success:
-            arg_info = {
-                "string": string,
-                "pos": pos,
-                "endpos": endpos if endpos != None else len(string),
-            }
-            regs = tuple(
-                [(pos, ending)]
-                + [(marks[i], marks[i + 1]) for i in range(0, len(marks), 2)]
+        # remove old stuff we will never see to keep memory footprint reasonable
+        done = _forget_done(done, pos)
+        if budget is None:
+            success, ending, marks, done = self._match_function(
+                string, pos=pos, endpos=endpos, nonempty=nonempty, full=full, done = done
+            )
+        else:
+            success, ending, marks, done = budget.function(
+                string, pos=pos, endpos=endpos, nonempty=nonempty, full=full, done = done, budget=budget
             )
-            regs = tuple((a, b) if a != None else (-1, -1) for a, b in regs)
-            return Match(self.pattern_info, arg_info, regs),done
+        if success:
+            return (pos, ending, marks),done
         else:
             return None,done
 
         
-    def _search_no_fixed_prefix(self, string, pos=0, endpos=None, nonempty_first=False,done=None):
+    def _subject(self, string):
+        # The object the generated code and the scanners work on, this needs find, and slices should be str or bytes.
+        # A memoryview of a whole bytes, bytearray or mmap is replaced by that object, other bytes-like objects are
+        # wrapped. Neither copies the string.
+        if isinstance(string, (str, bytes, bytearray)):
+            return string
+        if type(string) is memoryview:
+            obj = string.obj
+            if (
+                string.ndim == 1 and string.itemsize == 1 and string.c_contiguous
+                and hasattr(obj, "find") and not isinstance(obj, str) and len(obj) == string.nbytes
+            ):
+                return obj
+        elif hasattr(string, "find") and hasattr(string, "rfind"):
+            # mmap
+            return string
+        return _BufferView(string)
+
+    def _search_no_fixed_prefix(self, string, pos=0, endpos=None, nonempty_first=False,done=None,budget=None,limit=None):
         if not endpos:
             endpos = len(string)
            
         minlen = self._info["min"]
-        
-        for i in range(pos, endpos + 1 - minlen):
-            if self._info["prefix_checker"] and not self._info["prefix_checker"](
-                string, i
-            ):
-                continue
+        last = endpos + 1 - minlen if limit is None else min(endpos + 1 - minlen, limit)
+        if self._charset is not None:
+            positions = self._charset.candidates(string, pos, min(last, len(string)))
+        else:
+            positions = range(pos, last)
+
+        for i in positions:
             nonempty = nonempty_first and i == pos
+            # done is changed in place, so keep the original in case we need to throw the new one away
             match,newdone = self._match(
-                string, pos=i, endpos=endpos, nonempty=nonempty, done = done
+                string, pos=i, endpos=endpos, nonempty=nonempty, done = _copy_done(done) if nonempty else done, budget=budget
             )
             if match or not nonempty:
                 # do not keep done is we forced non-empty and did not find anything, as we are fine with an emptry string in a later position but this might be excluded by done
                 done = newdone
             if match:
-                match.pos = pos
                 return match,done
         return None, done
 
-    def _search_fixed_prefix(self, string, pos=0, endpos=None, nonempty_first=False,done=None):
-        if not hasattr(string,"find") and self._basetype == bytes:
-            searchstring = bytes(string)
-        else:
-            searchstring = string
+    def _search_fixed_prefix(self, string, pos=0, endpos=None, nonempty_first=False,done=None,budget=None,limit=None):
+        endpos = len(string) if endpos is None else min(endpos, len(string))
         prefix = self._info["fixed_prefix"]
+        # only occurrences that start before limit
+        findend = endpos if limit is None else min(endpos, limit + len(prefix) - 1)
         curpos = pos
         while True:
-            loc = searchstring.find(prefix,curpos,endpos)
+            loc = string.find(prefix,curpos,findend)
             if loc == -1:
                 return None,done
 
             # We do not need nonempty_first as there is a fixed prefix here, so there is no posibility of being empty
             match,done = self._match(
-                string, pos=loc, endpos=endpos, done = done
+                string, pos=loc, endpos=endpos, done = done, budget=budget
             )
             if match:
-                match.pos = pos
                 return match,done
             else:
                 curpos = loc+1
 
-    def _search(self, string, pos=0, endpos=None, nonempty_first=False,done=None):
-        if done:
-            # remove old stuff we will never see to keep memory footprint reasonable
-            # Due to wierdness at the start with empty strings we also remove the current position
-            done = {(a,b,c,d) for a,b,c,d in done if b>pos}
-        if self._info["fixed_prefix"]:
-            return self._search_fixed_prefix(string,pos=pos,endpos=endpos,nonempty_first=nonempty_first,done=done)
+    def _search_literals(self, string, pos=0, endpos=None, nonempty_first=False,done=None,budget=None,limit=None):
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        for loc in self._literals.candidates(string, pos, endpos):
+            if limit is not None and loc >= limit:
+                break
+            # Matches start with a literal, so they are never empty
+            match,done = self._match(
+                string, pos=loc, endpos=endpos, done = done, budget=budget
+            )
+            if match:
+                return match,done
+        return None,done
+
+    def _search_inner_literal(self, string, pos=0, endpos=None, nonempty_first=False,done=None,budget=None,limit=None):
+        endpos = len(string) if endpos is None else min(endpos, len(string))
+        literal, minoff, maxoff = self._info["inner_literal"]
+        checker = self._info["inner_checker"]
+        # all positions before tried are done
+        tried = pos
+        hit = string.find(literal, pos + minoff, endpos)
+        while hit != -1:
+            first = tried if maxoff is None else max(tried, hit - maxoff)
+            if checker:
+                # Everything before the literal is in the charset of checker
+                start = hit
+                while start > first and checker(string, start - 1):
+                    start -= 1
+                first = start
+            if limit is not None and first >= limit:
+                break
+            # Matches contain the literal, so they are never empty
+            for loc in range(first, hit - minoff + 1 if limit is None else min(hit - minoff + 1, limit)):
+                match,done = self._match(
+                    string, pos=loc, endpos=endpos, done = done, budget=budget
+                )
+                if match:
+                    return match,done
+            tried = max(tried, hit - minoff + 1)
+            hit = string.find(literal, max(hit + 1, tried + minoff), endpos)
+        return None,done
+
+    def _search_engine(self, string, pos=0, endpos=None, nonempty_first=False,done=None,budget=None,limit=None):
+        start = pos
+        if self._charset is not None:
+            # skip to the first character that can start a match
+            start = next(self._charset.candidates(string, pos, len(string) if endpos is None else min(endpos, len(string))), None)
+            if start is None:
+                return None,done
+        res = self._engine.search(string, pos=start, endpos=endpos, nonempty_first=nonempty_first and start == pos)
+        if res is None:
+            return None,done
+        return res,done
+
+    def _search(self, string, pos=0, endpos=None, nonempty_first=False,done=None,budget=None,limit=None):
+        # With limit, only matches that start before limit are looked for
+        # remove old stuff we will never see to keep memory footprint reasonable
+        # Due to wierdness at the start with empty strings we also remove the current position
+        done = _forget_done(done, pos, strict=True)
+        # The automata do not count steps, but they do not backtrack either. They also can not stop at limit.
+        use_engine = budget is None and limit is None and self._engine is not None and type(string) in self._engine.types
+        if use_engine and self._engine.captures:
+            # A single pass over the string, trying every location of the prefix could take quadratic time
+            return self._search_engine(string,pos=pos,endpos=endpos,nonempty_first=nonempty_first,done=done,budget=budget,limit=limit)
+        elif self._literals is not None and not (self._literals.automaton and use_engine):
+            # The automaton is not faster than the DFA, but it is a lot faster than trying every position
+            return self._search_literals(string,pos=pos,endpos=endpos,nonempty_first=nonempty_first,done=done,budget=budget,limit=limit)
+        elif self._info["fixed_prefix"]:
+            return self._search_fixed_prefix(string,pos=pos,endpos=endpos,nonempty_first=nonempty_first,done=done,budget=budget,limit=limit)
+        elif self._info.get("inner_literal"):
+            return self._search_inner_literal(string,pos=pos,endpos=endpos,nonempty_first=nonempty_first,done=done,budget=budget,limit=limit)
+        elif use_engine:
+            return self._search_engine(string,pos=pos,endpos=endpos,nonempty_first=nonempty_first,done=done,budget=budget,limit=limit)
         else:
-            return self._search_no_fixed_prefix(string,pos=pos,endpos=endpos,nonempty_first=nonempty_first,done=done)
+            return self._search_no_fixed_prefix(string,pos=pos,endpos=endpos,nonempty_first=nonempty_first,done=done,budget=budget,limit=limit)
 
-    def search(self, string, pos=0, endpos=None):
+    def search(self, string, pos=0, endpos=None, *, timeout=None, max_steps=None):
         self._check_type(string)
-        return self._search(string, pos=pos, endpos=endpos)[0]
+        res = self._search(self._subject(string), pos=pos, endpos=endpos, budget=self._budget(timeout, max_steps))[0]
+        return res and self._new_match(string, pos, endpos, *res)
 
-    def match(self, string, pos=0, endpos=None):
+    def match(self, string, pos=0, endpos=None, *, timeout=None, max_steps=None):
         self._check_type(string)
-        return self._match(string, pos=pos, endpos=endpos)[0]
+        res = self._match(self._subject(string), pos=pos, endpos=endpos, budget=self._budget(timeout, max_steps))[0]
+        return res and self._new_match(string, pos, endpos, *res)
 
-    def fullmatch(self, string, pos=0, endpos=None):
+    def fullmatch(self, string, pos=0, endpos=None, *, timeout=None, max_steps=None):
         self._check_type(string)
-        return self._match(string, pos=pos, endpos=endpos, full=True)[0]
+        res = self._match(
+            self._subject(string), pos=pos, endpos=endpos, full=True, budget=self._budget(timeout, max_steps)
+        )[0]
+        return res and self._new_match(string, pos, endpos, *res)
+
+    def _iter(self, string, pos=0, endpos=None, count=0, budget=None):
+        # the matches of finditer as (start, end, marks), at most count if count > 0
+        matches = _Scanner(self, string, pos=pos, endpos=endpos, budget=budget)._iter()
+        if count > 0:
+            return (res for i, res in zip(range(count), matches))
+        return matches
 
-    def findall(self, string, pos=0, endpos=None):
-        self._check_type(string)
-        res = [match._findall_out() for match in self.finditer(string, pos, endpos)]
-        return res
+    def _convert(self, string, parts):
+        # slices of bytes-like objects that are not bytes should still be returned as bytes
+        if type(string) is self._basetype:
+            return parts
+        basetype = self._basetype
+
+        def convert(part):
+            if part is None:
+                return None
+            elif isinstance(part, tuple):
+                return tuple(convert(p) for p in part)
+            return basetype(part)
+
+        return [convert(part) for part in parts]
 
-    def finditer(self, string, pos=0, endpos=None):
+    def findall(self, string, pos=0, endpos=None, *, timeout=None, max_steps=None):
         self._check_type(string)
-        s = self.scanner(string, pos=pos, endpos=endpos)
+        return self._findall_list(string, self._iter(string, pos, endpos, budget=self._budget(timeout, max_steps)))
+
+    def _findall_list(self, string, matches):
+        # the result of findall for matches as (start, end, marks)
+        empty = self._basetype()
+        if self.groups == 0:
+            res = [string[start:end] for start, end, marks in matches]
+        elif self.groups == 1:
+            res = [empty if marks[0] is None else string[marks[0] : marks[1]] for start, end, marks in matches]
+        else:
+            res = [
+                tuple(
+                    empty if marks[i] is None else string[marks[i] : marks[i + 1]] for i in range(0, len(marks), 2)
+                )
+                for start, end, marks in matches
+            ]
+        return self._convert(string, res)
 
-        while True:
-            res = s.search()
-            if res == None:
-                return
+    def finditer(self, string, pos=0, endpos=None, *, timeout=None, max_steps=None):
+        self._check_type(string)
+        for start, end, marks in self._iter(string, pos, endpos, budget=self._budget(timeout, max_steps)):
+            yield self._new_match(string, pos, endpos, start, end, marks)
+
+    def finditer_stream(self, source, max_match_len=None, chunk_size=1 << 16, *, timeout=None, max_steps=None):
+        """
+        Like finditer, but for a file-like object (read in blocks of chunk_size) or an iterable of chunks, yielding
+        StreamMatch objects with positions in the whole stream. Only a block and max_match_len characters around it
+        are kept in memory.
+        max_match_len is an upper bound on the length of a match together with its look-ahead and look-behind, it
+        defaults to the maximal width of the pattern when this is known. A longer match can still be found, but
+        then the block grows until the match ends before its end.
+        """
+        if max_match_len is None:
+            if self._info["max"] == "MAXREPEAT" or self._info["has_assert"]:
+                raise ValueError("max_match_len is needed for patterns without a maximal width or with asserts")
+            max_match_len = self._info["max"]
+        # one more character for \b and \B at the edges
+        context = max(max_match_len, 1) + 1
+        budget = self._budget(timeout, max_steps)
+        basetype = self._basetype
+        chunks = _chunks(source, chunk_size)
+        block = basetype()
+        # the position in the stream of the start of block, and where the search continues in block
+        offset = 0
+        curpos = 0
+        last_empty = False
+        eof = False
+        while not eof:
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
             else:
-                yield res
-
-    def split(self, string, maxsplit=0):
+                self._check_type(chunk)
+                block += chunk if type(chunk) is basetype else basetype(chunk)
+            # everything that starts before safe is decided by what is in block
+            safe = len(block) - context
+            scanner = _Scanner(self, block, pos=curpos, budget=budget)
+            scanner._last_empty = last_empty
+            while True:
+                res = scanner._next(self._search)
+                if res is None:
+                    if safe > curpos:
+                        curpos, last_empty = safe, False
+                    break
+                start, end, marks = res
+                if not eof and (start >= safe or end >= len(block)):
+                    # the match might change with more of the stream
+                    if min(start, safe) > curpos:
+                        curpos, last_empty = min(start, safe), False
+                    break
+                flat = [offset + start, offset + end]
+                for i in range(0, len(marks), 2):
+                    flat += (-1, -1) if marks[i] is None else (offset + marks[i], offset + marks[i + 1])
+                yield StreamMatch(self, block, offset, tuple(flat))
+                curpos, last_empty = end, start == end
+            # keep the characters that look-behind can still look at
+            cut = max(0, curpos - context)
+            block = block[cut:]
+            offset += cut
+            curpos -= cut
+
+    def split(self, string, maxsplit=0, *, timeout=None, max_steps=None):
         self._check_type(string)
         parts = []
-        if maxsplit > 0:
-            iterator = zip(range(maxsplit), self.finditer(string))
-        else:
-            iterator = zip(range(2 * len(string)), self.finditer(string))
         position = 0
-        for i, match in iterator:
-            parts.append(self._basetype(string[position : match.start()]))
-            position = match.end()
-            parts += match.groups()
-        parts.append(self._basetype(string[position:]))
-        return parts
-
-    def scanner(self, string, pos=0, endpos=None):
+        for start, end, marks in self._iter(string, count=maxsplit, budget=self._budget(timeout, max_steps)):
+            parts.append(string[position:start])
+            position = end
+            parts += [None if marks[i] is None else string[marks[i] : marks[i + 1]] for i in range(0, len(marks), 2)]
+        parts.append(string[position:])
+        return self._convert(string, parts)
+
+    def scanner(self, string, pos=0, endpos=None, *, timeout=None, max_steps=None):
         self._check_type(string)
-        return _Scanner(self, string, pos=pos, endpos=endpos)
+        return _Scanner(self, string, pos=pos, endpos=endpos, budget=self._budget(timeout, max_steps))
 
-    def sub(self, repl, string, count=0):
-        return self.subn(repl, string, count=count)[0]
+    def sub(self, repl, string, count=0, *, timeout=None, max_steps=None):
+        return self.subn(repl, string, count=count, timeout=timeout, max_steps=max_steps)[0]
 
-    def subn(self, repl, string, count=0):
+    def subn(self, repl, string, count=0, *, timeout=None, max_steps=None):
         self._check_type(string)
-        if callable(repl):
-            replf = lambda x: [repl(x)]
-        else:
+        return self._subn(repl, string, self._iter(string, count=count, budget=self._budget(timeout, max_steps)))
+
+    def _subn(self, repl, string, matches):
+        # the result of subn for matches as (start, end, marks)
+        literal = plan = None
+        if not callable(repl):
             self._check_type(repl)
             repl = self._basetype(repl)
-            comprepl = _compile_repl(repl, self)
-            replf = lambda x: x._expand(comprepl)
+            plan = _repl_plan(_compile_repl(repl, self))
+            if all(not isinstance(item, int) for item in plan):
+                # no group references, the replacement is the same every time
+                literal = self._basetype().join(plan)
 
         parts = []
-        if count > 0:
-            iterator = zip(range(count), self.finditer(string))
-        else:
-            iterator = zip(range(2 * len(string)), self.finditer(string))
+        append = parts.append
         position = 0
+        n = 0
+        for start, end, marks in matches:
+            append(string[position:start])
+            position = end
+            n += 1
+            if literal is not None:
+                append(literal)
+            elif plan is None:
+                append(repl(self._new_match(string, 0, None, start, end, marks)))
+            else:
+                for item in plan:
+                    if not isinstance(item, int):
+                        append(item)
+                    elif item == -2:
+                        append(string[start:end])
+                    elif marks[item] is not None:
+                        append(string[marks[item] : marks[item + 1]])
 
-        lasti = -1
-        for i, match in iterator:
-            parts.append(self._basetype(string[position : match.start()]))
-            position = match.end()
-            parts += replf(match)
-            lasti = i
-
-        parts.append(self._basetype(string[position:]))
+        parts.append(string[position:])
 
-        return (self._basetype().join(parts), lasti + 1)
+        return (self._basetype().join(parts), n)
 
     def __eq__(self, other):
         return self.pattern == other.pattern and self.flags == other.flags
@@ -362,34 +873,45 @@ class Pattern:
 
 def get_headers():
     # returns the top of this file if possible, wihtout the imports.
-    # do not move this function
-    try:
-        assert False
-    except AssertionError as e:
-        assertline = e.__traceback__.tb_lineno
-
-    tillline = assertline - 5
-    lines = open(__file__,"r").read().splitlines()[:tillline]
+    # everything above this function is part of the standalone code
+    lines = open(__file__,"r").read().splitlines()
+    lines = lines[:lines.index("def get_headers():")]
     code =  "\n".join(l for l in lines if 'import' not in l and "__version__" not in l)
     code = code.replace("UNICODE",str(int(UNICODE)))
     code = code.replace("BYTEPATTERN",str(int(BYTEPATTERN)))
     return code
 
 def compile_to_py(pattern, flags=0, name="regex"):
+    code = _pattern_to_py(pattern, flags=flags, name=name)
+    print(code)
+    return code
+
+def _pattern_to_py(pattern, flags=0, name="regex"):
     info,code =  compiler.compile_regex(pattern, flags=flags,name=name+"_code",only_code = True)
-    if  info["prefix_checker"]:
-        code = info["prefix_checker"] + "\n\n" + code
-        # temporary value, we will replace later, just something that has a clear repr
-        info["prefix_checker"] = 12345678987654321
+    # The standalone code only contains the backtracker
+    info.pop("program")
+    # temporary values, we will replace later, just something that has a clear repr
+    checkers = {"prefix_checker": (12345678987654321, f"prefix_{name}_code"), "inner_checker": (12345678987654322, f"inner_{name}_code")}
+    for key, (temp, fname) in checkers.items():
+        if info[key]:
+            code = info[key] + "\n\n" + code
+            info[key] = temp
     info['flags'] = int(info['flags'])
-    # we want the code for info to have a reference to the function
-    code += f"\n\n{name}_info = " + repr(info).replace("12345678987654321",f"prefix_{name}_code")
+    # we want the code for info to have a reference to the functions
+    inforepr = repr(info)
+    for key, (temp, fname) in checkers.items():
+        inforepr = inforepr.replace(str(temp), fname)
+    code += f"\n\n{name}_info = " + inforepr
     code += f"\n\n{name} = Pattern({name}_info, {name}_code)"
-    print(code)
     return code
 
     
-_cache = {}
+# Compiled patterns, bounded on the number of patterns and on the size of their generated code
+_MAXCACHE = 512
+_MAXCACHE_MEMORY = 64 * 1024 * 1024
+_cache = cache.LRUCache(maxsize=_MAXCACHE, maxmemory=_MAXCACHE_MEMORY)
+# Optional cache of the generated code on disk, see set_disk_cache
+_disk_cache = None
 
 
 def _compile(pattern, flags=0):
@@ -398,26 +920,152 @@ def _compile(pattern, flags=0):
             return pattern
         else:
             pattern = pattern.pattern
-    if (pattern, flags) in _cache:
-        return _cache[(pattern, flags)]
+    res = _cache.get((pattern, flags))
+    if res is not None:
+        return res
     # not cached, actually compile
     if not isinstance(flags, RegexFlag):
          flags = RegexFlag(flags)
-    info, func  = compiler.compile_regex(pattern, flags=flags)
+    if _disk_cache is not None:
+        info, func = _disk_cache.compile(pattern, flags=flags)
+        info["flags"] = RegexFlag(info["flags"])
+    else:
+        info, func  = compiler.compile_regex(pattern, flags=flags)
     info['pattern'] = pattern
+    program = info.pop("program")
     res = Pattern(info,func)
-    _cache[(pattern, flags)] = res
-    _cache[(pattern, res.flags)] = res
+    if flags & STATS:
+        # only the generated code keeps statistics
+        program = None
+    if flags & LINEAR and program is not None:
+        res._engine = pikevm.PikeVM(program, func, groups=res.groups)
+    elif dfa.supported(program):
+        res._engine = dfa.DFA(program, func, groups=res.groups)
+    # the size of the generated code is a good estimate of the memory used by the function
+    weight = info["codesize"] + (len(program["conditions"]) if program is not None else 0)
+    _cache.put((pattern, flags), res, weight)
+    if res.flags != flags:
+        # shares the memory with the entry above
+        _cache.put((pattern, res.flags), res, 0)
     return res
 
 
-_repl_cache = {}
+_repl_cache = cache.LRUCache(maxsize=_MAXCACHE)
 
 
 def _compile_repl(repl, pattern):
-    if not (repl, pattern) in _repl_cache:
-        _repl_cache[(repl, pattern)] = sre_parse.parse_template(repl, pattern)
-    return _repl_cache[(repl, pattern)]
+    res = _repl_cache.get((repl, pattern))
+    if res is None:
+        res = sre_parse.parse_template(repl, pattern)
+        _repl_cache.put((repl, pattern), res)
+    return res
+
+
+def _repl_plan(template):
+    # The replacement as a list of literals and the index of the start of a group in marks, -2 for the whole match
+    mapping, parts = template
+    plan = list(parts)
+    for index, group in mapping:
+        plan[index] = 2 * group - 2
+    return [item for item in plan if isinstance(item, int) or item]
+
+
+class MatchTimeout(Exception):
+    """Raised when matching takes longer than timeout seconds or more than max_steps steps.
+    pos is the position in the string the matcher was at, steps the number of steps it took so far."""
+
+    def __init__(self, msg, pos, steps):
+        super().__init__(msg)
+        self.pos = pos
+        self.steps = steps
+
+
+# The number of steps between two looks at the clock
+_CLOCK_STEPS = 1000
+
+
+class _Budget:
+    # The steps that the generated code may still take, shared by all matcher calls of one search or iteration.
+    # The generated code counts down left on its own, and calls exceeded once it reaches zero.
+    def __init__(self, function, timeout=None, max_steps=None):
+        self.function = function
+        self.timeout = timeout
+        self.max_steps = max_steps
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.used = 0
+        self._refill()
+
+    def _refill(self):
+        left = _CLOCK_STEPS if self.deadline is not None else self.max_steps
+        if self.max_steps is not None:
+            left = min(left, self.max_steps - self.used)
+        self.given = self.left = left
+
+    @property
+    def steps(self):
+        return self.used + self.given - self.left
+
+    def exceeded(self, pos):
+        # returns the number of steps until the next call, or raises MatchTimeout
+        self.used += self.given
+        if self.max_steps is not None and self.used >= self.max_steps:
+            raise MatchTimeout(f"matching took more than {self.max_steps} steps", pos, self.used)
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise MatchTimeout(f"matching took longer than {self.timeout} seconds", pos, self.used)
+        self._refill()
+        return self.left
+
+
+def _make_budget(pattern, timeout, max_steps):
+    if pattern._budget_function is None:
+        # counting steps and statistics at the same time is not supported
+        flags = pattern.flags & ~STATS
+        pattern._budget_function = compiler.compile_regex(pattern.pattern, flags=flags, budget=True)[1]
+    return _Budget(pattern._budget_function, timeout=timeout, max_steps=max_steps)
+
+
+Pattern._make_budget = _make_budget
+
+from . import parallel
+from . import aio
+from .regexset import RegexSet
+
+# Not part of the standalone code, as these need other processes that import purere, or asyncio
+Pattern.findall_parallel = parallel.findall_parallel
+Pattern.finditer_parallel = parallel.finditer_parallel
+Pattern.asearch = aio.asearch
+Pattern.afinditer = aio.afinditer
+Pattern.asub = aio.asub
+Pattern.asubn = aio.asubn
+
+
+def cache_info():
+    "Returns the hits, misses, evictions, size and limits of the pattern cache"
+    return _cache.info()
+
+
+def set_cache_limits(maxsize=_MAXCACHE, maxmemory=_MAXCACHE_MEMORY):
+    """Sets the maximum number of cached patterns and the maximum total size of their generated code in bytes.
+    None removes the limit, the least recently used patterns are evicted first."""
+    _cache.set_limits(maxsize=maxsize, maxmemory=maxmemory)
+    _repl_cache.set_limits(maxsize=maxsize)
+
+
+def set_disk_cache(directory):
+    """Stores the generated code of compiled patterns in directory, and reuses it in later processes.
+    The directory can be shared by concurrent processes. None disables the disk cache."""
+    global _disk_cache
+    _disk_cache = None if directory is None else cache.DiskCache(directory, version=__version__)
+
+
+def clear_disk_cache(pattern=None, flags=0):
+    "Removes pattern from the disk cache, or all patterns if none is given"
+    if _disk_cache is not None:
+        _disk_cache.invalidate(pattern, flags)
+
+
+if os.environ.get("PURERE_CACHE_DIR"):
+    set_disk_cache(os.environ["PURERE_CACHE_DIR"])
 
 
 error = constants.error
@@ -443,6 +1091,7 @@ __all__ = [
     "error",
     "Pattern",
     "Match",
+    "StreamMatch",
     "A",
     "I",
     "L",
@@ -458,6 +1107,14 @@ __all__ = [
     "VERBOSE",
     "UNICODE",
     "STRICTUNI",
+    "LINEAR",
+    "STATS",
+    "cache_info",
+    "set_cache_limits",
+    "set_disk_cache",
+    "clear_disk_cache",
+    "MatchTimeout",
+    "RegexSet",
 ]
 
 import enum
@@ -475,6 +1132,8 @@ class RegexFlag(enum.IntFlag):
     # added flags
     STRICTUNI = constants.SRE_FLAG_STRICT_UNICODE
     BYTEPATTERN = constants.SRE_FLAG_BYTE_PATTERN
+    LINEAR = constants.SRE_FLAG_LINEAR
+    STATS = constants.SRE_FLAG_STATS
 
     def __repr__(self):
         if self._name_ is not None:
@@ -508,35 +1167,35 @@ globals().update(RegexFlag.__members__)
 # public interface
 
 
-def match(pattern, string, flags=0):
+def match(pattern, string, flags=0, *, timeout=None, max_steps=None):
     """Try to apply the pattern at the start of the string, returning
     a Match object, or None if no match was found."""
-    return _compile(pattern, flags).match(string)
+    return _compile(pattern, flags).match(string, timeout=timeout, max_steps=max_steps)
 
 
-def fullmatch(pattern, string, flags=0):
+def fullmatch(pattern, string, flags=0, *, timeout=None, max_steps=None):
     """Try to apply the pattern to all of the string, returning
     a Match object, or None if no match was found."""
-    return _compile(pattern, flags).fullmatch(string)
+    return _compile(pattern, flags).fullmatch(string, timeout=timeout, max_steps=max_steps)
 
 
-def search(pattern, string, flags=0):
+def search(pattern, string, flags=0, *, timeout=None, max_steps=None):
     """Scan through string looking for a match to the pattern, returning
     a Match object, or None if no match was found."""
-    return _compile(pattern, flags).search(string)
+    return _compile(pattern, flags).search(string, timeout=timeout, max_steps=max_steps)
 
 
-def sub(pattern, repl, string, count=0, flags=0):
+def sub(pattern, repl, string, count=0, flags=0, *, timeout=None, max_steps=None):
     """Return the string obtained by replacing the leftmost
     non-overlapping occurrences of the pattern in string by the
     replacement repl.  repl can be either a string or a callable;
     if a string, backslash escapes in it are processed.  If it is
     a callable, it's passed the Match object and must return
     a replacement string to be used."""
-    return _compile(pattern, flags).sub(repl, string, count)
+    return _compile(pattern, flags).sub(repl, string, count, timeout=timeout, max_steps=max_steps)
 
 
-def subn(pattern, repl, string, count=0, flags=0):
+def subn(pattern, repl, string, count=0, flags=0, *, timeout=None, max_steps=None):
     """Return a 2-tuple containing (new_string, number).
     new_string is the string obtained by replacing the leftmost
     non-overlapping occurrences of the pattern in the source
@@ -545,10 +1204,10 @@ def subn(pattern, repl, string, count=0, flags=0):
     callable; if a string, backslash escapes in it are processed.
     If it is a callable, it's passed the Match object and must
     return a replacement string to be used."""
-    return _compile(pattern, flags).subn(repl, string, count)
+    return _compile(pattern, flags).subn(repl, string, count, timeout=timeout, max_steps=max_steps)
 
 
-def split(pattern, string, maxsplit=0, flags=0):
+def split(pattern, string, maxsplit=0, flags=0, *, timeout=None, max_steps=None):
     """Split the source string by the occurrences of the pattern,
     returning a list containing the resulting substrings.  If
     capturing parentheses are used in pattern, then the text of all
@@ -556,10 +1215,10 @@ def split(pattern, string, maxsplit=0, flags=0):
     list.  If maxsplit is nonzero, at most maxsplit splits occur,
     and the remainder of the string is returned as the final element
     of the list."""
-    return _compile(pattern, flags).split(string, maxsplit)
+    return _compile(pattern, flags).split(string, maxsplit, timeout=timeout, max_steps=max_steps)
 
 
-def findall(pattern, string, flags=0):
+def findall(pattern, string, flags=0, *, timeout=None, max_steps=None):
     """Return a list of all non-overlapping matches in the string.
 
     If one or more capturing groups are present in the pattern, return
@@ -567,15 +1226,15 @@ def findall(pattern, string, flags=0):
     has more than one group.
 
     Empty matches are included in the result."""
-    return _compile(pattern, flags).findall(string)
+    return _compile(pattern, flags).findall(string, timeout=timeout, max_steps=max_steps)
 
 
-def finditer(pattern, string, flags=0):
+def finditer(pattern, string, flags=0, *, timeout=None, max_steps=None):
     """Return an iterator over all non-overlapping matches in the
     string.  For each match, the iterator returns a Match object.
 
     Empty matches are included in the result."""
-    return _compile(pattern, flags).finditer(string)
+    return _compile(pattern, flags).finditer(string, timeout=timeout, max_steps=max_steps)
 
 
 def compile(pattern, flags=0):
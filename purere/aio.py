@@ -0,0 +1,127 @@
+"""
+Coroutine versions of search, finditer and sub, that do not block an asyncio event loop for long.
+
+The generated code can not be paused, so the string is searched in windows of start positions instead. After every
+window without a match, and after matches that end beyond the window, the event loop gets a turn. A single match
+attempt that takes long (like one with catastrophic backtracking) still blocks the loop, which is what the executor
+option is for: it runs the whole call in a thread or process pool instead.
+"""
+
+import asyncio
+import functools
+
+# The number of start positions that are tried between two turns of the event loop
+YIELD_EVERY = 10000
+
+
+async def _raw_iter(pattern, string, pos, endpos, count, budget, yield_every):
+    # the matches of finditer as (start, end, marks), like _Scanner._iter, at most count if count > 0
+    subject = pattern._subject(string)
+    end = len(subject) if endpos is None else min(endpos, len(subject))
+    curpos, last_empty, done, n = pos, False, None, 0
+    limit = pos + yield_every
+    while True:
+        res, newdone = pattern._search(
+            subject, curpos, endpos, nonempty_first=last_empty, done=done, budget=budget, limit=limit
+        )
+        if not pattern._info["has_assert"] and newdone:
+            done = newdone
+        if res is None:
+            if limit > end:
+                return
+            # no match starts before limit
+            curpos, last_empty = limit, False
+        else:
+            yield res
+            n += 1
+            if n == count:
+                return
+            curpos, last_empty = res[1], res[0] == res[1]
+            if curpos < limit:
+                continue
+        await asyncio.sleep(0)
+        limit = curpos + yield_every
+
+
+def _search(pattern, string, pos, endpos, timeout, max_steps):
+    # run in the executor, returns (start, end, marks) or None
+    budget = pattern._budget(timeout, max_steps)
+    return pattern._search(pattern._subject(string), pos=pos, endpos=endpos, budget=budget)[0]
+
+
+def _matches(pattern, string, pos, endpos, timeout, max_steps):
+    # run in the executor, returns the matches of finditer as (start, end, marks)
+    return list(pattern._iter(string, pos, endpos, budget=pattern._budget(timeout, max_steps)))
+
+
+def _run(executor, function, *args):
+    # get_running_loop only exists since python 3.7, inside a coroutine this is the same loop
+    return asyncio.get_event_loop().run_in_executor(executor, function, *args)
+
+
+async def asearch(
+    self, string, pos=0, endpos=None, *, timeout=None, max_steps=None, yield_every=YIELD_EVERY, executor=None
+):
+    """
+    Like search, but gives the event loop a turn after every yield_every start positions that are tried.
+    With executor, a concurrent.futures.Executor, the search is run there instead. A process pool pickles the pattern
+    and the string.
+    """
+    self._check_type(string)
+    if executor is not None:
+        res = await _run(executor, _search, self, string, pos, endpos, timeout, max_steps)
+        return res and self._new_match(string, pos, endpos, *res)
+    # the generator is closed here, and not left for the event loop to finalize later
+    matches = _raw_iter(self, string, pos, endpos, 1, self._budget(timeout, max_steps), yield_every)
+    try:
+        res = await matches.__anext__()
+    except StopAsyncIteration:
+        return None
+    finally:
+        await matches.aclose()
+    return self._new_match(string, pos, endpos, *res)
+
+
+async def afinditer(
+    self, string, pos=0, endpos=None, *, timeout=None, max_steps=None, yield_every=YIELD_EVERY, executor=None
+):
+    """
+    Like finditer, but an asynchronous iterator that gives the event loop a turn after every yield_every start
+    positions, see asearch. With executor all matches are found there before the first is yielded.
+    """
+    self._check_type(string)
+    if executor is not None:
+        for start, end, marks in await _run(executor, _matches, self, string, pos, endpos, timeout, max_steps):
+            yield self._new_match(string, pos, endpos, start, end, marks)
+        return
+    matches = _raw_iter(self, string, pos, endpos, 0, self._budget(timeout, max_steps), yield_every)
+    try:
+        async for start, end, marks in matches:
+            yield self._new_match(string, pos, endpos, start, end, marks)
+    finally:
+        await matches.aclose()
+
+
+async def asubn(
+    self, repl, string, count=0, *, timeout=None, max_steps=None, yield_every=YIELD_EVERY, executor=None
+):
+    """
+    Like subn, but gives the event loop a turn after every yield_every start positions, see asearch.
+    """
+    self._check_type(string)
+    if executor is not None:
+        subn = functools.partial(self.subn, repl, string, count, timeout=timeout, max_steps=max_steps)
+        return await _run(executor, subn)
+    budget = self._budget(timeout, max_steps)
+    matches = [res async for res in _raw_iter(self, string, 0, None, count, budget, yield_every)]
+    return self._subn(repl, string, matches)
+
+
+async def asub(self, repl, string, count=0, *, timeout=None, max_steps=None, yield_every=YIELD_EVERY, executor=None):
+    """
+    Like sub, but gives the event loop a turn after every yield_every start positions, see asearch.
+    """
+    res = await asubn(
+        self, repl, string, count, timeout=timeout, max_steps=max_steps, yield_every=yield_every, executor=executor
+    )
+    return res[0]
@@ -0,0 +1,84 @@
+"""
+Writes a set of named patterns to a single python module that does not need purere.
+
+The module contains the Pattern and Match classes from get_headers once, followed by the code of compile_to_py for
+every pattern. Importing it (or its .pyc) does not compile anything.
+
+The manifest is a JSON object mapping names to patterns, a pattern is either a string or an object like
+{"pattern": "...", "flags": ["IGNORECASE", "MULTILINE"], "bytes": false}. Flags may also be given as an integer.
+Bytes patterns are given as strings and encoded using latin-1.
+
+The bundled patterns do not support the timeout and max_steps arguments, passing them raises a TypeError.
+
+Usage: python -m purere.bundle manifest.json -o patterns.py
+"""
+
+import argparse
+import json
+import sys
+
+from . import get_headers, _pattern_to_py, RegexFlag
+
+
+def parse_entry(name, entry):
+    # returns (pattern, flags) for a manifest entry
+    if not name.isidentifier():
+        raise ValueError(f"Pattern name {name!r} is not a valid identifier")
+    if isinstance(entry, str):
+        return entry, 0
+    pattern = entry["pattern"]
+    if entry.get("bytes", False):
+        pattern = pattern.encode("latin-1")
+    flags = entry.get("flags", 0)
+    if not isinstance(flags, int):
+        value = 0
+        for flag in flags:
+            value |= RegexFlag[flag]
+        flags = value
+    return pattern, flags
+
+
+def bundle(patterns, comment=""):
+    """
+    Returns the code of a module defining all patterns, patterns is a dict mapping names to (pattern, flags).
+    The patterns in the module raise a TypeError when called with timeout or max_steps.
+    """
+    parts = []
+    if comment:
+        parts.append("\n".join("# " + line for line in comment.splitlines()))
+    header = get_headers()
+    parts.append(header)
+    # the names of the patterns should not overwrite the runtime
+    reserved = {}
+    exec(header, reserved)
+    for name, (pattern, flags) in patterns.items():
+        if name in reserved:
+            raise ValueError(f"Pattern name {name!r} is already used by the runtime")
+        parts.append(_pattern_to_py(pattern, flags=flags, name=name))
+    parts.append(f"__all__ = {list(patterns)!r}")
+    return "\n\n\n".join(parts) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m purere.bundle",
+        description="Compile a manifest of named patterns to a standalone python module.",
+    )
+    parser.add_argument("manifest", help="JSON file mapping names to patterns")
+    parser.add_argument("-o", "--output", help="module to write, defaults to stdout")
+    args = parser.parse_args(argv)
+
+    with open(args.manifest, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    patterns = {name: parse_entry(name, entry) for name, entry in manifest.items()}
+    code = bundle(patterns, comment=f"Generated by purere.bundle from {args.manifest}, do not edit.")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(code)
+    else:
+        sys.stdout.write(code)
+
+
+if __name__ == "__main__":
+    main()
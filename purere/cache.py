@@ -0,0 +1,196 @@
+"""
+Bounded caches for compiled patterns.
+
+Compiling a pattern is expensive, so compiled patterns are kept around. As every entry holds a generated function,
+the cache is bounded both on the number of entries and on an estimate of their memory footprint. The least recently
+used entries are evicted first.
+Optionally the generated code is also stored on disk, so it can be reused by other processes.
+"""
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+import tempfile
+from collections import OrderedDict, namedtuple
+
+from . import compiler
+from . import constants
+from . import literals
+from . import nfa
+from . import proccess
+from . import topy
+from .stdlib import sre_compile
+from .stdlib import sre_parse
+
+# The functions in the info dict, with the prefix of their name
+CHECKERS = {"prefix_checker": "prefix", "inner_checker": "inner"}
+
+# The modules that generate the code, together with the package itself that runs it
+GENERATORS = (compiler, proccess, literals, nfa, topy, constants, sre_parse, sre_compile)
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "currsize", "maxsize", "memory", "maxmemory"])
+
+
+class LRUCache:
+    def __init__(self, maxsize=512, maxmemory=None):
+        # maxsize is the maximum number of entries, maxmemory the maximum total weight, None means unbounded
+        self.maxsize = maxsize
+        self.maxmemory = maxmemory
+        self.entries = OrderedDict()
+        self.memory = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, weight=1):
+        if key in self.entries:
+            self.memory -= self.entries.pop(key)[1]
+        self.entries[key] = (value, weight)
+        self.memory += weight
+        self.shrink()
+
+    def shrink(self):
+        # evict until both limits hold
+        while self.entries and (
+            (self.maxsize is not None and len(self.entries) > self.maxsize)
+            or (self.maxmemory is not None and self.memory > self.maxmemory)
+        ):
+            key, (value, weight) = self.entries.popitem(last=False)
+            self.memory -= weight
+            self.evictions += 1
+
+    def set_limits(self, maxsize=None, maxmemory=None):
+        self.maxsize = maxsize
+        self.maxmemory = maxmemory
+        self.shrink()
+
+    def clear(self):
+        self.entries.clear()
+        self.memory = 0
+
+    def info(self):
+        return CacheInfo(
+            self.hits, self.misses, self.evictions, len(self.entries), self.maxsize, self.memory, self.maxmemory
+        )
+
+
+def code_version():
+    """
+    A hash of the source of the code generator and the runtime, so that any change to the generated code makes older
+    entries unused. Modules without source, like a build with only .pyc files, only count with their name.
+    """
+    digest = hashlib.sha256()
+    for module in GENERATORS + (sys.modules[__package__],):
+        try:
+            source = module.__loader__.get_source(module.__name__)
+        except (AttributeError, ImportError, OSError):
+            source = None
+        digest.update((source or module.__name__).encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()[:16]
+
+
+class DiskCache:
+    """
+    Stores the generated code of patterns on disk, so a new process can skip parsing and code generation.
+    Every pattern is a single file with the marshalled info dict and code objects. Files are written to a temporary
+    file first and then moved in place, so concurrent processes never read a half written file.
+    """
+
+    def __init__(self, directory, version=""):
+        self.directory = os.fspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        # marshal and the generated code both depend on the python version
+        self.version = (
+            f"{version}-{code_version()}-{sys.implementation.cache_tag}-{importlib.util.MAGIC_NUMBER.hex()}"
+        )
+
+    def path(self, pattern, flags):
+        key = repr((pattern, int(flags), self.version)).encode("utf-8", "surrogatepass")
+        return os.path.join(self.directory, hashlib.sha256(key).hexdigest() + ".purere")
+
+    def load(self, pattern, flags):
+        # returns (info, code) or None
+        try:
+            with open(self.path(pattern, flags), "rb") as f:
+                entry = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        # a hash collision would be very unlucky, but it is cheap to check
+        if not (isinstance(entry, tuple) and len(entry) == 4 and entry[:2] == (pattern, int(flags))):
+            return None
+        return entry[2], entry[3]
+
+    def store(self, pattern, flags, info, code):
+        path = self.path(pattern, flags)
+        fd, tmppath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                marshal.dump((pattern, int(flags), info, code), f)
+            os.replace(tmppath, path)
+        except BaseException:
+            try:
+                os.remove(tmppath)
+            except OSError:
+                pass
+            raise
+
+    def compile(self, pattern, flags=0, name="regex"):
+        """
+        Same result as compiler.compile_regex, but uses the stored code if possible.
+        """
+        entry = self.load(pattern, flags)
+        if entry is None:
+            info, pycode = compiler.compile_regex(pattern, flags=flags, name=name, only_code=True)
+            info["flags"] = int(info["flags"])
+            for key in CHECKERS:
+                if info[key] is not None:
+                    info[key] = compile(info[key], f"<purere {key} {name}>", "exec")
+            code = compile(pycode, f"<purere {name}>", "exec")
+            try:
+                self.store(pattern, flags, info, code)
+            except OSError:
+                # the cache is only an optimization
+                pass
+        else:
+            info, code = entry
+        res = {}
+        exec(code, res)
+        for key, prefix in CHECKERS.items():
+            if info[key] is not None:
+                checker = {}
+                exec(info[key], checker)
+                info[key] = checker[f"{prefix}_{name}"]
+        return info, res[name]
+
+    def invalidate(self, pattern=None, flags=0):
+        # removes a single pattern, or everything if no pattern is given
+        if pattern is not None:
+            paths = [self.path(pattern, flags)]
+        else:
+            paths = [
+                os.path.join(self.directory, filename)
+                for filename in os.listdir(self.directory)
+                if filename.endswith(".purere")
+            ]
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -2,6 +2,8 @@ from .proccess import *
 from .constants import *
 from .constants import _NamedIntConstant
 from . import topy
+from . import nfa
+from . import literals
 
 from .stdlib import sre_parse
 from .stdlib import sre_compile
@@ -66,6 +68,37 @@ def info_len(code):
     else:
         return 0
                 
+def charset_checker(code, fname, flags=0, only_code=False):
+    # Creates the function fname(s, pos) that checks s[pos] against the IN block in code
+    pre, conditions, neged, _ = topy.literals_to_cond(code, 0, flags=flags)
+    if flags & SRE_FLAG_BYTE_PATTERN:
+        pre = ["num = lambda x: x[0]"] + pre
+    else:
+        pre = ["num = ord"] + pre
+    codelines = [f"def {fname}(s,pos):"]
+    codelines += topy.indent(pre, 1)
+    codelines.append(f" return {'not ' if neged else ''}({' or '.join(conditions)})")
+    pycode = "\n".join(codelines)
+    if flags & SRE_FLAG_DEBUG:
+        print(f"---------------------- Checker code {fname} ------------------------")
+        for i, l in enumerate(pycode.split("\n")):
+            print(i + 1, l)
+    if only_code:
+        return pycode
+    res = {}
+    exec(pycode, res)
+    return res[fname]
+
+
+def compile_charset(items, flags=0):
+    # compiles a character set from the AST to an IN block
+    charset, hascased = sre_compile._optimize_charset(items)
+    code = [IN, 0]
+    sre_compile._compile_charset(charset, flags, code)
+    code[1] = len(code) - 1
+    return code
+
+
 def parse_info(code, flags=0, only_code = False, name = "checker"):
     code = code[1:]
     skip, infoflags, min, max = code[:4]
@@ -91,27 +124,7 @@ def parse_info(code, flags=0, only_code = False, name = "checker"):
         
     if infoflags & SRE_INFO_CHARSET:
         charset = code[start:skip]
-        pre, conditions, neged, _ = topy.literals_to_cond(
-            [IN, len(charset)] + charset, 0, flags=flags
-        )
-        if flags & SRE_FLAG_BYTE_PATTERN:
-            pre = ["num = lambda x: x[0]"] + pre
-        else:
-            pre = ["num = ord"] + pre
-        codelines = [f"def prefix_{name}(s,pos):"]
-        codelines += topy.indent(pre, 1)
-        codelines.append(f" return {' or '.join(conditions)}")
-        pycode = "\n".join(codelines)
-        if flags & SRE_FLAG_DEBUG:
-            print("---------------------- Prefix-Checker code ------------------------")
-            for i, l in enumerate(pycode.split("\n")):
-                print(i + 1, l)
-        if only_code:
-            checker = pycode
-        else:
-            res = {}
-            exec(pycode, res)
-            checker = res[f"prefix_{name}"]
+        checker = charset_checker([IN, len(charset)] + charset, f"prefix_{name}", flags=flags, only_code=only_code)
 
     return {
         "flags": flags,
@@ -130,13 +143,79 @@ def get_all_args(opcodes, code):
     return found
 
 
-def compile_regex(regex, flags=0, name="regex", only_code = False):
+def compile_regex(regex, flags=0, name="regex", only_code = False, dispatch = "tree", budget = False):
     #flags |= SRE_FLAG_DEBUG
     if isinstance(regex, bytes):
         flags |= SRE_FLAG_BYTE_PATTERN
 
     # Use stdlib's sre_parse to create an AST
     parsed = sre_parse.parse(regex, flags)
+    return compile_parsed(parsed, regex, flags=flags, name=name, only_code=only_code, dispatch=dispatch, budget=budget)
+
+
+def compile_set(regexes, flags=0, name="regexset", only_code=False, dispatch="tree"):
+    """
+    Compiles a list of (regex, flags) into a single function that tries all of them, see purere.RegexSet.
+    The function takes extra found and starts arguments, see topy.parts_to_py. The regexes keep their own group
+    numbers. info["set_starts"] is the part where every regex starts. info["set_firsts"] is for every regex the set
+    of characters (integers for bytes) that its matches start with, or None if this is not known.
+    info["literals"] and info["prefix_checker"] are for all regexes together.
+    """
+    if regexes and isinstance(regexes[0][0], bytes):
+        flags |= SRE_FLAG_BYTE_PATTERN
+    elif not flags & SRE_FLAG_ASCII:
+        flags |= SRE_FLAG_UNICODE
+    parsed = []
+    firsts = []
+    # every match starts with one of these literals, or with a character in charset, if these are not None
+    allliterals = set()
+    charset = []
+    for regex, regex_flags in regexes:
+        regex_flags |= flags & SRE_FLAG_BYTE_PATTERN
+        pattern = sre_parse.parse(regex, regex_flags)
+        parsed.append(pattern)
+        first_literals = literals.first_literals(pattern, flags=regex_flags)
+        # the characters the regex starts with, as found by sre_compile for the regex on its own
+        prefix, _, _ = sre_compile._get_literal_prefix(pattern, pattern.state.flags)
+        first = [(LITERAL, prefix[0])] if prefix else sre_compile._get_charset_prefix(pattern, pattern.state.flags)
+        if first_literals:
+            chars = {lit[0] for lit in first_literals}
+        elif first and all(op is LITERAL for op, _ in first):
+            chars = {av for _, av in first}
+            if not flags & SRE_FLAG_BYTE_PATTERN:
+                chars = {chr(c) for c in chars}
+        else:
+            chars = None
+        firsts.append(chars)
+        if allliterals is not None:
+            allliterals = allliterals | set(first_literals) if first_literals else None
+        if charset is not None:
+            charset = charset + first if first else None
+    if allliterals:
+        # a literal that starts with another literal adds nothing
+        allliterals = sorted(
+            lit for lit in allliterals if not any(lit[:i] in allliterals for i in range(1, len(lit)))
+        )
+
+    combined = combine_patterns(parsed, flags)
+    info, res = compile_parsed(
+        combined, tuple(regex for regex, _ in regexes), flags=flags, name=name, only_code=only_code, dispatch=dispatch,
+        collect=True
+    )
+    info["set_firsts"] = firsts
+    info["literals"] = allliterals or None
+    if not allliterals and charset:
+        info["prefix_checker"] = charset_checker(
+            compile_charset(charset, flags=flags), f"prefix_{name}", flags=flags, only_code=only_code
+        )
+    return info, res
+
+
+def compile_parsed(parsed, regex, flags=0, name="regex", only_code=False, dispatch="tree", budget=False, collect=False):
+    # compiles the AST of regex, with collect the function records all matches instead of returning the first
+    # every match starts with one of these, used to find candidates while searching
+    first = literals.first_literals(parsed, flags=flags)
+    inner = literals.inner_literal(parsed, flags=flags)
     # We reshuffel loops to be easier to parse
     parsed = apply_func_ast(parsed,split_repeats)
     parsed = apply_func_ast(parsed,unroll_small) 
@@ -185,6 +264,22 @@ def compile_regex(regex, flags=0, name="regex", only_code = False):
     info["flags"] |= state.flags
     info["pattern"] = regex
     info["has_assert"] = ASSERT in code or ASSERT_NOT in code
+    # a single literal, or a long common prefix, is already handled well by fixed_prefix
+    fixed_prefix = info["fixed_prefix"]
+    if first and len(first) > 1 and not (fixed_prefix and len(fixed_prefix) >= 3):
+        info["literals"] = first
+    else:
+        info["literals"] = None
+    # a literal inside the pattern, only tries the positions that can reach it
+    info["inner_literal"] = None
+    info["inner_checker"] = None
+    if inner is not None and not info["literals"] and not fixed_prefix:
+        literal, minoff, maxoff, charset = inner
+        info["inner_literal"] = (literal, minoff, maxoff)
+        if charset is not None:
+            info["inner_checker"] = charset_checker(
+                compile_charset(charset, flags=info["flags"]), f"inner_{name}", flags=info["flags"], only_code=only_code
+            )
     # get the maximum mark number in the code, impotant for the python code generation
     allmarks = get_all_args({MARK}, code)
     maxmark = max(allmarks) if allmarks else -1
@@ -199,6 +294,8 @@ def compile_regex(regex, flags=0, name="regex", only_code = False):
 
     # splits the code into seperate parts
     parts = code_to_parts(code,jump_locations)
+    # repeats that can not give back characters to what follows them do not need to backtrack
+    possessive_repeats(parts, flags=flags)
 
     # pass of the work to topy.py to compile this into python code
     pycode = topy.parts_to_py(
@@ -208,9 +305,24 @@ def compile_regex(regex, flags=0, name="regex", only_code = False):
         flags=flags,
         marknum=maxmark + 1,
         statemarks=statemarks,
-        loopnum = loop_counter[0]
+        loopnum = loop_counter[0],
+        dispatch = dispatch,
+        budget = budget,
+        collect = collect,
     )
     
+    # The same parts in a form that automata can use, None if the pattern needs backtracking
+    info["program"] = None if collect else nfa.parts_to_program(
+        parts, flags=flags, loopnum=loop_counter[0], marknum=maxmark + 1, statemarks=statemarks
+    )
+
+    if collect:
+        # the alternatives of the branch that combines the regexes of a set, see compile_set
+        info["set_starts"] = parts[0][1]
+    info["codesize"] = len(pycode)
+    # maps the statistics of the parts back to the VM code
+    info["part_comments"] = topy.part_comments(parts, flags=flags) if flags & SRE_FLAG_STATS else None
+
     if flags & SRE_FLAG_DEBUG:
         print("---------------------- Main code ------------------------")
         for i, l in enumerate(pycode.split("\n")):
@@ -25,14 +25,19 @@ ABS_ASSERT_NOT
 
 ABS_REPEAT_ANY
 ABS_REPEAT_ANY_ALL
+ABS_POSSESSIVE_REPEAT_ONE
 """.split()
 
 for opcode in new_opcodes:
     globals()[opcode] = _NamedIntConstant(len(OPCODES), opcode)
     OPCODES.append(globals()[opcode]) 
 
-# if passed unicodedata is used to define numerical characters instead of isnumerical()
+# if passed only decimal characters (unicode category Nd) are numerical instead of everything isnumerical()
 SRE_FLAG_STRICT_UNICODE = 512
 # signifies that this is a bytes pattern, should be used internally only
 SRE_FLAG_BYTE_PATTERN = 1024  
+# forces the linear time engine (pikevm.py) for patterns that do not need backtracking
+SRE_FLAG_LINEAR = 2048
+# compiles a version of the generated code that counts what the backtracker does, see Pattern.stats
+SRE_FLAG_STATS = 4096
 
@@ -0,0 +1,280 @@
+"""
+A lazy DFA engine for patterns that do not need backtracking.
+
+The states of the DFA are ordered tuples of NFA threads (instruction, loop counters) from the program in nfa.py.
+States and their transitions are only created when they are needed while matching and are cached afterwards,
+so after a short warm up every character costs a single dictionary lookup.
+The order of the threads in a state is their priority, as soon as a thread reaches a match all threads after it are
+dropped. This gives the same leftmost-first behavior as the backtracker and `re`.
+
+Only the span of the whole match is found this way, the groups are recovered in a second pass by running the
+backtracker once at the start of the match.
+
+A search scans unanchored until the first match ends, the leftmost match starts in the run of live threads before
+that. A few anchored runs from the start of that run find it directly, if the run is longer the Pike VM searches it in
+one pass instead, so a search never takes more than linear time in the length of the string.
+"""
+
+from .constants import *
+from .nfa import *
+from . import nfa
+from . import pikevm
+
+# The DFA is only worth it if the counters do not blow up the number of states
+MAX_COUNT = 64
+# Number of anchored runs tried to find the start of the leftmost match before handing the search to the Pike VM
+MAX_RESTARTS = 8
+
+
+def supported(program):
+    return program is not None and program["maxcount"] <= MAX_COUNT
+
+
+class State:
+    __slots__ = ("threads", "prev", "unanchored", "next")
+
+    def __init__(self, threads, prev, unanchored):
+        self.threads = threads
+        self.prev = prev
+        self.unanchored = unanchored
+        # transitions, the key is the character for the most common context and (character, bits) otherwise
+        self.next = {}
+
+
+class DFA(nfa.Automaton):
+    def __init__(self, program, matcher, groups=0, max_states=10000):
+        super().__init__(program, matcher, groups=groups)
+        self.max_states = max_states
+        self.start_threads = ((0, (None,) * program["counters"]),)
+        self._pikevm = None
+        self.clear()
+
+    def clear(self):
+        self.states = {}
+        self.resets = 0
+
+    def get_state(self, threads, prev, unanchored):
+        key = (threads, prev, unanchored)
+        state = self.states.get(key)
+        if state is None:
+            if len(self.states) >= self.max_states:
+                # Throw everything away, states that are still in use keep working but are not shared anymore
+                self.states = {}
+                self.resets += 1
+            state = self.states[key] = State(threads, prev, unanchored)
+        return state
+
+    def start_state(self, s, pos, unanchored):
+        prev = self.prev_at(s, pos)
+        # unanchored states get the start thread added in every step anyway
+        return self.get_state(() if unanchored else self.start_threads, prev, unanchored)
+
+    def closure(self, state, bits, char):
+        """
+        Follows all epsilon steps from the threads in the state, in order of priority.
+        Returns the threads that want to consume a character and whether a match was reached.
+        While following the epsilon steps a thread also carries the loop heads it passed at this position, the same as
+        in pikevm.PikeVM.closure.
+        """
+        code = self.code
+        loops = self.loops
+        threads = state.threads
+        if state.unanchored:
+            threads = threads + self.start_threads
+        todo = [thread + (0,) for thread in reversed(threads)]
+        seen = set()
+        consumers = []
+        while todo:
+            pc, counters, entered = todo.pop()
+            if pc in loops:
+                pc, entered = self.enter(pc, entered)
+            thread = (pc, counters)
+            if (thread, entered) in seen:
+                continue
+            seen.add((thread, entered))
+            ins = code[pc]
+            op = ins[0]
+            if op is I_CHAR:
+                consumers.append(thread)
+            elif op is I_MATCH:
+                if bits & ALLOWED:
+                    # All threads with a lower priority are not needed anymore
+                    return consumers, True
+            elif op is I_SPLIT:
+                todo += [(target, counters, entered) for target in reversed(ins[1])]
+            elif op is I_JUMP:
+                todo.append((ins[1], counters, entered))
+            elif op is I_MARK:
+                todo.append((ins[2], counters, entered))
+            elif op is I_AT:
+                if self.at(ins[1], state.prev, bits, char):
+                    todo.append((ins[2], counters, entered))
+            elif op is I_SET_COUNTER:
+                counter = ins[1]
+                counters = counters[:counter] + (ins[2],) + counters[counter + 1 :]
+                todo.append((ins[3], counters, entered))
+            elif op is I_JUMP_IF_COUNTER:
+                counter = ins[1]
+                value = counters[counter] - 1
+                counters = counters[:counter] + (value,) + counters[counter + 1 :]
+                if value > 0:
+                    todo.append((ins[2], counters, entered))
+                else:
+                    todo.append((ins[3], counters, entered))
+        return consumers, False
+
+    def step(self, state, key, bits, char):
+        # compute (and cache) the transition of state on char
+        consumers, matched = self.closure(state, bits, char)
+        newthreads = []
+        seen = set()
+        if char is not None:
+            for pc, counters in consumers:
+                ins = self.code[pc]
+                if self.conditions[ins[1]](char, 0):
+                    thread = (ins[2], counters)
+                    if thread not in seen:
+                        seen.add(thread)
+                        newthreads.append(thread)
+            prev = self.prev_bits(char)
+        else:
+            prev = 0
+        res = matched, self.get_state(tuple(newthreads), prev, state.unanchored)
+        state.next[key] = res
+        return res
+
+    def final(self, state, s, pos, endpos, allowed):
+        # checks for a match at endpos without consuming anything
+        bits = self.bits(s, pos, endpos, allowed)
+        char = self.char(s, pos) if pos < len(s) else None
+        key = (None if char is None else self.num(char), bits, "final")
+        res = state.next.get(key)
+        if res is None:
+            consumers, matched = self.closure(state, bits, char)
+            res = state.next[key] = matched
+        return res
+
+    def transition(self, state, s, pos, start, endpos, full, nonempty):
+        # (matched, next state) for the character at pos, endpos > pos
+        c = s[pos]
+        if start < pos < endpos - 1 and not full:
+            # most common case, cached with just the character as key
+            res = state.next.get(c)
+            if res is None:
+                res = self.step(state, c, self.bits(s, pos, endpos, True), self.char(s, pos))
+            return res
+        allowed = not full and not (nonempty and pos == start)
+        bits = self.bits(s, pos, endpos, allowed)
+        key = (c, bits)
+        res = state.next.get(key)
+        if res is None:
+            res = self.step(state, key, bits, self.char(s, pos))
+        return res
+
+    def run(self, s, pos, endpos, full=False, nonempty=False):
+        """
+        Runs the DFA anchored at pos.
+        Returns the end of the leftmost-first match or -1 if there is no match.
+        """
+        state = self.start_state(s, pos, False)
+        last = -1
+        start = pos
+        while pos < endpos:
+            if start < pos < endpos - 1 and not full:
+                # inlined fast path of transition()
+                res = state.next.get(s[pos])
+                if res is None:
+                    res = self.transition(state, s, pos, start, endpos, full, nonempty)
+            else:
+                res = self.transition(state, s, pos, start, endpos, full, nonempty)
+            matched, state = res
+            if matched:
+                last = pos
+            if not state.threads:
+                return last
+            pos += 1
+        allowed = (not full or pos == endpos) and not (nonempty and pos == start)
+        if self.final(state, s, pos, endpos, allowed):
+            last = pos
+        return last
+
+    def scan(self, s, pos, endpos, nonempty=False):
+        """
+        Runs the DFA unanchored from pos, i.e., a new thread is started at every position.
+        Returns the first position where any match ends and the last position before that where no older threads
+        were alive. The leftmost match starts between these two. Returns -1, -1 if there is no match.
+        """
+        state = self.start_state(s, pos, True)
+        fresh = start = pos
+        lastpos = endpos - 1
+        while pos < endpos:
+            if pos == start or pos == lastpos:
+                if not state.threads:
+                    fresh = pos
+                res = self.transition(state, s, pos, start, endpos, False, nonempty)
+                if res[0]:
+                    return pos, fresh
+                state = res[1]
+                pos += 1
+                continue
+            # This is the hot loop for searching
+            while pos < lastpos:
+                if not state.threads:
+                    fresh = pos
+                res = state.next.get(s[pos])
+                if res is None:
+                    res = self.transition(state, s, pos, start, endpos, False, nonempty)
+                matched, state = res
+                if matched:
+                    return pos, fresh
+                pos += 1
+        if not state.threads:
+            fresh = pos
+        if self.final(state, s, pos, endpos, not (nonempty and pos == start)):
+            return pos, fresh
+        return -1, -1
+
+    def marks(self, s, start, endpos, full=False, nonempty=False):
+        # second pass to find the groups
+        if not self.groups:
+            return ()
+        success, end, marks, done = self.matcher(s, pos=start, endpos=endpos, full=full, nonempty=nonempty)
+        return marks
+
+    def match(self, s, pos=0, endpos=None, full=False, nonempty=False):
+        # returns (end, marks) or None
+        endpos = len(s) if endpos is None else min(endpos, len(s))
+        end = self.run(s, pos, endpos, full=full, nonempty=nonempty)
+        if end < 0:
+            return None
+        return end, self.marks(s, pos, endpos, full=full, nonempty=nonempty)
+
+    def search(self, s, pos=0, endpos=None, nonempty_first=False):
+        # returns (start, end, marks) or None
+        endpos = len(s) if endpos is None else min(endpos, len(s))
+        if pos > endpos:
+            return None
+        firstend, fresh = self.scan(s, pos, endpos, nonempty=nonempty_first)
+        if firstend < 0:
+            return None
+        # The match that ends first started somewhere before it, the leftmost match can not start later
+        if firstend - fresh >= MAX_RESTARTS:
+            # every anchored run can go on to the end of the live threads, trying all starts would be quadratic
+            res = self.pikevm().search(s, fresh, endpos, nonempty_first=nonempty_first and fresh == pos)
+            if res is None:
+                return None
+            # the groups come from the backtracker, the same as for the matches found by the DFA
+            start, end, _ = res
+            return start, end, self.marks(s, start, endpos, nonempty=nonempty_first and start == pos)
+        for start in range(fresh, firstend + 1):
+            nonempty = nonempty_first and start == pos
+            end = self.run(s, start, endpos, nonempty=nonempty)
+            if end >= 0:
+                return start, end, self.marks(s, start, endpos, nonempty=nonempty)
+        return None
+
+    def pikevm(self):
+        # only created for the searches that need it
+        if self._pikevm is None:
+            self._pikevm = pikevm.PikeVM(self.program, self.matcher, groups=self.groups)
+        return self._pikevm
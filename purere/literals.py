@@ -0,0 +1,143 @@
+"""
+Extracts literal strings from the regex AST, these are used to skip the parts of a string where no match can be.
+"""
+
+from .constants import *
+from .stdlib import sre_parse
+
+# Stop expanding alternatives if there would be more literals than this
+MAX_LITERALS = 1000
+
+
+def _first(items):
+    """
+    Returns a set of tuples of character codes such that every match of items starts with one of them,
+    and whether these tuples are complete matches of items.
+    """
+    prefixes = {()}
+    for opcode, args in items:
+        if opcode is LITERAL:
+            new = {prefix + (args,) for prefix in prefixes}
+        elif opcode is IN and all(op is LITERAL for op, _ in args):
+            new = {prefix + (char,) for prefix in prefixes for _, char in args}
+        elif opcode is BRANCH or (opcode is SUBPATTERN and not args[1] & (SRE_FLAG_IGNORECASE | SRE_FLAG_LOCALE)):
+            # flags like (?m:...) or (?-i:...) do not change which literals match
+            alternatives = args[1] if opcode is BRANCH else [args[3]]
+            new = set()
+            complete = True
+            for alternative in alternatives:
+                firsts, alt_complete = _first(alternative.data)
+                complete = complete and alt_complete
+                new |= {prefix + first for prefix in prefixes for first in firsts}
+            if len(new) > MAX_LITERALS:
+                return prefixes, False
+            if not complete:
+                return new, False
+        elif opcode in {MAX_REPEAT, MIN_REPEAT} and args[0] >= 1:
+            # the first repetition is required, nothing is known about what comes after it
+            firsts, _ = _first(args[2].data)
+            new = {prefix + first for prefix in prefixes for first in firsts}
+            if len(new) > MAX_LITERALS:
+                return prefixes, False
+            return new, False
+        else:
+            return prefixes, False
+        if len(new) > MAX_LITERALS:
+            return prefixes, False
+        prefixes = new
+    return prefixes, True
+
+
+def first_literals(pattern, flags=0):
+    """
+    Returns a sorted list of literal strings such that every match of the parsed pattern starts with one of them,
+    or None if there is no such list. Ignore case is not supported.
+    """
+    if (flags | pattern.state.flags) & (SRE_FLAG_IGNORECASE | SRE_FLAG_LOCALE):
+        return None
+    prefixes, _ = _first(pattern.data)
+    if not prefixes or () in prefixes:
+        return None
+    # a literal that starts with another literal adds nothing
+    prefixes = {prefix for prefix in prefixes if not any(prefix[:i] in prefixes for i in range(1, len(prefix)))}
+    if flags & SRE_FLAG_BYTE_PATTERN:
+        return sorted(bytes(prefix) for prefix in prefixes)
+    return sorted("".join(map(chr, prefix)) for prefix in prefixes)
+
+
+def _flatten(items):
+    # the contents of groups at the top level are part of the top level sequence
+    res = []
+    for opcode, args in items:
+        if opcode is SUBPATTERN and not args[1] and not args[2]:
+            res += _flatten(args[3].data)
+        else:
+            res.append((opcode, args))
+    return res
+
+
+def _charset(items):
+    # returns the items of a character set that contains every character that items can match, or None
+    res = []
+    for opcode, args in items:
+        if opcode is LITERAL:
+            res.append((LITERAL, args))
+        elif opcode is IN and not any(op is NEGATE for op, _ in args):
+            res += args
+        elif opcode in {MAX_REPEAT, MIN_REPEAT} or (opcode is SUBPATTERN and not args[1] and not args[2]):
+            sub = _charset((args[2] if opcode is not SUBPATTERN else args[3]).data)
+            if sub is None:
+                return None
+            res += sub
+        elif opcode is BRANCH:
+            for alternative in args[1]:
+                sub = _charset(alternative.data)
+                if sub is None:
+                    return None
+                res += sub
+        else:
+            return None
+    return res
+
+
+def inner_literal(pattern, flags=0):
+    """
+    Looks for the longest literal that every match contains, but that is not at the start.
+    Returns (literal, minimal offset, maximal offset or None, charset) or None. The offsets are the distance between
+    the start of the match and the literal, charset is a set (as in the AST) containing all characters before the
+    literal, or None if this is not known.
+    """
+    if (flags | pattern.state.flags) & (SRE_FLAG_IGNORECASE | SRE_FLAG_LOCALE):
+        return None
+    items = _flatten(pattern.data)
+    best = None
+    i = 0
+    while i < len(items):
+        if items[i][0] is LITERAL:
+            j = i
+            while j < len(items) and items[j][0] is LITERAL:
+                j += 1
+            if i > 0 and (best is None or j - i > best[1] - best[0]):
+                best = (i, j)
+            i = j
+        else:
+            i += 1
+    if best is None:
+        return None
+
+    start, end = best
+    before = items[:start]
+    minoff, maxoff = sre_parse.SubPattern(pattern.state, before).getwidth()
+    if int(maxoff) >= int(MAXREPEAT):
+        maxoff = None
+    charset = _charset(before)
+    if charset is None and maxoff is None:
+        # every position before the literal would have to be tried
+        return None
+
+    literal = [args for _, args in items[start:end]]
+    if flags & SRE_FLAG_BYTE_PATTERN:
+        literal = bytes(literal)
+    else:
+        literal = "".join(map(chr, literal))
+    return literal, int(minoff), None if maxoff is None else int(maxoff), charset
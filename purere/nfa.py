@@ -0,0 +1,392 @@
+"""
+Converts the parts produced by compiler.code_to_parts into a flat program for automata based engines.
+
+Where the backtracker in topy.py works with whole parts, the automata need to know about every single step.
+Each part is therefore split into small instructions that either consume one character or take an
+epsilon step (jump, branch, mark, at, counters). All targets are absolute positions in the program.
+The program only contains plain python data, so it can be stored or send around easily.
+"""
+
+import mmap
+
+from .constants import *
+from .constants import _NamedIntConstant
+from . import topy
+
+# Instructions, the last argument is always the next instruction (where applicable)
+# (I_CHAR, condition, next): consume a character if conditions[condition] holds
+# (I_SPLIT, [targets]): continue at all targets, earlier targets have priority
+# (I_JUMP, target)
+# (I_MARK, mark, next): record the position in marks[mark]
+# (I_AT, name, next): zero width check, name is the name of the AT code
+# (I_SET_COUNTER, counter, value, next)
+# (I_JUMP_IF_COUNTER, counter, target, next): decrease the counter and jump to target if it is still positive
+# (I_MATCH,)
+I_CHAR = 0
+I_SPLIT = 1
+I_JUMP = 2
+I_MARK = 3
+I_AT = 4
+I_SET_COUNTER = 5
+I_JUMP_IF_COUNTER = 6
+I_MATCH = 7
+
+# Bits describing the position in the string, these are needed to resolve AT codes and to decide if a match is allowed
+ALLOWED = 1  # a match may end here
+LAST = 2  # pos == endpos-1
+END = 4  # pos == endpos
+LEN = 8  # pos == len(s)
+EMPTY = 16  # len(s) == 0
+
+# Bits describing the character before the current position
+START = 1  # pos == 0
+PREV_WORD = 2
+PREV_UNI_WORD = 4
+PREV_NEWLINE = 8
+
+# from _PyUnicode_IsLinebreak in cpython, same as in topy.part_to_py
+NEWLINES = {0x000A, 0x000B, 0x000C, 0x000D, 0x001C, 0x001D, 0x001E, 0x0085, 0x2028, 0x2029}
+
+# Repeats up to this length are unrolled instead of using a counter
+UNROLL_LIMIT = 4
+
+# Opcodes that need the full backtracker, there is no automata for these
+UNSUPPORTED = {
+    GROUPREF,
+    GROUPREF_IGNORE,
+    GROUPREF_UNI_IGNORE,
+    GROUPREF_LOC_IGNORE,
+    ABS_GROUPREF_EXISTS,
+    ASSERT,
+    ABS_ASSERT_NOT,
+    ASSERT_SUCCESS,
+    ASSERT_FAILURE,
+}
+
+
+class Unsupported(Exception):
+    pass
+
+
+def is_char_opcode(opcode):
+    # same test as used in topy.part_to_py
+    opparts = str(opcode).split("_")
+    return (
+        "ANY" == opparts[0]
+        or "IN" in opparts
+        or "RANGE" in opparts
+        or "LITERAL" in opparts
+    )
+
+
+class _Builder:
+    def __init__(self, flags=0, loopnum=0):
+        self.flags = flags
+        self.code = []
+        self.conditions = []
+        self.condition_lookup = {}
+        self.counters = loopnum
+        self.maxcount = 0
+
+    def here(self):
+        return len(self.code)
+
+    def emit(self, *instruction):
+        self.code.append(list(instruction))
+        return len(self.code) - 1
+
+    def condition(self, code, i):
+        # returns the index of the condition for the character opcode at code[i]
+        pre, conds, neged, _ = topy.literals_to_cond(code, i, flags=self.flags)
+        lines = pre + [f"return {'not ' if neged else ''}({' or '.join(conds)})"]
+        key = tuple(lines)
+        if key not in self.condition_lookup:
+            self.condition_lookup[key] = len(self.conditions)
+            self.conditions.append(lines)
+        return self.condition_lookup[key]
+
+    def new_counter(self, value):
+        self.maxcount = max(self.maxcount, value)
+        self.counters += 1
+        return self.counters - 1
+
+    def repeat(self, cond, minrep, maxrep, cont):
+        # greedy repeat of a single character condition, continues at cont afterwards
+        if minrep and minrep <= UNROLL_LIMIT:
+            for rep in range(minrep):
+                self.emit(I_CHAR, cond, self.here() + 1)
+        elif minrep:
+            counter = self.new_counter(minrep)
+            self.emit(I_SET_COUNTER, counter, minrep, self.here() + 1)
+            loop = self.emit(I_CHAR, cond, self.here() + 1)
+            self.emit(I_JUMP_IF_COUNTER, counter, loop, self.here() + 1)
+            self.emit(I_SET_COUNTER, counter, None, self.here() + 1)
+
+        if maxrep is MAXREPEAT:
+            loop = self.emit(I_SPLIT, [self.here() + 1, cont])
+            self.emit(I_CHAR, cond, loop)
+        elif maxrep - minrep <= UNROLL_LIMIT:
+            for rep in range(maxrep - minrep):
+                self.emit(I_SPLIT, [self.here() + 1, cont])
+                self.emit(I_CHAR, cond, self.here() + 1)
+            self.emit(I_JUMP, cont)
+        else:
+            counter = self.new_counter(maxrep - minrep)
+            self.emit(I_SET_COUNTER, counter, maxrep - minrep, self.here() + 1)
+            loop = self.emit(I_SPLIT, [self.here() + 1, self.here() + 3])
+            self.emit(I_CHAR, cond, self.here() + 1)
+            self.emit(I_JUMP_IF_COUNTER, counter, loop, self.here() + 1)
+            self.emit(I_SET_COUNTER, counter, None, cont)
+
+    def part(self, part, partnum):
+        # Adds the instructions of a single part. Targets that point to parts are stored as ("part", num)
+        i = 0
+        while i < len(part):
+            opcode = part[i]
+            i += 1
+            if opcode in UNSUPPORTED:
+                raise Unsupported(str(opcode))
+            elif opcode is ABS_JUMP:
+                self.emit(I_JUMP, ("part", part[i]))
+                return
+            elif opcode is LS_BRANCH:
+                self.emit(I_SPLIT, [self.here() + 1] + [("part", t) for t in part[i]])
+                i += 1
+            elif opcode is LITERALS:
+                for char in part[i]:
+                    cond = self.condition([LITERAL, char], 0)
+                    self.emit(I_CHAR, cond, self.here() + 1)
+                i += 1
+            elif is_char_opcode(opcode):
+                cond = self.condition(part, i - 1)
+                _, _, _, i = topy.literals_to_cond(part, i - 1, flags=self.flags)
+                self.emit(I_CHAR, cond, self.here() + 1)
+            elif opcode is AT:
+                self.emit(I_AT, str(part[i]), self.here() + 1)
+                i += 1
+            elif opcode is SUCCESS:
+                self.emit(I_MATCH)
+                return
+            elif opcode is MARK:
+                self.emit(I_MARK, part[i], self.here() + 1)
+                i += 1
+            elif opcode is SET_COUNTER:
+                counter, value = part[i : i + 2]
+                if value is not None:
+                    self.maxcount = max(self.maxcount, value)
+                self.emit(I_SET_COUNTER, counter, value, self.here() + 1)
+                i += 2
+            elif opcode is ABS_JUMP_IF_COUNTER:
+                counter, target = part[i : i + 2]
+                self.emit(I_JUMP_IF_COUNTER, counter, ("part", target), self.here() + 1)
+                i += 2
+            elif opcode is ABS_REPEAT_ONE or opcode is ABS_POSSESSIVE_REPEAT_ONE:
+                # a possessive repeat matches the same strings, see proccess.possessive_repeats
+                nextpart, minrep, maxrep = part[i : i + 3]
+                cond = self.condition(part, i + 3)
+                self.repeat(cond, minrep, maxrep, ("part", nextpart))
+                return
+            elif opcode in {ABS_REPEAT_ANY, ABS_REPEAT_ANY_ALL}:
+                target, minrep, maxrep = part[i : i + 3]
+                anyop = ANY if opcode is ABS_REPEAT_ANY else ANY_ALL
+                cond = self.condition([anyop], 0)
+                self.repeat(cond, minrep, maxrep, ("part", target))
+                return
+            else:
+                if not isinstance(opcode, _NamedIntConstant):
+                    raise ValueError(f"Wrong code {opcode}")
+                raise Unsupported(str(opcode))
+        # fall through to the next part
+        self.emit(I_JUMP, ("part", partnum + 1))
+
+
+def parts_to_program(parts, flags=0, loopnum=0, marknum=0, statemarks={}):
+    """
+    Converts the parts into a program, returns None if the parts use features that can not be expressed
+    without backtracking (group references and asserts).
+    statemarks are the marks the backtracker keeps in its state, see compiler.compile_regex.
+    """
+    builder = _Builder(flags=flags, loopnum=loopnum)
+    partstarts = []
+    try:
+        for partnum, part in enumerate(parts):
+            partstarts.append(builder.here())
+            builder.part(part, partnum)
+    except Unsupported:
+        return None
+
+    def resolve(target):
+        if isinstance(target, tuple):
+            return partstarts[target[1]]
+        return target
+
+    code = []
+    for instruction in builder.code:
+        op = instruction[0]
+        if op is I_SPLIT:
+            instruction[1] = [resolve(t) for t in instruction[1]]
+        elif op is I_JUMP:
+            instruction[1] = resolve(instruction[1])
+        elif op is I_JUMP_IF_COUNTER:
+            instruction[2] = resolve(instruction[2])
+        code.append(tuple(instruction))
+
+    return {
+        "code": code,
+        "conditions": conditions_to_py(builder.conditions, flags=flags),
+        "numconditions": len(builder.conditions),
+        "counters": builder.counters,
+        "maxcount": builder.maxcount,
+        "marks": marknum,
+        "statemarks": sorted(statemarks),
+        # {head: exit} of the unbounded loops, a thread that gets to a head again without consuming anything matched
+        # an empty iteration and continues at the exit, like the backtracker and `re` do
+        "loops": {
+            partstarts[head]: partstarts[exit]
+            for head, exit in topy.loop_exits(parts, flags=flags, branches=True).items()
+        },
+        "flags": int(flags),
+    }
+
+
+def conditions_to_py(conditions, flags=0):
+    # All conditions are placed in one piece of code, condition i is the function cond_i(s, pos)
+    codelines = ["num = lambda x: x[0]" if flags & SRE_FLAG_BYTE_PATTERN else "num = ord"]
+    for i, lines in enumerate(conditions):
+        codelines.append(f"def cond_{i}(s, pos):")
+        codelines += topy.indent(lines, 1)
+    code = "\n".join(codelines)
+    return code
+
+
+def load_conditions(program):
+    res = {}
+    exec(program["conditions"], res)
+    return [res[f"cond_{i}"] for i in range(program["numconditions"])]
+
+
+def category_function(cat, flags=0):
+    # returns a function that checks if a character is in one of the categories of topy.get_category_condition
+    val = topy.get_val(flags=flags)
+    code = "\n".join([
+        "num = lambda x: x[0]" if flags & SRE_FLAG_BYTE_PATTERN else "num = ord",
+        "def f(s, pos):",
+        f" return {topy.get_category_condition(cat, val, flags=flags)}",
+    ])
+    res = {}
+    exec(code, res)
+    return res["f"]
+
+
+class Automaton:
+    """
+    Common base of the engines that run a program (dfa.DFA and pikevm.PikeVM).
+    Knows how to look at the string and how to resolve AT codes, the engines only decide how threads are kept.
+    """
+
+    # True if the engine finds the groups on its own, otherwise it needs the backtracker for them
+    captures = False
+
+    def __init__(self, program, matcher=None, groups=0):
+        self.program = program
+        self.code = program["code"]
+        self.conditions = load_conditions(program)
+        self.flags = program["flags"]
+        self.matcher = matcher
+        self.groups = groups
+        self.uses_prev = any(ins[0] is I_AT for ins in self.code)
+        self.loops = program["loops"]
+        # the loop heads a thread passed are kept as a bitmask
+        self.loop_bits = {head: 1 << i for i, head in enumerate(self.loops)}
+        if self.flags & SRE_FLAG_BYTE_PATTERN:
+            # memoryviews of a whole object are replaced by that object, see Pattern._subject
+            self.types = {bytes, bytearray, mmap.mmap}
+            self.newlines = {nl for nl in NEWLINES if nl < 128}
+            self.num = lambda x: x[0]
+        else:
+            self.types = {str}
+            self.newlines = NEWLINES
+            self.num = ord
+        self.is_word = category_function("WORD", flags=self.flags)
+        self.is_uni_word = category_function("UNI_WORD", flags=self.flags)
+
+    def char(self, s, pos):
+        # the character in a form the conditions understand
+        if self.flags & SRE_FLAG_BYTE_PATTERN:
+            return bytes((s[pos],))
+        return s[pos]
+
+    def prev_bits(self, char):
+        if not self.uses_prev:
+            return 0
+        bits = 0
+        if self.is_word(char, 0):
+            bits |= PREV_WORD
+        if self.is_uni_word(char, 0):
+            bits |= PREV_UNI_WORD
+        if self.num(char) in self.newlines:
+            bits |= PREV_NEWLINE
+        return bits
+
+    def prev_at(self, s, pos):
+        # the prev bits for a run that starts at pos
+        if pos == 0:
+            return START if self.uses_prev else 0
+        elif pos > len(s):
+            return 0
+        return self.prev_bits(self.char(s, pos - 1))
+
+    def enter(self, pc, entered):
+        """
+        Returns (pc, entered) for a thread that gets to pc while following epsilon steps, entered are the bits of the
+        loop heads it passed at this position. Getting to a head again means the iteration matched the empty string,
+        that was the last one.
+        """
+        while pc in self.loops:
+            bit = self.loop_bits[pc]
+            if not entered & bit:
+                return pc, entered | bit
+            pc = self.loops[pc]
+        return pc, entered
+
+    def at(self, name, prev, bits, char):
+        # Same logic as the AT code in topy.part_to_py
+        if name in {"AT_BEGINNING", "AT_BEGINNING_STRING"}:
+            return bool(prev & START)
+        elif name == "AT_BEGINNING_LINE":
+            return bool(prev & (START | PREV_NEWLINE))
+        elif name == "AT_END":
+            return bool(bits & END) or (bool(bits & LAST) and self.num(char) in self.newlines)
+        elif name == "AT_END_STRING":
+            return bool(bits & END)
+        elif name == "AT_END_LINE":
+            return bool(bits & LEN) or self.num(char) in self.newlines
+        elif name in {"AT_BOUNDARY", "AT_NON_BOUNDARY", "AT_UNI_BOUNDARY", "AT_UNI_NON_BOUNDARY"}:
+            if bits & EMPTY:
+                return False
+            if "UNI" in name:
+                now_word = char is not None and self.is_uni_word(char, 0)
+                was_word = bool(prev & PREV_UNI_WORD)
+            else:
+                now_word = char is not None and self.is_word(char, 0)
+                was_word = bool(prev & PREV_WORD)
+            if prev & START:
+                at_b = now_word
+            elif bits & LEN:
+                at_b = was_word
+            else:
+                at_b = now_word != was_word
+            return at_b != ("NON" in name)
+        raise NotImplementedError(f"Unknown AT argument: {name}")
+
+    def bits(self, s, pos, endpos, allowed):
+        bits = ALLOWED if allowed else 0
+        if pos == endpos - 1:
+            bits |= LAST
+        if pos == endpos:
+            bits |= END
+        if pos == len(s):
+            bits |= LEN
+        if not len(s):
+            bits |= EMPTY
+        return bits
@@ -0,0 +1,180 @@
+"""
+Runs findall and finditer on parts of a large string in several processes.
+
+The string is split into chunks, and a worker searches every chunk from its start, together with some context around
+it for look-behind and look-ahead. The results are then merged in order. Where finditer would not start searching at
+the start of a chunk, because the last match of the previous chunk ran into it, the matches are searched for again in
+this process until one is found that the worker found as well. From there on the results of the worker are the same
+as those of finditer.
+"""
+
+import collections
+import concurrent.futures
+import itertools
+import os
+
+from . import _Scanner
+
+# Chunks are not made smaller than this, so small strings are not sent to other processes for nothing
+MIN_CHUNK = 1 << 16
+# Number of chunks per worker that are submitted ahead of the one that is merged, only these are copied at a time
+AHEAD = 2
+
+
+def chunk_bounds(subject, chunks, separator=None):
+    # the (start, end) of every chunk, when separator is given chunks end right after one. The last chunk ends after
+    # the string, so that an empty match at its end belongs to it.
+    size = max(len(subject) // chunks, MIN_CHUNK)
+    bounds = []
+    start = 0
+    while start < len(subject):
+        end = start + size
+        if separator is not None and end < len(subject):
+            end = subject.find(separator, end)
+            end = len(subject) if end == -1 else end + len(separator)
+        end = min(end, len(subject))
+        bounds.append((start, end))
+        start = end
+    if not bounds:
+        return [(0, 1)]
+    bounds[-1] = (bounds[-1][0], len(subject) + 1)
+    return bounds
+
+
+def _shift(res, offset):
+    start, end, marks = res
+    return start + offset, end + offset, tuple(None if mark is None else mark + offset for mark in marks)
+
+
+def chunk_matches(pattern, piece, offset, start, end, last):
+    """
+    Searches piece, which is the part of the string starting at offset, from start. Returns the matches that start
+    before end, as (start, end, marks) in positions of the whole string, and the position up to which these are all
+    matches. This is end, unless a match runs to the end of piece, so more of the string might change it. last is true
+    if piece runs to the end of the string.
+    """
+    found = []
+    for res in _Scanner(pattern, piece, pos=start - offset)._iter():
+        res = _shift(res, offset)
+        if res[0] >= end:
+            break
+        if res[1] >= offset + len(piece) and not last:
+            return found, res[0]
+        found.append(res)
+    return found, end
+
+
+def merge(pattern, subject, bounds, results):
+    """
+    Yields the matches of finditer as (start, end, marks), results gives the result of chunk_matches for every
+    chunk in bounds.
+    """
+    # where finditer would continue searching, and whether the last match was empty
+    frontier, last_empty = 0, False
+    for (start, end), (found, upto) in zip(bounds, results):
+        if frontier < start or (frontier == start and not last_empty):
+            # no match starts between frontier and start, so finditer would find the same as the worker
+            yield from found
+            if found:
+                frontier, last_empty = found[-1][1], found[-1][0] == found[-1][1]
+            if upto == end:
+                continue
+            found = []
+        # search from frontier, until a match is found that the worker found too
+        known = {res[:2]: i for i, res in enumerate(found)}
+        scanner = None
+        while True:
+            if scanner is None:
+                scanner = _Scanner(pattern, subject, pos=frontier)
+                scanner._last_empty = last_empty
+            res = scanner._next(pattern._search)
+            if res is None:
+                return
+            if res[0] >= end:
+                if frontier < end:
+                    frontier, last_empty = end, False
+                break
+            yield res
+            frontier, last_empty = res[1], res[0] == res[1]
+            i = known.get(res[:2])
+            if i is not None and res[0] < upto:
+                yield from found[i + 1 :]
+                if len(found) > i + 1:
+                    frontier, last_empty = found[-1][1], found[-1][0] == found[-1][1]
+                if upto == end:
+                    break
+                # the worker stopped before end, continue on our own
+                known = {}
+                scanner = None
+
+
+def raw_finditer_parallel(pattern, string, workers=None, separator=None, max_match_len=None, executor=None):
+    # the matches of finditer as (start, end, marks), found by workers
+    if max_match_len is None and separator is None:
+        if pattern._info["max"] == "MAXREPEAT" or pattern._info["has_assert"]:
+            raise ValueError(
+                "max_match_len or separator is needed for patterns without a maximal width or with asserts"
+            )
+        max_match_len = pattern._info["max"]
+    # characters around a chunk that look-behind, look-ahead and \b can look at
+    context = (max_match_len if max_match_len is not None else len(separator)) + 1
+    subject = pattern._subject(string)
+    workers = workers or os.cpu_count() or 1
+    # more chunks than workers, so that a chunk with many matches does not keep the others waiting
+    bounds = chunk_bounds(subject, 4 * workers, separator)
+    if len(bounds) == 1 or (workers == 1 and executor is None):
+        yield from _Scanner(pattern, string)._iter()
+        return
+
+    def submit(start, end):
+        offset = max(start - context, 0)
+        piece = subject[offset : end + context]
+        return executor.submit(chunk_matches, pattern, piece, offset, start, end, end + context >= len(subject))
+
+    def results():
+        # chunks are only sliced when they are submitted, the results come back in order
+        todo = iter(bounds)
+        for start, end in itertools.islice(todo, AHEAD * workers):
+            pending.append(submit(start, end))
+        while pending:
+            res = pending.popleft().result()
+            for start, end in itertools.islice(todo, 1):
+                pending.append(submit(start, end))
+            yield res
+
+    own = executor is None
+    if own:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    pending = collections.deque()
+    try:
+        yield from merge(pattern, subject, bounds, results())
+    finally:
+        # the rest of the chunks is not needed when the caller stops early
+        for future in pending:
+            future.cancel()
+        if own:
+            executor.shutdown()
+
+
+def findall_parallel(self, string, workers=None, separator=None, max_match_len=None, executor=None):
+    """
+    Like findall, but the string is searched by several processes at once.
+    The string is split into chunks. When separator is given chunks end right after it, and matches and their
+    look-around should not contain it. Otherwise max_match_len is an upper bound on the length of a match together with
+    its look-ahead and look-behind, by default the maximal width of the pattern if that is known.
+    workers is the number of processes, by default the number of CPUs. An existing concurrent.futures.Executor can be
+    given instead, then workers only sets the number of chunks. The pattern is pickled, so it is compiled again in every process.
+    """
+    self._check_type(string)
+    return self._findall_list(
+        string, raw_finditer_parallel(self, string, workers, separator, max_match_len, executor)
+    )
+
+
+def finditer_parallel(self, string, workers=None, separator=None, max_match_len=None, executor=None):
+    """
+    Like finditer, but the string is searched by several processes at once, see findall_parallel.
+    """
+    self._check_type(string)
+    for start, end, marks in raw_finditer_parallel(self, string, workers, separator, max_match_len, executor):
+        yield self._new_match(string, 0, None, start, end, marks)
@@ -0,0 +1,139 @@
+"""
+A Pike VM (Thompson NFA simulation with captures) for patterns that do not need backtracking.
+
+All threads advance through the string in lockstep, one character at a time. Every thread carries its own loop
+counters, the start of its match and its marks. Two threads at the same instruction with the same counters will
+behave identically from here on, so only the one with the highest priority is kept. This bounds the number of
+threads by the size of the program and makes the running time linear in the length of the string, independent of
+how much the backtracker would have to try.
+The order of the threads is their priority, as soon as a thread reaches a match all threads after it are dropped.
+This gives the same leftmost-first behavior, including the groups, as the backtracker and `re`.
+
+Unlike the DFA nothing is cached between calls, so this engine is slower on average but never needs the `done` set.
+"""
+
+from .constants import *
+from .nfa import *
+from . import nfa
+
+
+class PikeVM(nfa.Automaton):
+    captures = True
+
+    def __init__(self, program, matcher=None, groups=0):
+        super().__init__(program, matcher, groups=groups)
+        self.start_counters = (None,) * program["counters"]
+        self.start_marks = (None,) * program["marks"]
+        # Marks of groups that can match the empty string, whether they were set at the current position is part of
+        # the state. Without this a loop could not take the extra empty iteration that `re` allows.
+        self.statemarks = [m for m in program["statemarks"] if m < program["marks"]]
+
+    def closure(self, threads, prev, bits, char, pos):
+        """
+        Follows all epsilon steps from the threads (pc, counters, start, marks), in order of priority.
+        Returns the threads that want to consume a character and the (start, marks) of the match that was reached,
+        or None if there is none.
+        While following the epsilon steps a thread also carries the loop heads it passed at this position, see
+        nfa.Automaton.enter. These decide where it leaves a loop, so they are part of the state.
+        """
+        code = self.code
+        loops = self.loops
+        todo = [thread + (0,) for thread in reversed(threads)]
+        seen = set()
+        consumers = []
+        while todo:
+            pc, counters, start, marks, entered = todo.pop()
+            if pc in loops:
+                pc, entered = self.enter(pc, entered)
+            if self.statemarks:
+                key = (pc, counters, entered, tuple(marks[m] == pos for m in self.statemarks))
+            else:
+                key = (pc, counters, entered)
+            if key in seen:
+                continue
+            seen.add(key)
+            ins = code[pc]
+            op = ins[0]
+            if op is I_CHAR:
+                consumers.append((pc, counters, start, marks))
+            elif op is I_MATCH:
+                if bits & ALLOWED:
+                    # All threads with a lower priority are not needed anymore
+                    return consumers, (start, marks)
+            elif op is I_SPLIT:
+                todo += [(target, counters, start, marks, entered) for target in reversed(ins[1])]
+            elif op is I_JUMP:
+                todo.append((ins[1], counters, start, marks, entered))
+            elif op is I_MARK:
+                mark = ins[1]
+                marks = marks[:mark] + (pos,) + marks[mark + 1 :]
+                todo.append((ins[2], counters, start, marks, entered))
+            elif op is I_AT:
+                if self.at(ins[1], prev, bits, char):
+                    todo.append((ins[2], counters, start, marks, entered))
+            elif op is I_SET_COUNTER:
+                counter = ins[1]
+                counters = counters[:counter] + (ins[2],) + counters[counter + 1 :]
+                todo.append((ins[3], counters, start, marks, entered))
+            elif op is I_JUMP_IF_COUNTER:
+                counter = ins[1]
+                value = counters[counter] - 1
+                counters = counters[:counter] + (value,) + counters[counter + 1 :]
+                if value > 0:
+                    todo.append((ins[2], counters, start, marks, entered))
+                else:
+                    todo.append((ins[3], counters, start, marks, entered))
+        return consumers, None
+
+    def run(self, s, pos, endpos, full=False, nonempty=False, unanchored=False):
+        """
+        Runs the VM from pos, if unanchored a new thread is started at every position until a match is found.
+        Returns (start, end, marks) of the leftmost-first match or None if there is no match.
+        """
+        code = self.code
+        conditions = self.conditions
+        prev = self.prev_at(s, pos)
+        threads = [(0, self.start_counters, pos, self.start_marks)]
+        first = pos
+        best = None
+        while True:
+            if pos < endpos:
+                char = self.char(s, pos)
+                allowed = not full and not (nonempty and pos == first)
+            else:
+                char = self.char(s, pos) if pos < len(s) else None
+                allowed = (not full or pos == endpos) and not (nonempty and pos == first)
+            bits = self.bits(s, pos, endpos, allowed)
+            consumers, matched = self.closure(threads, prev, bits, char, pos)
+            if matched is not None:
+                best = matched[0], pos, matched[1]
+            if pos >= endpos:
+                break
+            threads = [
+                (code[pc][2], counters, start, marks)
+                for pc, counters, start, marks in consumers
+                if conditions[code[pc][1]](char, 0)
+            ]
+            prev = self.prev_bits(char)
+            pos += 1
+            if unanchored and best is None:
+                # the new thread has the lowest priority, any match that started earlier wins
+                threads.append((0, self.start_counters, pos, self.start_marks))
+            elif not threads:
+                break
+        return best
+
+    def match(self, s, pos=0, endpos=None, full=False, nonempty=False):
+        # returns (end, marks) or None
+        endpos = len(s) if endpos is None else min(endpos, len(s))
+        res = self.run(s, pos, endpos, full=full, nonempty=nonempty)
+        if res is None:
+            return None
+        return res[1], res[2]
+
+    def search(self, s, pos=0, endpos=None, nonempty_first=False):
+        # returns (start, end, marks) or None
+        endpos = len(s) if endpos is None else min(endpos, len(s))
+        if pos > endpos:
+            return None
+        return self.run(s, pos, endpos, nonempty=nonempty_first, unanchored=True)
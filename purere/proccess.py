@@ -6,6 +6,7 @@ from .stdlib import sre_compile
 from .stdlib import sre_parse
 
 from .constants import *
+from . import topy
 
 
 
@@ -46,6 +47,32 @@ def apply_func_ast(command_list,func):
         new_pattern.data += func(opcode,args)
     return new_pattern
 
+# The flags that can be set for a part of a pattern, like (?i:...)
+SCOPED_FLAGS = (
+    SRE_FLAG_IGNORECASE | SRE_FLAG_LOCALE | SRE_FLAG_MULTILINE | SRE_FLAG_DOTALL | SRE_FLAG_ASCII | SRE_FLAG_UNICODE
+)
+
+
+def combine_patterns(patterns, flags=0):
+    """
+    Combines parsed patterns into a single pattern that is a branch of all of them, used by RegexSet.
+    Every pattern is put in a non-capturing group that sets its flags. The patterns keep their own group numbers, so
+    they share the marks, only one of them matches at a time anyway.
+    The first alternative never matches, so that every pattern starts at a target of the branch.
+    """
+    state = sre_parse.State()
+    state.flags = flags
+    state.groupwidths = [None] * max([pattern.state.groups for pattern in patterns] + [1])
+    maxchar = 0xFF if flags & SRE_FLAG_BYTE_PATTERN else 0x10FFFF
+    alternatives = [sre_parse.SubPattern(state, [(IN, [(NEGATE, None), (RANGE, (0, maxchar))])])]
+    for pattern in patterns:
+        # the subpatterns keep the state of their own pattern, which has the widths of its groups
+        alternatives.append(
+            sre_parse.SubPattern(state, [(SUBPATTERN, (None, pattern.state.flags & SCOPED_FLAGS, 0, pattern))])
+        )
+    return sre_parse.SubPattern(state, [(BRANCH, (None, alternatives))])
+
+
 def split_repeats(opcode,args):
     # We split optional and required parts of repeats
     if opcode in {MAX_REPEAT, MIN_REPEAT}:
@@ -149,6 +176,7 @@ opcode_size = {
     ABS_REPEAT_ANY_ALL: (2,0),
     MIN_REPEAT_ONE: (2,0),
     ABS_REPEAT_ONE: (2,0),
+    ABS_POSSESSIVE_REPEAT_ONE: (2,0),
     REPEAT: (2,1),
     REPEAT_FIXED:(1,1), 
     REPEAT_MIN_BOUNDED: (1,1), 
@@ -414,3 +442,110 @@ def optimize_any(code,i,opcode,args,substart,subend,mapping={}):
                 code[i] = ABS_REPEAT_ANY_ALL
             code[i+1] = code[i+1] + i+1
             code[i+4:subend] = (NOP,)*(subend-i-4)
+
+
+# The categories that have no character in common, and those of which the first is contained in the second.
+# These hold for the ASCII and the unicode versions alike, see topy.get_category_condition
+DISJOINT_CATEGORIES = {("DIGIT", "SPACE"), ("WORD", "SPACE"), ("DIGIT", "LINEBREAK"), ("WORD", "LINEBREAK")}
+CONTAINED_CATEGORIES = {("DIGIT", "WORD"), ("LINEBREAK", "SPACE")}
+def _category_disjoint(cat1, cat2):
+    # True if the categories can not contain the same character
+    parts1, parts2 = str(cat1).split("_"), str(cat2).split("_")
+    if "LOC" in parts1 or "LOC" in parts2:
+        return False
+    neg1, neg2 = "NOT" in parts1, "NOT" in parts2
+    if neg1 and neg2:
+        return False
+    if neg1:
+        parts1, parts2, neg1, neg2 = parts2, parts1, neg2, neg1
+    kind1, kind2 = parts1[-1], parts2[-1]
+    if not neg2:
+        return (kind1, kind2) in DISJOINT_CATEGORIES or (kind2, kind1) in DISJOINT_CATEGORIES
+    # The ASCII and unicode versions of a category differ, x is in not-y only if both are the same version
+    return ("UNI" in parts1) == ("UNI" in parts2) and (kind1 == kind2 or (kind1, kind2) in CONTAINED_CATEGORIES)
+
+
+def chars_disjoint(code1, i1, code2, i2, flags=0):
+    """
+    True if no character matches both the character opcode at code1[i1] and the one at code2[i2].
+    False if they do or if this is not known.
+    """
+    listed1, listed2 = topy.listed_chars(code1, i1), topy.listed_chars(code2, i2)
+    if listed1 is None and listed2 is None:
+        return False
+    if (listed1 is None and listed2[1]) or (listed2 is None and listed1[1]):
+        # categories can only be compared to other categories
+        return False
+    if listed1 is not None and listed2 is not None:
+        if not all(_category_disjoint(cat1, cat2) for cat1 in listed1[1] for cat2 in listed2[1]):
+            return False
+    if listed1 is not None and listed1[0]:
+        check = topy.char_checker(code2, i2, flags=flags)
+        if any(check(char) for char in listed1[0]):
+            return False
+    if listed2 is not None and listed2[0]:
+        check = topy.char_checker(code1, i1, flags=flags)
+        if any(check(char) for char in listed2[0]):
+            return False
+    return True
+
+
+def _first_char(parts, partnum, flags=0):
+    """
+    Follows the code from the start of parts[partnum] to the first opcode that takes a character.
+    Returns (code, index) of that opcode, "end" if the match succeeds before any character is taken,
+    or None if this is not known, for instance because of a branch.
+    """
+    seen = set()
+    at = False
+    while partnum not in seen:
+        seen.add(partnum)
+        part = parts[partnum]
+        if topy.is_end(part):
+            # a shorter repeat might pass an AT that the longest one fails, like in \w+\B
+            return None if at else "end"
+        for i in topy.part_opcodes(part, flags=flags):
+            opcode = part[i]
+            if opcode is MARK:
+                continue
+            if opcode is AT:
+                # does not take a character, and can only fail
+                at = True
+                continue
+            if opcode is ABS_JUMP:
+                partnum = part[i + 1]
+                break
+            if opcode is ABS_REPEAT_ONE or opcode is ABS_POSSESSIVE_REPEAT_ONE:
+                # the first repetition takes the first character
+                return (part, i + 4) if part[i + 2] > 0 else None
+            if opcode is LITERALS:
+                return [LITERAL, part[i + 1][0]], 0
+            if opcode in {IN, ANY, ANY_ALL} or "LITERAL" in str(opcode).split("_"):
+                return part, i
+            return None
+        else:
+            # fall through to the next part
+            partnum += 1
+            if partnum >= len(parts):
+                return None
+    return None
+
+
+def possessive_repeats(parts, flags=0):
+    """
+    Changes a greedy repeat of a single character into ABS_POSSESSIVE_REPEAT_ONE when no character that it takes can
+    start what comes after it. Taking fewer repetitions would then always fail on the next character, so the repeat
+    does not have to put its shorter versions on the stack. A repeat at the end of the pattern can also take as many
+    repetitions as possible, see topy.is_linear. Changes parts in place.
+    """
+    for part in parts:
+        for i in topy.part_opcodes(part, flags=flags):
+            if part[i] is not ABS_REPEAT_ONE:
+                continue
+            nextpart, minrep, maxrep = part[i + 1 : i + 4]
+            if maxrep is not MAXREPEAT and maxrep == minrep:
+                # nothing is pushed anyway
+                continue
+            first = _first_char(parts, nextpart, flags=flags)
+            if first == "end" or (first is not None and chars_disjoint(part, i + 4, *first, flags=flags)):
+                part[i] = ABS_POSSESSIVE_REPEAT_ONE
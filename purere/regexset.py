@@ -0,0 +1,109 @@
+"""
+RegexSet, which searches for many patterns in a single pass over the string.
+"""
+
+from . import compiler
+from . import _compile, _forget_done, _CharsetScanner, _LiteralScanner
+
+
+class RegexSet:
+    """
+    A list of patterns that are searched for together.
+
+    The patterns are combined into one branch. The generated code records every alternative that matches and then
+    backtracks as if the match failed, so at every candidate position all patterns are tried in one call. The
+    candidate positions are found with the literals, or else the characters, that the patterns start with, of all
+    patterns at once. Only the patterns that can start with the character at a position, and that did not match yet,
+    are tried there.
+    """
+
+    def __init__(self, patterns, flags=0):
+        self.patterns = [_compile(pattern, flags) for pattern in patterns]
+        self.flags = flags
+        if len({pattern._basetype for pattern in self.patterns}) > 1:
+            raise TypeError("cannot combine str and bytes patterns")
+        self._function = None
+        if not self.patterns:
+            return
+        info, self._function = compiler.compile_set([(pattern.pattern, pattern.flags) for pattern in self.patterns])
+        self._info = info
+        # the part where every pattern starts, and the other way around
+        self._starts = info["set_starts"]
+        self._index = {part: index for index, part in enumerate(self._starts)}
+        # the patterns by the character they start with, the others can start anywhere
+        self._by_first = {}
+        self._anywhere = []
+        for index, chars in enumerate(info["set_firsts"]):
+            if chars is None:
+                self._anywhere.append(index)
+            for char in chars or ():
+                self._by_first.setdefault(char, []).append(index)
+        checker = info["prefix_checker"]
+        self._charset = _CharsetScanner(checker, self.patterns[0]._basetype == bytes) if checker else None
+        self._literals = _LiteralScanner(info["literals"]) if info.get("literals") else None
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def __repr__(self):
+        return f"purere.RegexSet({[pattern.pattern for pattern in self.patterns]!r})"
+
+    def _candidates(self, string, pos, endpos):
+        if self._literals is not None:
+            return self._literals.candidates(string, pos, endpos)
+        if self._charset is not None:
+            return self._charset.candidates(string, pos, endpos)
+        return range(pos, endpos + 1)
+
+    def _first(self, string, pos, endpos):
+        # the first match of every pattern that has one, as {index: (start, end, marks)}
+        self.patterns[0]._check_type(string)
+        subject = self.patterns[0]._subject(string)
+        pos = min(pos, len(subject))
+        endpos = len(subject) if endpos is None else min(endpos, len(subject))
+        # As in _Scanner, what was done can not be kept for patterns with asserts
+        keep = not self._info["has_assert"]
+        first = {}
+        done = None
+        by_first = self._by_first
+        anywhere = self._anywhere
+        for start in self._candidates(subject, pos, endpos):
+            todo = by_first.get(subject[start], ()) if start < endpos else ()
+            todo = [self._starts[i] for i in [*todo, *anywhere] if i not in first]
+            if not todo:
+                continue
+            found = []
+            done = _forget_done(done, start) if keep else None
+            done = self._function(subject, pos=start, endpos=endpos, done=done, found=found, starts=todo)[3]
+            for part, end, marks in found:
+                index = self._index[part]
+                if index not in first:
+                    first[index] = (start, end, marks)
+            if len(first) == len(self.patterns):
+                break
+        return first
+
+    def matches(self, string, pos=0, endpos=None):
+        """
+        Returns the sorted indices of the patterns that match somewhere in string, like search does.
+        """
+        if self._function is None:
+            return []
+        return sorted(self._first(string, pos, endpos))
+
+    def first_matches(self, string, pos=0, endpos=None):
+        """
+        Returns a list with for every pattern the Match that its search would return, or None.
+        """
+        if self._function is None:
+            return []
+        first = self._first(string, pos, endpos)
+        res = []
+        for index, pattern in enumerate(self.patterns):
+            if index not in first:
+                res.append(None)
+                continue
+            start, end, marks = first[index]
+            # the marks are shared by all patterns
+            res.append(pattern._new_match(string, pos, endpos, start, end, marks[: 2 * pattern.groups]))
+        return res
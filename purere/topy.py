@@ -32,13 +32,24 @@ def get_val(offset=0, flags=0):
     return val
 
 
+# Characters in the categories that only contain a few characters, computed once from the checks below.
+# For str patterns these are tested with a constant set, python stores it as a frozenset so this is a single lookup
+CATEGORY_CHARS = {
+    "DIGIT": frozenset(c for c in range(128) if "0" <= chr(c) <= "9"),
+    "SPACE": frozenset(c for c in range(128) if chr(c).isspace() and not 0x1C <= c <= 0x1F),
+    "WORD": frozenset(c for c in range(128) if chr(c).isalnum() or c == 95),
+    "LINEBREAK": frozenset([0x0A]),
+    "UNI_LINEBREAK": frozenset([*range(0x0A, 0x0E), *range(0x1C, 0x1F), 0x85, 0x2028, 0x2029]),
+}
+
+
 def get_category_condition(cat, val, flags=0):
     #For one of the buildin catogories this returns a string representing '{val} in category'
     ctopy = get_ctopy(flags)
     parts = str(cat).split("_")
     isunicode = "UNI" in parts
     negated = "NOT" in parts
-    
+
     if "WORD" in parts:
         base = f"({val}.isalnum() or {val} == {ctopy(95)})"  # 95 = '_'
     elif "SPACE" in parts and "UNI" not in parts:
@@ -48,7 +59,8 @@ def get_category_condition(cat, val, flags=0):
     elif "DIGIT" in parts:
         # for some reason the real unicode definition does not agree with ASCII on ASCII chars... see issue
         if "UNI" in parts and (flags & SRE_FLAG_STRICT_UNICODE):
-            base = f"unicodedata.category({val})=='Nd'"
+            # decimal characters are exactly the unicode category Nd
+            base = f"{val}.isdecimal()"
         elif "UNI" in parts:
             # not the real definition for unicode but close enough if unicode data is not avalible
             base = f"{val}.isnumeric()"
@@ -67,7 +79,12 @@ def get_category_condition(cat, val, flags=0):
     else:
         raise NotImplementedError(f"Category not implemented: {cat}")
 
-    if not isunicode:
+    # the unicode word, space and digit categories are large, for those the str methods are faster than a table
+    table = "_".join(p for p in parts if p not in {"CATEGORY", "NOT", "LOC"})
+    if table in CATEGORY_CHARS and not flags & SRE_FLAG_BYTE_PATTERN:
+        # slices of a bytearray can not be looked up in a set, so this is only done for str
+        base = f"{val} in {{{', '.join(ctopy(c) for c in sorted(CATEGORY_CHARS[table]))}}}"
+    elif not isunicode:
         base = f"(num({val})<128 and {base})"
     if negated:
         return f"not {base}"
@@ -174,15 +191,172 @@ def literals_to_cond(code, i, flags=0):
     return pre, conditions, neged, i
 
 
-def part_to_py(part, partnum, flags=0, statemarks={}):
+# Sets with more characters than this are not listed one by one
+MAX_LISTED_CHARS = 1024
+
+
+def listed_chars(code, i):
+    """
+    Splits the character opcode at code[i] into a set of character codes and a list of categories, such that it
+    matches exactly the characters that are in the set or in one of the categories.
+    Returns None if it can not be split like this, for instance because it is negated or ignores case.
+    """
+    opcode = code[i]
+    if opcode is LITERAL:
+        return {code[i + 1]}, []
+    if opcode is not IN:
+        return None
+    chars, categories = set(), []
+    j, end = i + 2, i + 1 + code[i + 1]
+    while j < end and code[j] is not FAILURE:
+        opcode = code[j]
+        if opcode is LITERAL:
+            chars.add(code[j + 1])
+            j += 2
+        elif opcode is RANGE:
+            chars.update(range(code[j + 1], code[j + 2] + 1))
+            j += 3
+        elif opcode is CATEGORY:
+            categories.append(code[j + 1])
+            j += 2
+        elif opcode is CHARSET:
+            chars.update(32 * word + bit for word in range(8) for bit in range(32) if code[j + 1 + word] >> bit & 1)
+            j += 9
+        else:
+            return None
+        if len(chars) > MAX_LISTED_CHARS:
+            return None
+    return chars, categories
+
+
+def char_checker(code, i, flags=0):
+    # returns a function that tells if the character opcode at code[i] matches the character with the given code
+    pre, conditions, neged, _ = literals_to_cond(code, i, flags=flags)
+    lines = ["num = lambda x: x[0]" if flags & SRE_FLAG_BYTE_PATTERN else "num = ord", "def check(s, pos):"]
+    lines += indent(pre + [f"return {'not ' if neged else ''}({' or '.join(conditions)})"], 1)
+    code = "\n".join(lines)
+    res = {}
+    exec(code, res)
+    check = res["check"]
+    if flags & SRE_FLAG_BYTE_PATTERN:
+        return lambda char: bool(check(bytes([char]), 0))
+    return lambda char: bool(check(chr(char), 0))
+
+
+# Negations of at most this many characters find the end of a run with find
+MAX_RUN_STOPS = 3
+# Sets of at most this many characters find the end of a run with lstrip
+MAX_RUN_STRIP = 256
+# The first slice of the string that is checked at once, it doubles while the run goes on.
+# Before that, this many characters are checked one by one, which is faster for short runs
+RUN_SLICE = 16
+# Checks if a whole slice is in a unicode category, see run_to_py
+RUN_METHODS = {
+    CATEGORY_UNI_SPACE: "rest.isspace()",
+    CATEGORY_UNI_WORD: "rest.replace('_','a').isalnum()",
+}
+
+
+def run_to_py(body, flags=0):
+    """
+    Returns lines that move pos to the end of the run of characters from pos that match body, the code of a single
+    character, without passing endpos. These use lstrip for small sets, find for negations of a few characters, and for
+    unicode categories a string method on slices that double in size while the run goes on.
+    Returns None if none of these apply, then every character has to be checked on its own.
+    """
+    isbytes = flags & SRE_FLAG_BYTE_PATTERN
+    check = char_checker(body, 0, flags=flags)
+    listed = listed_chars(body, 0)
+    negated = None
+    if body[0] is NOT_LITERAL:
+        negated = {body[1]}, []
+    elif body[0] is IN and body[2] is NEGATE:
+        negated = listed_chars([IN, body[1] - 1] + body[3:], 0)
+    if isbytes:
+        chars = {char for char in range(256) if check(char)}
+        stops = set(range(256)) - chars
+    else:
+        # ASCII categories only contain characters below 128
+        ascii = listed is not None and not any("UNI" in str(cat).split("_") for cat in listed[1])
+        chars = {char for char in range(128) if check(char)} | listed[0] if ascii else None
+        stops = negated[0] if negated is not None and not negated[1] else None
+
+    def literal(chars):
+        return repr(bytes(sorted(chars))) if isbytes else repr("".join(map(chr, sorted(chars))))
+
+    if stops is not None and len(stops) == 1:
+        return [f"runend = s.find({literal(stops)},pos,endpos)", "pos = endpos if runend == -1 else runend"]
+    if stops is not None and len(stops) <= MAX_RUN_STOPS:
+        return [
+            "runend = endpos",
+            f"for stop in ({','.join(literal([stop]) for stop in sorted(stops))}):",
+            " stop = s.find(stop,pos,runend)",
+            " if stop != -1:",
+            "  runend = stop",
+            "pos = runend",
+        ]
+    if chars is not None and len(chars) <= MAX_RUN_STRIP:
+        return [
+            f"chunk = {RUN_SLICE}",
+            "while pos < endpos:",
+            " rest = s[pos:min(endpos,pos+chunk)]",
+            f" stripped = rest.lstrip({literal(chars)})",
+            " pos += len(rest)-len(stripped)",
+            " if stripped:",
+            "  break",
+            " chunk *= 2",
+        ]
+    if isbytes or listed is None or listed[0] or len(listed[1]) != 1:
+        return None
+    cat = listed[1][0]
+    if cat is CATEGORY_UNI_DIGIT:
+        # isdecimal are the characters in category Nd
+        method = "rest.isdecimal()" if flags & SRE_FLAG_STRICT_UNICODE else "rest.isnumeric()"
+    elif cat in RUN_METHODS:
+        method = RUN_METHODS[cat]
+    else:
+        return None
+    # The slice shrinks again once it is not completely in the category, the last few characters are checked one by one
+    return [
+        f"chunk = {RUN_SLICE}",
+        "while pos < endpos:",
+        " rest = s[pos:min(endpos,pos+chunk)]",
+        f" if {method}:",
+        "  pos += len(rest)",
+        "  chunk *= 2",
+        f" elif chunk > {RUN_SLICE}:",
+        "  chunk //= 2",
+        " else:",
+        "  break",
+        "while True:",
+    ] + indent([line for line in part_to_py(body, 0, flags=flags, linear=True) if "part +=" not in line], 1)
+
+
+def part_to_py(
+    part,
+    partnum,
+    flags=0,
+    statemarks={},
+    state=",marks,smarks,loops",
+    linear=False,
+    memo=(),
+    exit=(),
+    collect=False,
+    visited=None,
+    loop_exits={},
+):
     """
     Compiles the main code in a part. Returns a list.
+    state are the variables besides part and pos that are saved on the stack.
+    memo are the lines that record the visit of this part in done, see memo_layout.
+    visited gives the condition that a part was already visited in the current state, see loop_exits.
+    linear parts are compiled for a function without stack and done set, see is_linear.
+    In that case marks and loops are lists.
+    exit are the lines that run before the function returns a match, see parts_to_py.
+    With collect a match is appended to found as (alternative, end, marks), after which the part fails.
     """
 
-    lines = [
-        #"if (part,pos,smarks,loops) in done: break",
-        "done.add((part,pos,smarks,loops))",
-    ]
+    lines = list(memo)
     emit = lines.append
     oldi = 0
     i = 0
@@ -199,6 +373,12 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
         i += 1
         if opcode is ABS_JUMP:
             to = part[i]
+            if to in loop_exits and to <= partnum and visited is not None:
+                # The body of the loop matched the empty string, like `re` the loop then ends instead of starting the
+                # same iteration forever
+                emit(f"if {visited(to)}:")
+                emit(f" part = {loop_exits[to]}")
+                emit(" continue")
             emit(f"part = {to}")
             if to < partnum:
                 # skip to start only if we need to go back in partnum
@@ -211,9 +391,9 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
             if len(to) > 1:
                 revlist = to[::-1]
                 emit(f"for target in {revlist}:")
-                emit("  stack.append((target,pos,marks,smarks,loops))")
+                emit(f"  stack.append((target,pos{state}))")
             else:
-                emit(f"stack.append(({to[0]},pos,marks,smarks,loops))")
+                emit(f"stack.append(({to[0]},pos{state}))")
             i += 1
         elif (
             "ANY" == str(opcode).split("_")[0]
@@ -289,14 +469,8 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
                     now_word = get_category_condition("WORD", val, flags)
                     was_word = get_category_condition("WORD", preval, flags)
                 emit("if len(s) == 0: break")
-                emit(f"at_b = (pos == 0 and {now_word})")
-                emit(f"at_b = at_b or (pos == len(s) and {was_word})")
-                emit(
-                    f"at_b = at_b or (not(pos==0 or pos==len(s)) and not({now_word}) and {was_word})"
-                )
-                emit(
-                    f"at_b = at_b or (not(pos==0 or pos==len(s)) and {now_word} and not({was_word}))"
-                )
+                # each side is checked at most once, outside the string counts as not a word
+                emit(f"at_b = (pos < len(s) and {now_word}) != (pos > 0 and {was_word})")
 
                 if "NON" in str(arg):
                     emit("if at_b:")
@@ -320,21 +494,36 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
                 #f"if not(s.startswith({teststr},pos)): break"
             )
             emit(f"pos += {arglen}")
+        elif opcode is SUCCESS and collect:
+            emit("if ((full and pos == endpos) or not full) and (not nonempty or pos!=startpos):")
+            emit(" found.append((alt,pos,marks))")
+            emit_fail()
+            emit_comment()
+            break
         elif opcode is SUCCESS:
             emit(
                 "if ((full and pos == endpos) or not full) and (not nonempty or pos!=startpos):"
             )
-            emit(" return True,pos,marks,done")
+            for line in exit:
+                emit(" " + line)
+            emit(f" return True,pos,{'tuple(marks)' if linear else 'marks'},done")
             emit("else:")
             emit(" break")
             emit_comment()
             break
         elif opcode is MARK:
             tomark = part[i]
-            emit(f"marks = marks[:{tomark}]+ (pos,) +marks[{tomark+1}:]")
-            if tomark in statemarks:
+            if linear:
+                emit(f"marks[{tomark}] = pos")
+            else:
+                emit(f"marks = marks[:{tomark}]+ (pos,) +marks[{tomark+1}:]")
+            if tomark in statemarks and not linear:
                 stomark = statemarks[tomark]
-                emit(f"smarks = smarks[:{stomark}]+ (pos,) +smarks[{stomark+1}:]")
+                # smarks is a single integer, with digit stomark (in base R) equal to the mark plus one
+                if stomark:
+                    emit(f"smarks += (pos+1-smarks//R{stomark}%R)*R{stomark}")
+                else:
+                    emit("smarks += pos+1-smarks%R")
             i += 1
         elif opcode is GROUPREF:
             group = part[i]
@@ -355,9 +544,13 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
             i += 1
             emit(f"submatch = s[marks[{group*2}]:marks[{group*2+1}]]")
             emit("nextpart = s[pos:pos+len(submatch)]")
-            emit(
-                "if not all((a == b or (a<128 and b<128 and a.lower() == b.lower())) for a,b in zip(nextpart,submatch)):"
-            )
+            if flags & SRE_FLAG_BYTE_PATTERN:
+                # lower only changes ASCII letters of bytes
+                emit("if not nextpart.lower() == submatch.lower():")
+            else:
+                emit(
+                    "if len(nextpart) != len(submatch) or not all((a == b or (a<'\\x80' and b<'\\x80' and a.lower() == b.lower())) for a,b in zip(nextpart,submatch)):"
+                )
             emit_fail(indent=1)
             emit("pos+=len(submatch)")
         elif opcode is ABS_GROUPREF_EXISTS:
@@ -366,13 +559,16 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
             emit(f"if marks[{group*2+1}] == None:")
             emit(f" part = {jumploc}")
             emit(" continue")
-        elif opcode is ABS_REPEAT_ONE:
+        elif opcode is ABS_REPEAT_ONE or opcode is ABS_POSSESSIVE_REPEAT_ONE:
             # handle REPEAT_ONE directly as we can easily loop localy
             nextpart, minrep,maxrep = part[i:i+3]
+            # a possessive repeat never needs fewer repetitions, see proccess.possessive_repeats
+            possessive = linear or opcode is ABS_POSSESSIVE_REPEAT_ONE
                         
-            looplines = part_to_py(part[i+3:-1],0,flags=flags)
+            looplines = part_to_py(part[i+3:-1],0,flags=flags,linear=True)
             looplines = [line for line in looplines if "part +=" not in line]
-            looplines = [line for line in looplines if "done.add" not in line]
+            # the end of an unbounded run can often be found without a loop over the characters
+            run = run_to_py(part[i+3:-1], flags=flags) if maxrep is MAXREPEAT and minrep != maxrep else None
             
             if minrep>0:
                 emit("correct = False")
@@ -382,29 +578,62 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
                 emit(" correct = True")
                 emit("if not correct:")
                 emit_fail(indent=1)       
-            if maxrep!=minrep:
+            if run is not None:
+                # short runs are faster with the loop, the bulk code only takes over after RUN_SLICE characters
+                run = [f"for rep in range({RUN_SLICE}):"] + indent(looplines, 1) + ["else:"] + indent(run, 1)
+            if run is not None and possessive:
+                lines += run
+            elif run is not None:
+                # like ABS_REPEAT_ANY, all lengths are pushed at once and the longest is popped first
+                emit("runstart = pos")
+                lines += run
+                emit(f"stack += [({nextpart},newpos{state}) for newpos in range(runstart,pos+1)]")
+                emit("break")
+                i = len(part)
+                emit_comment()
+                break
+            elif maxrep!=minrep and possessive:
+                # Only the longest repetition is of interest, see is_linear
+                if maxrep is MAXREPEAT:
+                    emit("while True:")
+                else:
+                    emit(f"for rep in range({maxrep-minrep}):")
+                lines += indent(looplines,indent=1)
+            elif maxrep!=minrep:
                 emit("correct = False")
                 if maxrep is MAXREPEAT:
                     emit("while True:")
                 else:
                     emit(f"for rep in range({maxrep-minrep}):")
                 # Now we may jump out of the loop if we can not get another itteration
-                emit(f" stack.append(({nextpart},pos,marks,smarks,loops))")
+                emit(f" stack.append(({nextpart},pos{state}))")
                 lines += indent(looplines,indent=1)
                 emit("else:")
                 emit(" correct = True")
                 emit("if not correct:")
                 emit_fail(indent=1)       
             i = len(part)
+            if possessive:
+                emit(f"part = {nextpart}")
+                if nextpart <= partnum:
+                    emit("continue")
+                emit_comment()
+                break
         elif opcode is SET_COUNTER:
             counter,value = part[i:i+2]
             i+=2
-            emit(f"loops = loops[:{counter}]+ ({value},) +loops[{counter+1}:]")
+            if linear:
+                emit(f"loops[{counter}] = {value}")
+            else:
+                emit(f"loops = loops[:{counter}]+ ({value},) +loops[{counter+1}:]")
         elif opcode is ABS_JUMP_IF_COUNTER:
             counter,target = part[i:i+2]
             i+=2
             # This is always after a loop, decrease the counter first as we already did one loop
-            emit(f"loops = loops[:{counter}]+ (loops[{counter}]-1,) +loops[{counter+1}:]")
+            if linear:
+                emit(f"loops[{counter}] -= 1")
+            else:
+                emit(f"loops = loops[:{counter}]+ (loops[{counter}]-1,) +loops[{counter+1}:]")
             emit(f"if loops[{counter}] > 0:")
             emit(f" part = {target}")
             emit(f" continue")
@@ -422,7 +651,7 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
             emit("assert_stack.append((pos,len(stack)))")
             # Put a signal on the stack that if we reach this point then we have reached the end of an assert
             # After this we just continue as normal, but the top  part of the assert_stack should be poped
-            emit(f"stack.append((None,None,None,None,None))")
+            emit(f"stack.append(({'None,' * (state.count(',') + 2)}))")
             
             if offset:
                 emit(f"pos -= {offset}")
@@ -440,9 +669,9 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
                 emit(" continue")
 
             emit(f"assert_stack.append((pos,len(stack)))")
-            emit(f"stack.append(({nextpart},pos,marks,smarks,loops))")
+            emit(f"stack.append(({nextpart},pos{state}))")
             # Signal that the assert stack should be poped if we are successfull in not matching
-            emit(f"stack.append((None,None,None,None,None))")            
+            emit(f"stack.append(({'None,' * (state.count(',') + 2)}))")            
             if offset:
                 emit(f"pos -= {offset}")
 
@@ -450,6 +679,11 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
         elif opcode in {ASSERT_SUCCESS,ASSERT_FAILURE}:
             # At the end of an assert reset the stack and pos
             emit("pos, oldlen = assert_stack.pop()")
+            if flags & SRE_FLAG_STATS:
+                # the states pushed inside the assert are thrown away without being popped
+                emit("dropped += len(stack)-oldlen")
+                emit("if len(stack) > maxstack:")
+                emit(" maxstack = len(stack)")
             emit(f"stack = stack[:oldlen]")
             if opcode is ASSERT_FAILURE:
                 # at the end of a negative assert we imideatly break, as the branch we just jumped back to ahs now ended
@@ -459,15 +693,10 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
             # These can be optmized with a simple find() if avalible
             target,minrep,maxrep = part[i:i+3]
             i+=3
+            # the subject always has a find, see Pattern._subject
             ctopy = get_ctopy(flags)
-            emit("if hasattr(s,'find'):")
-            emit(f" first_nl = s.find({ctopy(10)},pos)")
-            emit(" first_nl = len(s) if first_nl == -1 else first_nl")
-            emit("else:")
-            emit(" try:") # we know it is a bytelike object as strings always have a find
-            emit(f"  first_nl = pos + next(i for i,c in enumerate(s[pos:]) if c==10)")
-            emit(" except StopIteration:")
-            emit(f"  first_nl = len(s)")
+            emit(f"first_nl = s.find({ctopy(10)},pos,endpos)")
+            emit("first_nl = endpos if first_nl == -1 else first_nl")
 
             if minrep:             # Check wether this loop is possible at all
                 emit(f"if first_nl - pos < {minrep}: break")
@@ -475,7 +704,15 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
                 emit(f"loopend = min(first_nl,pos+{maxrep})")
             else:
                 emit(f"loopend = first_nl")
-            emit(f"stack += [({target},newpos,marks,smarks,loops) for newpos in range(pos+{minrep},loopend+1)]")
+            if linear:
+                # Only the longest repetition is of interest, see is_linear
+                emit("pos = loopend")
+                emit(f"part = {target}")
+                if target <= partnum:
+                    emit("continue")
+                emit_comment()
+                break
+            emit(f"stack += [({target},newpos{state}) for newpos in range(pos+{minrep},loopend+1)]")
             emit("break")
             
 
@@ -486,12 +723,20 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
             i+=3
             ctopy = get_ctopy(flags)
             if minrep:             # Check wether this loop is possible at all
-                emit(f"if len(s) - pos < {minrep}: break")
+                emit(f"if endpos - pos < {minrep}: break")
             if maxrep is not MAXREPEAT:
-                emit(f"loopend = min(len(s),pos+{maxrep})")
+                emit(f"loopend = min(endpos,pos+{maxrep})")
             else:
-                emit(f"loopend = len(s)")
-            emit(f"stack += [({target},newpos,marks,smarks,loops) for newpos in range(pos+{minrep},loopend+1)]")
+                emit(f"loopend = endpos")
+            if linear:
+                # Only the longest repetition is of interest, see is_linear
+                emit("pos = loopend")
+                emit(f"part = {target}")
+                if target <= partnum:
+                    emit("continue")
+                emit_comment()
+                break
+            emit(f"stack += [({target},newpos{state}) for newpos in range(pos+{minrep},loopend+1)]")
             emit("break")
 
         else:
@@ -506,45 +751,358 @@ def part_to_py(part, partnum, flags=0, statemarks={}):
     return lines
 
 
+def is_end(part):
+    # True if the part only sets marks before succeeding, so it can not fail after pos changed
+    i = 0
+    while i < len(part) and part[i] is MARK:
+        i += 2
+    return i < len(part) and part[i] is SUCCESS
+
+
+def part_opcodes(part, flags=0):
+    """
+    Yields the index of every opcode in the part, the body of a repeat is skipped.
+    """
+    i = 0
+    while i < len(part):
+        yield i
+        opcode = part[i]
+        i += 1
+        if opcode in {ABS_REPEAT_ONE, ABS_POSSESSIVE_REPEAT_ONE, ABS_REPEAT_ANY, ABS_REPEAT_ANY_ALL}:
+            # the rest of the part is the body of the repeat
+            return
+        elif opcode in {SET_COUNTER, ABS_JUMP_IF_COUNTER, ABS_GROUPREF_EXISTS, ASSERT, ABS_ASSERT_NOT}:
+            i += 2
+        elif opcode in {ABS_JUMP, LS_BRANCH, LITERALS, AT, MARK, GROUPREF, GROUPREF_IGNORE, GROUPREF_UNI_IGNORE}:
+            i += 1
+        elif opcode in {SUCCESS, ASSERT_SUCCESS, ASSERT_FAILURE}:
+            pass
+        elif (
+            "ANY" == str(opcode).split("_")[0]
+            or "IN" in str(opcode).split("_")
+            or "RANGE" in str(opcode).split("_")
+            or "LITERAL" in str(opcode).split("_")
+        ):
+            _, _, _, i = literals_to_cond(part, i - 1, flags=flags)
+        else:
+            if not isinstance(opcode,_NamedIntConstant):
+                raise ValueError(f"Wrong code {opcode}")
+            raise NotImplementedError(f"Unknown opcode: {opcode}")
+
+
+def is_linear(parts, flags=0):
+    """
+    Checks if the parts can be run without ever backtracking.
+    This is the case if there are no branches or asserts, and every repeat that can take a varying number of
+    repetitions is followed directly by the end of the pattern. Such a repeat can always take as many repetitions as
+    possible: a longer match is fine for search, fullmatch and nonempty alike.
+    """
+    for part in parts:
+        for i in part_opcodes(part, flags=flags):
+            opcode = part[i]
+            if opcode in {ABS_REPEAT_ONE, ABS_REPEAT_ANY, ABS_REPEAT_ANY_ALL}:
+                target, minrep, maxrep = part[i + 1 : i + 4]
+                if (maxrep is MAXREPEAT or maxrep != minrep) and not is_end(parts[target]):
+                    return False
+            elif opcode in {LS_BRANCH, ASSERT, ABS_ASSERT_NOT, ASSERT_SUCCESS, ASSERT_FAILURE}:
+                return False
+    return True
+
+
+def backtrack_targets(parts, flags=0):
+    """
+    Returns the parts that can be put on the stack, together with part 0 where every match starts.
+    Only these parts start a run of the inner loop, from there on the code is deterministic until the next break.
+    Marking only these parts in done is therefore enough to never do the same work twice.
+    """
+    targets = {0}
+    for part in parts:
+        for i in part_opcodes(part, flags=flags):
+            opcode = part[i]
+            if opcode is LS_BRANCH:
+                targets.update(part[i + 1])
+            elif opcode is ABS_REPEAT_ONE:
+                nextpart, minrep, maxrep = part[i + 1 : i + 4]
+                if maxrep is MAXREPEAT or maxrep != minrep:
+                    targets.add(nextpart)
+            elif opcode in {ABS_REPEAT_ANY, ABS_REPEAT_ANY_ALL, ABS_ASSERT_NOT}:
+                targets.add(part[i + 1])
+    return targets
+
+
+def loop_exits(parts, flags=0, branches=False):
+    """
+    Returns {head: exit} for the unbounded loops, head is the part that is jumped back to after every iteration.
+    A greedy loop starts with a branch to its exit, a lazy loop with a branch to its body and a jump past the body to
+    its exit. A greedy loop with an empty body jumps back to its head directly, that jump is not an exit.
+    With branches the loops that are only entered again by a branch are included as well, like the outer loop of
+    (?:(?:a|)+)* where leaving the inner loop goes straight back to the outer head.
+    """
+    exits = {}
+    for partnum, part in enumerate(parts):
+        for i in part_opcodes(part, flags=flags):
+            if part[i] is ABS_JUMP:
+                heads = [part[i + 1]]
+            elif part[i] is LS_BRANCH and branches:
+                heads = part[i + 1]
+            else:
+                continue
+            for headnum in heads:
+                if headnum > partnum:
+                    continue
+                head = parts[headnum]
+                if head[0] is LS_BRANCH and len(head[1]) == 1:
+                    if len(head) == 4 and head[2] is ABS_JUMP and head[3] != headnum:
+                        exits[headnum] = head[3]
+                    else:
+                        exits[headnum] = head[1][0]
+    return exits
+
+
+def memo_layout(parts, flags=0, statemarks={}, loopnum=0):
+    """
+    Returns how done is kept, either ("bits", None) or ("packed", counter radix).
+    done is a list [base, memo, scale, kept]. Visiting a part at pos is recorded in memo as a key, keys are ordered by
+    pos and there are scale keys per position.
+    With "bits" memo is a bytearray and the key (pos-base)*len(parts)+part is the index of a byte. The states before a
+    position are removed by deleting the start of the bytearray, which takes constant time, base is the first position
+    in memo.
+    If the state also contains smarks or loops, or if lookbehinds move pos before the start, memo is a set of integers
+    that pack part, pos, smarks and loops. Old entries are removed once the set doubled in size, kept is its size after
+    the last removal. The counter radix is one more than the largest value a loop counter can have.
+    """
+    counters = [0]
+    lookbehind = False
+    for part in parts:
+        for i in part_opcodes(part, flags=flags):
+            opcode = part[i]
+            if opcode is SET_COUNTER and part[i + 2] is not None:
+                counters.append(part[i + 2])
+            elif opcode in {ASSERT, ABS_ASSERT_NOT} and part[i + 2]:
+                lookbehind = True
+    if not statemarks and not loopnum and not lookbehind:
+        return "bits", None
+    # None is stored as 0 and the values shifted up
+    return "packed", max(counters) + 2
+
+
+def memo_key(part, numparts, statemarks={}, loopnum=0, radix=None):
+    # the key of the state in the packed layout, smarks is already packed with RS possible values
+    key = f"pos*{numparts}+{part}"
+    if statemarks:
+        key = f"({key})*RS+smarks"
+    for counter in range(loopnum):
+        key = f"({key})*{radix}+(0 if loops[{counter}] is None else loops[{counter}]+1)"
+    return key
+
+
+# Number of parts that are kept as a flat chain of if-statements at the bottom of the dispatch tree
+DISPATCH_LEAF_SIZE = 4
+
+
+def dispatch_to_py(partlines, start=0, end=None):
+    """
+    Places the code of the parts behind if-statements selecting on `part`.
+    The parts are split in half recursively with `if part < middle:` tests until at most DISPATCH_LEAF_SIZE are left,
+    so reaching a part takes O(log(p)) comparisons instead of O(p).
+    Within a leaf the parts stay a chain so falling through to the next part does not need to go through the tree again.
+    """
+    if end is None:
+        end = len(partlines)
+    lines = []
+    if end - start <= DISPATCH_LEAF_SIZE:
+        for i in range(start, end):
+            lines.append("")
+            lines.append(f"if part == {i}:")
+            lines += indent(partlines[i], 1)
+    else:
+        middle = (start + end) // 2
+        lines.append(f"if part < {middle}:")
+        lines += indent(dispatch_to_py(partlines, start, middle), 1)
+        lines.append("else:")
+        lines += indent(dispatch_to_py(partlines, middle, end), 1)
+    return lines
+
+
+def budget_check(depth):
+    # Counts a step at the start of every part that is reached from the stack or by jumping back.
+    # When budget.left runs out, budget.exceeded either raises or gives the number of steps until the next check.
+    return [
+        " " * depth + "if not steps:",
+        " " * depth + " steps = budget.exceeded(pos)",
+        " " * depth + "steps -= 1",
+    ]
+
+
+def part_comments(parts, flags=0):
+    # the opcodes of every part as they appear in the `# ^` comments of the generated code
+    return [
+        [line[3:].strip() for line in part_to_py(part, i, flags=flags) if line.startswith("# ^")]
+        for i, part in enumerate(parts)
+    ]
+
+
 def parts_to_py(
-        parts, name="regexfunction", comment="", flags=0, marknum=0, statemarks={}, loopnum = 0
+        parts, name="regexfunction", comment="", flags=0, marknum=0, statemarks={}, loopnum = 0, dispatch="tree",
+        budget=False, collect=False
 ):
+    """
+    Compiles the parts to the code of a matching function.
+    With budget the function takes an extra budget argument and counts its steps, see purere._Budget.
+    With the STATS flag it takes an extra stats argument and counts what it does, see purere.MatchStats.
+    With collect it takes extra found and starts arguments. The parts in starts are tried one after the other instead
+    of part 0, every match is appended to found as (the part in starts it started at, end, marks) and the function
+    backtracks as if the match failed. It then always returns no match, see purere.RegexSet.
+    Without these, the code does not contain any counting.
+    """
+    stats = flags & SRE_FLAG_STATS
     if flags & SRE_FLAG_LOCALE:
         raise NotImplementedError("Locale matching (L flag) is not supported")
 
-    codelines = [
-        f"def {name}(s, pos = 0, endpos = None, full = False, nonempty = False, done = None):",
+    header = [
+        f"def {name}(s, pos = 0, endpos = None, full = False, nonempty = False, done = None"
+        + (", budget = None" if budget else "")
+        + (", stats = None" if stats else "")
+        + (", found = None, starts = (0,)" if collect else "")
+        + "):",
         f" # {comment}",
         " num = lambda x: x[0]" if flags & SRE_FLAG_BYTE_PATTERN else " num = ord",
         " startpos = pos",
         " endpos = len(s) if endpos is None else min(endpos,len(s))",
-        " if done == None:",
-        "  done = set()",
-        f" marks = (None,)*{marknum}",
-        f" smarks = (None,)*{len(statemarks)}",
-        f" loops = (None,)*{loopnum}",
-        " assert_stack = []",
-        " stack = [(0,pos,marks,smarks,loops)]",
-        " while stack:",
-        "  part,pos,marks,smarks,loops = stack.pop()",
-        "  if part == None:",
-        "   assert_stack.pop()",
-        "   continue",
-        "  if (part,pos,smarks,loops) in done:",
-        "   continue",
-        "  ",
-        "  while True:",
     ]
-    
-    for i, part in enumerate(parts):
-        codelines.append(f"   ")
-        codelines.append(f"   if part == {i}:")
-        codelines += indent(part_to_py(part, i, flags=flags, statemarks=statemarks))
+    exit = []
+    if budget:
+        header.append(" steps = budget.left")
+        exit.append("budget.left = steps")
+    if stats:
+        header.append(" visits = stats.visits")
+
+    if not collect and is_linear(parts, flags=flags):
+        # Without backtracking there is no need for a stack or for remembering what was done.
+        # The parts still fail with a break, which now ends the search directly.
+        codelines = header + [
+            f" marks = [None]*{marknum}" if marknum else " marks = ()",
+            f" loops = [None]*{loopnum}" if loopnum else " loops = ()",
+            " part = 0",
+            " while True:",
+        ] + (budget_check(2) if budget else [])
+        if stats:
+            exit.append("stats.add(0, 0, 0, 0, 0, 0)")
+        partlines = [part_to_py(part, i, flags=flags, linear=True, exit=exit) for i, part in enumerate(parts)]
+        depth = 2
+    else:
+        # Only the state that the pattern uses is saved on the stack
+        state = (",marks" if marknum else "") + (",smarks" if statemarks else "") + (",loops" if loopnum else "")
+        numparts = len(parts)
+        layout, radix = memo_layout(parts, flags=flags, statemarks=statemarks, loopnum=loopnum)
+        if layout == "bits":
+            memo_init = [
+                " if done == None:",
+                f"  done = [pos, bytearray(), {numparts}, 0]",
+                f" base = done[0]*{numparts}",
+                " memo = done[1]",
+            ]
+            memo_check = [
+                f"  key = pos*{numparts}+part-base",
+                "  if key < len(memo) and memo[key]:",
+                "   continue",
+            ]
+            # memo grows as far as pos gets, at least doubling every time
+            visited = lambda i: f"pos*{numparts}+{i}-base < len(memo) and memo[pos*{numparts}+{i}-base]"
+            memos = [
+                [
+                    f"key = pos*{numparts}+{i}-base",
+                    "try:",
+                    " memo[key] = 1",
+                    "except IndexError:",
+                    " memo.extend(bytes(key+1))",
+                    " memo[key] = 1",
+                ]
+                for i in range(numparts)
+            ]
+        else:
+            memo_init = [
+                " if done == None:",
+                f"  done = [pos, set(), {numparts}{'*RS' if statemarks else ''}*{radix}**{loopnum}, 0]",
+                " memo = done[1]",
+            ]
+            memo_check = [
+                f"  if {memo_key('part', numparts, statemarks, loopnum, radix)} in memo:",
+                "   continue",
+            ]
+            visited = lambda i: f"{memo_key(i, numparts, statemarks, loopnum, radix)} in memo"
+            memos = [[f"memo.add({memo_key(i, numparts, statemarks, loopnum, radix)})"] for i in range(numparts)]
+
+        # marks and positions are stored in base R, smarks has a digit for every mark in statemarks
+        radices = []
+        if statemarks:
+            radices = [" R = len(s)+2", f" RS = R**{len(statemarks)}"]
+            radices += [f" R{mark} = R**{mark}" for mark in range(1, len(statemarks))]
+        popped = []
+        if stats:
+            # the stack is largest right before a pop or the end of an assert, every state that was pushed is popped,
+            # dropped at the end of an assert or still on the stack
+            header.append(" pops = dropped = hits = misses = maxstack = 0")
+            popped = ["  if len(stack) > maxstack:", "   maxstack = len(stack)"]
+            memo_check = memo_check[:-1] + ["   hits += 1"] + memo_check[-1:] + ["  misses += 1"]
+            exit.append("stats.add(pops, pops+dropped+len(stack), hits, misses, max(maxstack,len(stack)), len(memo))")
+        codelines = header + radices + memo_init + [
+            f" marks = (None,)*{marknum}",
+            " smarks = 0",
+            f" loops = (None,)*{loopnum}",
+            " assert_stack = []",
+            # with collect, ~part marks the start of an alternative on the stack
+            f" stack = [(~part,pos{state}) for part in starts[::-1]]" if collect else f" stack = [(0,pos{state})]",
+            " while stack:",
+        ] + popped + [
+            f"  part,pos{state} = stack.pop()",
+        ] + (["  pops += 1"] if stats else []) + [
+            "  if part == None:",
+            "   assert_stack.pop()",
+            "   continue",
+        ] + (["  if part < 0:", "   part = alt = ~part"] if collect else []) + memo_check + [
+            "  ",
+            "  while True:",
+        ] + (budget_check(3) if budget else [])
+        # parts that are only reached by falling through or jumping do not need to be marked
+        targets = backtrack_targets(parts, flags=flags)
+        if collect:
+            # all alternatives end in the same part, which has to record the match of each of them
+            targets = {i for i in targets if not is_end(parts[i])}
+        # jumps back check their target, so it has to record its visit as well
+        exits = loop_exits(parts, flags=flags)
+        targets |= set(exits)
+        partlines = [
+            part_to_py(
+                part,
+                i,
+                flags=flags,
+                statemarks=statemarks,
+                state=state,
+                memo=memos[i] if i in targets else (),
+                exit=exit,
+                collect=collect,
+                visited=visited,
+                loop_exits=exits,
+            )
+            for i, part in enumerate(parts)
+        ]
+        depth = 3
+
+    if stats:
+        partlines = [[f"visits[{i}] += 1"] + lines for i, lines in enumerate(partlines)]
+
+    if dispatch == "chain":
+        # one long list of if-statements, reaching part p takes p comparisons
+        for i, lines in enumerate(partlines):
+            codelines.append(" " * depth)
+            codelines.append(" " * depth + f"if part == {i}:")
+            codelines += indent(lines, depth + 1)
+    elif dispatch == "tree":
+        codelines += indent(dispatch_to_py(partlines), depth)
+    else:
+        raise ValueError(f"Unknown dispatch method: {dispatch}")
+    codelines += [" " + line for line in exit]
     codelines.append(" return None, None, None, done")
     code = "\n".join(codelines)
-
-    if "unicodedata" in code:
-        # only import this if it is used
-        codelines.insert(2, " import unicodedata")
-        code = "\n".join(codelines)
     return code
@@ -0,0 +1,106 @@
+import asyncio
+import gc
+import concurrent.futures
+import pytest
+import re
+import purere
+
+text = "foo bar\nbaz qux 12 34\nend ab-cd\naaaaab xxx\n" * 20
+
+aio_patterns = [
+    r"\w+",
+    r"^\w+$",
+    r"(?<=a)\w",
+    r"\b\d+\b",
+    r"x*",
+    r"(b)(a)?(z)",
+    r"a+b?",
+    r"qux|bar|end",
+    r"(?P<w>\w)-(?=c)",
+    r"",
+]
+
+
+@pytest.mark.parametrize("pattern", aio_patterns)
+def test_aio_equal(pattern):
+    compiled = re.compile(pattern, re.M)
+    purerepat = purere.compile(pattern, purere.M)
+
+    async def check():
+        for yield_every in [1, 3, 100, 10000]:
+            found = [m.regs async for m in purerepat.afinditer(text, yield_every=yield_every)]
+            assert found == [m.regs for m in compiled.finditer(text)]
+            found = [m.regs async for m in purerepat.afinditer(text, 5, 100, yield_every=yield_every)]
+            assert found == [m.regs for m in compiled.finditer(text, 5, 100)]
+            for pos in [0, 10, 500]:
+                match = await purerepat.asearch(text, pos, yield_every=yield_every)
+                expected = compiled.search(text, pos)
+                assert (match and match.regs) == (expected and expected.regs)
+            assert await purerepat.asubn("<\\g<0>>", text, yield_every=yield_every) == compiled.subn("<\\g<0>>", text)
+            assert await purerepat.asub("-", text, 3, yield_every=yield_every) == compiled.sub("-", text, 3)
+
+    asyncio.run(check())
+
+
+def test_aio():
+    async def turns(coroutine):
+        # the number of times another task ran while coroutine was running
+        count = 0
+        finished = False
+
+        async def other():
+            nonlocal count
+            while not finished:
+                count += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(other())
+        res = await coroutine
+        finished = True
+        await task
+        return res, count
+
+    async def check():
+        string = "b" * 10000 + "a"
+        match, count = await turns(purere.compile("a").asearch(string, yield_every=100))
+        assert match.span() == (10000, 10001) and count >= 50
+        res, count = await turns(purere.compile("b").asub("c", string, yield_every=100))
+        assert res == "c" * 10000 + "a" and count >= 50
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            assert (await purere.compile("a").asearch(string, executor=executor)).span() == (10000, 10001)
+            assert [m.span() async for m in purere.compile("a|b$").afinditer("abab", executor=executor)] == [
+                (0, 1),
+                (2, 3),
+                (3, 4),
+            ]
+            assert await purere.compile("b").asub("c", "abab", 1, executor=executor) == "acab"
+        with pytest.raises(purere.MatchTimeout):
+            await purere.compile(r"(a|aa)+c").asearch("a" * 400, max_steps=1000)
+        with pytest.raises(TypeError):
+            await purere.compile("a").asearch(b"a")
+
+    asyncio.run(check())
+
+
+def test_aio_closed():
+    # the generators are closed before returning, so a loop without shutdown_asyncgens has nothing left to destroy
+    errors = []
+    loop = asyncio.new_event_loop()
+    loop.set_exception_handler(lambda loop, context: errors.append(context["message"]))
+
+    async def first():
+        # closing afinditer closes the generator it uses as well
+        matches = purere.compile("a").afinditer("xxa a", yield_every=1)
+        try:
+            return await matches.__anext__()
+        finally:
+            await matches.aclose()
+
+    try:
+        assert loop.run_until_complete(purere.compile("a").asearch("xxa", yield_every=1)).span() == (2, 3)
+        assert loop.run_until_complete(purere.compile("b").asearch("xxa", yield_every=1)) is None
+        assert loop.run_until_complete(first()).span() == (2, 3)
+    finally:
+        loop.close()
+    gc.collect()
+    assert errors == []
@@ -0,0 +1,49 @@
+import io
+import re
+import purere
+from benchmarks import cases, compare, corpora, run
+
+
+def test_corpora():
+    for name in corpora.GENERATORS:
+        text = corpora.corpus(name, 5000)
+        assert len(text) == 5000
+        assert corpora.corpus(name, 5000) == text
+        assert corpora.corpus(name, 5000, seed=1) != text
+    assert re.search(cases.regexes[0], corpora.corpus("logs", 5000))
+    assert any(ord(c) > 0xFFFF for c in corpora.corpus("unicode", 5000))
+
+
+def test_run_and_compare():
+    old = run.run("re", repeat=2, size=2000, corpora=["logs"], pattern_filter="took")
+    new = run.run("purere", repeat=2, size=2000, corpora=["logs"], pattern_filter="took")
+    assert set(old["results"]) == set(new["results"]) == {
+        "compile took (\\d+)ms",
+        "search logs took (\\d+)ms",
+        "findall logs took (\\d+)ms",
+        "sub logs took (\\d+)ms",
+        "split logs took (\\d+)ms",
+    }
+    result = new["results"]["findall logs took (\\d+)ms"]
+    assert len(result["times"]) == 2 and result["min"] <= result["median"]
+    assert result["result"] == len(re.findall("took (\\d+)ms", corpora.corpus("logs", 2000), re.M)) > 0
+    assert new["meta"]["module"] == "purere" and new["meta"]["size"] == 2000
+
+    rows = compare.compare(old, new)
+    assert len(rows) == 5 and all(status != "changed" for _, _, status in rows)
+    # a run is never slower or faster than itself
+    assert all(status == "" for _, ratio, status in compare.compare(new, new))
+
+    slow = {"meta": new["meta"], "results": {}}
+    for name, result in new["results"].items():
+        times = [t * 3 for t in result["times"]]
+        slow["results"][name] = dict(result, times=times, **run.summarize(times))
+    slow["results"]["sub logs took (\\d+)ms"]["result"] += 1
+    statuses = {name: status for name, ratio, status in compare.compare(new, slow)}
+    assert statuses["sub logs took (\\d+)ms"] == "changed"
+    assert statuses["findall logs took (\\d+)ms"] == "regression"
+    statuses = {name: status for name, ratio, status in compare.compare(slow, new)}
+    assert statuses["findall logs took (\\d+)ms"] == "improvement"
+    out = io.StringIO()
+    compare.report(new, slow, compare.compare(new, slow), out)
+    assert "4 regressions" in out.getvalue()
@@ -41,3 +41,43 @@ def test_tokenizer_bug():
         # else:
         #     print(name,repr(val))
 
+
+
+def test_dispatch_equal():
+    # Chain and tree dispatch should give the exact same results
+    results = []
+    for dispatch in ["chain", "tree"]:
+        info, func = purere.compiler.compile_regex(tokenizer_re, flags=purere.M, dispatch=dispatch)
+        info["pattern"] = tokenizer_re
+        pat = purere.Pattern(info, func)
+        results.append([m.regs for m in pat.finditer(code)])
+    assert results[0] == results[1]
+    assert results[0] == [m.regs for m in re.finditer(tokenizer_re, code, re.M)]
+
+
+def test_match_object():
+    # Match computes most attributes on access, they should still agree with re
+    pattern = r"(?P<key>\w+)=(?P<value>\w+)?(;)?"
+    for s in ["a=b;", "a=", "xx a=1"]:
+        rematch = re.search(pattern, s)
+        match = purere.search(pattern, s)
+        assert match.regs == rematch.regs
+        assert (match.lastindex, match.lastgroup) == (rematch.lastindex, rematch.lastgroup)
+        for group in [0, 1, 2, 3, "key", "value"]:
+            assert match.span(group) == rematch.span(group)
+            assert (match.start(group), match.end(group)) == (rematch.start(group), rematch.end(group))
+            assert match[group] == rematch[group]
+        assert match.group(1, "value", 3) == rematch.group(1, "value", 3)
+        assert match.groups("-") == rematch.groups("-")
+        assert match.groupdict() == rematch.groupdict()
+    match = purere.search(pattern, "a=b")
+    for group in [4, -1, "other", 1.0]:
+        for method in [match.span, match.start, match.end, match.group]:
+            try:
+                method(group)
+            except IndexError:
+                pass
+            else:
+                raise AssertionError(f"no IndexError for {group!r}")
+    assert purere.match("a", "a").lastindex is None
+    assert not hasattr(match, "__dict__")
@@ -0,0 +1,108 @@
+import purere
+from purere import cache
+
+
+def test_lru_order():
+    lru = cache.LRUCache(maxsize=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1
+    lru.put("c", 3)
+    # b was used least recently
+    assert "b" not in lru
+    assert lru.get("a") == 1 and lru.get("c") == 3
+    assert lru.get("b") is None
+    assert lru.info() == cache.CacheInfo(3, 1, 1, 2, 2, 2, None)
+
+
+def test_lru_memory():
+    lru = cache.LRUCache(maxsize=None, maxmemory=100)
+    lru.put("a", 1, 60)
+    lru.put("b", 2, 30)
+    lru.put("c", 3, 30)
+    assert "a" not in lru and len(lru) == 2 and lru.memory == 60
+    lru.put("b", 4, 10)
+    assert lru.get("b") == 4 and lru.memory == 40
+    lru.set_limits(maxsize=1)
+    assert len(lru) == 1 and "b" in lru
+
+
+def test_cache_info():
+    purere.purge()
+    try:
+        purere.set_cache_limits(maxsize=3)
+        before = purere.cache_info()
+        for i in range(5):
+            purere.compile(f"a{i}+b")
+        assert purere.compile("a4+b") is purere.compile("a4+b")
+        info = purere.cache_info()
+        assert info.currsize <= 3
+        assert info.misses - before.misses == 5
+        assert info.hits - before.hits >= 2
+        assert info.evictions - before.evictions >= 2
+        assert info.memory > 0
+
+        purere.set_cache_limits(maxsize=None, maxmemory=1)
+        assert purere.cache_info().currsize == 0
+        assert purere.match("a+b", "aab").span() == (0, 3)
+    finally:
+        purere.set_cache_limits()
+        purere.purge()
+
+
+def test_disk_cache(tmp_path, monkeypatch):
+    purere.purge()
+    try:
+        purere.set_disk_cache(tmp_path)
+        pat = purere.compile(r"(\w+)@(\w+)\.com", purere.I)
+        purere.compile(b"[ab]c")
+        purere.compile(r"[\w.]+@\w+")
+        assert len(list(tmp_path.glob("*.purere"))) == 3
+
+        # a warm start does not generate any code
+        purere.purge()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("should be loaded from disk")
+
+        monkeypatch.setattr(purere.compiler, "compile_regex", fail)
+        loaded = purere.compile(r"(\w+)@(\w+)\.com", purere.I)
+        assert loaded is not pat
+        assert loaded.flags == pat.flags and repr(loaded) == repr(pat)
+        assert loaded.search("mail FOO@bar.com").groups() == ("FOO", "bar")
+        # the prefix checker is restored as well
+        assert purere.compile(b"[ab]c").findall(b"xacbc") == [b"ac", b"bc"]
+        assert purere.compile(r"[\w.]+@\w+").findall("to: a.b@c, d@e") == ["a.b@c", "d@e"]
+        monkeypatch.undo()
+
+        purere.clear_disk_cache(r"(\w+)@(\w+)\.com", purere.I)
+        assert len(list(tmp_path.glob("*.purere"))) == 2
+        purere.compile("x+", purere.I)
+        purere.clear_disk_cache()
+        assert list(tmp_path.iterdir()) == []
+    finally:
+        purere.set_disk_cache(None)
+        purere.purge()
+
+
+def test_disk_cache_broken(tmp_path):
+    disk = cache.DiskCache(tmp_path)
+    info, func = disk.compile("a+b")
+    # a broken file is ignored and replaced
+    with open(disk.path("a+b", 0), "wb") as f:
+        f.write(b"garbage")
+    assert disk.load("a+b", 0) is None
+    info, func = disk.compile("a+b")
+    assert disk.load("a+b", 0) is not None
+    assert func("aab")[:2] == (True, 3)
+
+
+def test_disk_cache_code_version(tmp_path, monkeypatch):
+    # entries written by a different code generator are not used
+    disk = cache.DiskCache(tmp_path)
+    disk.compile("a+b")
+    assert cache.DiskCache(tmp_path).load("a+b", 0) is not None
+    source = purere.topy.__loader__.get_source("purere.topy")
+    monkeypatch.setattr(type(purere.topy.__loader__), "get_source", lambda self, name: source + "\n# changed\n")
+    assert cache.code_version() != disk.version.split("-")[1]
+    assert cache.DiskCache(tmp_path).load("a+b", 0) is None
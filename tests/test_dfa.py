@@ -0,0 +1,80 @@
+import pytest
+import purere
+import re
+from purere import dfa
+from .re_tests import tests
+
+
+# same as test_equal but only for patterns that can use the DFA, also checking match and fullmatch
+@pytest.mark.parametrize("test", tests)
+def test_equal(test):
+    reg = test[0]
+    s = test[1]
+
+    try:
+        repat = re.compile(reg)
+        purerepat = purere.compile(reg)
+    except re.error as e:
+        return
+    if purerepat._engine is None:
+        return
+    # the backtracker on its own should agree with the DFA
+    btpat = purere.Pattern(purerepat._info, purerepat._match_function)
+
+    for method in ["search", "match", "fullmatch"]:
+        reresult = getattr(repat, method)(s)
+        purereresult = getattr(purerepat, method)(s)
+        btresult = getattr(btpat, method)(s)
+        if reresult is None or purereresult is None:
+            assert reresult == purereresult == btresult
+        else:
+            assert reresult.regs == purereresult.regs == btresult.regs
+    assert [m.regs for m in repat.finditer(s * 3)] == [m.regs for m in purerepat.finditer(s * 3)]
+
+
+def test_bounded_cache():
+    pat = purere.compile(r"[\w\.+-]+@[\w\.-]+\.[\w\.-]+")
+    text = "Mail foo@bar.com or baz.qux@example.org, not @home." * 20
+    expected = re.findall(r"[\w\.+-]+@[\w\.-]+\.[\w\.-]+", text)
+    pat._engine = dfa.DFA(pat._engine.program, pat._match_function, max_states=5)
+    assert pat.findall(text) == expected
+    assert pat._engine.resets > 0
+    assert len(pat._engine.states) <= 5
+
+
+def test_empty_iterations():
+    # an iteration that matches the empty string is the last one, like in re
+    for reg, s in [(r"(?:[^a]??)*", "b"), (r"(?:|a)*", "aab"), (r"(a??)*b??", "ab"), (r"(?:b*?()b*?)+", "bb")]:
+        pat = purere.compile(reg)
+        assert isinstance(pat._engine, dfa.DFA)
+        for method in ["search", "match"]:
+            assert getattr(pat, method)(s).regs == getattr(re, method)(reg, s).regs
+        assert [m.regs for m in pat.finditer(s)] == [m.regs for m in re.finditer(reg, s)]
+
+
+def test_unsupported():
+    # backreferences and asserts need the backtracker
+    assert purere.compile(r"(a)\1")._engine is None
+    assert purere.compile(r"a(?=b)")._engine is None
+    assert purere.compile(r"a+b")._engine is not None
+
+
+def test_linear_search(monkeypatch):
+    # finding the start of the leftmost match does not try every position in a long run of live threads
+    pat = purere.compile(r"a*c|ab")
+    engine = pat._engine
+    assert engine is not None
+    runs = []
+    run = engine.run
+    monkeypatch.setattr(engine, "run", lambda s, pos, *args, **kwargs: runs.append(pos) or run(s, pos, *args, **kwargs))
+    for n in [2000, 8000]:
+        runs.clear()
+        text = "a" * n + "b"
+        assert pat.search(text).span() == (n - 1, n + 1)
+        # the anchored runs are bounded, the rest is left to the Pike VM
+        assert len(runs) <= 10
+    # the search handed to the Pike VM has the same groups as re
+    for reg, text in [(r"(\w(a*)*)\W$", "x" * 12 + "_ "), (r"(a*)(c|ab)", "a" * 20 + "b")]:
+        assert purere.compile(reg).search(text).regs == re.compile(reg).search(text).regs
+    text = "xaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaabyaaaab"
+    assert [m.regs for m in pat.finditer(text, 1)] == [m.regs for m in re.compile(r"a*c|ab").finditer(text, 1)]
@@ -1,3 +1,5 @@
+import array
+import mmap
 import pytest
 import purere
 import re
@@ -36,3 +38,66 @@ def test_equal(test):
         assert reresult == purereresult
     else:
         assert reresult.regs == purereresult.regs
+
+
+iteration_patterns = [r"\w+", r"(\w)(\d)?", r"(?P<a>a)|(b)", r"x*", r"(?<=a)b", r"(\s)"]
+iteration_strings = ["abc a1 b2 axb", "", "ab ab"]
+
+
+@pytest.mark.parametrize("pattern", iteration_patterns)
+def test_iteration_equal(pattern):
+    # findall, split and sub do not create Match objects, but should give the same results as re
+    for s in iteration_strings:
+        for string, pat in [(s, pattern), (bytearray(s.encode()), pattern.encode())]:
+            repat, purerepat = re.compile(pat), purere.compile(pat)
+            assert purerepat.findall(string) == repat.findall(string)
+            if string:
+                assert purerepat.findall(string, 1, 5) == repat.findall(string, 1, 5)
+            assert purerepat.split(string) == repat.split(string)
+            assert purerepat.split(string, maxsplit=1) == repat.split(string, maxsplit=1)
+            for repl in [r"<\g<0>>", r"-", r"\1", r"[\1\g<1>]"]:
+                if isinstance(pat, bytes):
+                    repl = repl.encode()
+                try:
+                    expected = repat.subn(repl, string)
+                except (re.error, IndexError):
+                    continue
+                assert purerepat.subn(repl, string) == expected
+                assert purerepat.sub(repl, string, count=2) == repat.sub(repl, string, count=2)
+            assert purerepat.sub(lambda m: m.group()[::-1], string) == repat.sub(lambda m: m.group()[::-1], string)
+
+
+buffer_patterns = [
+    rb"foo",
+    rb"(?i)(hel+o) \1",
+    rb"(\w+)\1",
+    rb"a.*c",
+    rb".{3,}z",
+    rb"[a-c]+",
+    rb"(?:bar|world|end)",
+    rb"(?m)^\w+$",
+    rb"[\w.]+@\w+",
+    rb"(?<=\.)\d",
+]
+
+
+@pytest.mark.parametrize("pattern", buffer_patterns)
+def test_buffer_equal(pattern, tmp_path):
+    # bytes-like objects are searched without copying them
+    data = b"foo bar\nHello hello world 12.34 abcabc a@b\nxyz .. end\n" * 20
+    path = tmp_path / "data"
+    path.write_bytes(data)
+    expected = [m.regs for m in re.finditer(pattern, data)]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for string in [mm, memoryview(mm), memoryview(b"x" + data)[1:], array.array("B", data)]:
+            assert [m.regs for m in purere.finditer(pattern, string)] == expected
+            assert purere.findall(pattern, string) == re.findall(pattern, data)
+            assert purere.sub(pattern, b"-", string) == re.sub(pattern, b"-", data)
+
+
+def test_buffer_view(monkeypatch):
+    monkeypatch.setattr(purere._BufferView, "block_size", 2)
+    view = purere._BufferView(memoryview(b"abcabcab")[1:])
+    assert len(view) == 7 and view[0] == 98 and view[1:3] == b"ca"
+    assert [view.find(b"ab", i) for i in range(8)] == [2, 2, 2, 5, 5, 5, -1, -1]
+    assert view.find(b"ab", 0, 3) == -1 and view.find(b"cab", 1, 7) == 1 and view.find(b"cab", 2) == 4
@@ -0,0 +1,111 @@
+import pytest
+import purere
+import re
+from purere import literals
+from purere.stdlib import sre_parse
+
+
+def first(pattern, flags=0):
+    return literals.first_literals(sre_parse.parse(pattern, flags), flags=flags)
+
+
+def test_first_literals():
+    assert first("Python|Perl|Tcl") == ["Perl", "Python", "Tcl"]
+    assert first("(foo|bar)baz") == ["barbaz", "foobaz"]
+    assert first("(?:a|b)c[de]") == ["acd", "ace", "bcd", "bce"]
+    assert first("(ab)+|cd") == ["ab", "cd"]
+    # shorter literals make longer ones useless
+    assert first("x(a|b*)") == ["x"]
+    assert first("a|b*") is None
+    assert first("a|\\w") is None
+    assert first("(?i)ab|cd") is None
+
+
+words = ["Python", "Perl", "Tcl", "foo", "bar", "kw1", "kw12", "alpha", "beta", "x", " ", "0"]
+patterns = [
+    "Python|Perl|Tcl",
+    "(foo|bar)(?:Perl|x)",
+    "(?:Python|Perl|Tcl)(?=0)",
+    r"(foo|bar)\1",
+    "|".join(f"kw{i}" for i in range(1, 40)),
+    "(?:" + "|".join(f"{w}{i}" for w in words[:6] for i in range(4)) + ")(?! )",
+]
+
+
+@pytest.mark.parametrize("pattern", patterns)
+def test_equal(pattern):
+    purerepat = purere.compile(pattern)
+    assert purerepat._literals is not None
+    text = "".join(words[(i * 7) % len(words)] for i in range(500)) + "Perl0 kw12 foofoo barx"
+    for args in [(text,), (text, 5), (text, 3, len(text) - 3)]:
+        assert [m.regs for m in re.compile(pattern).finditer(*args)] == [m.regs for m in purerepat.finditer(*args)]
+    btext = text.encode()
+    assert [m.regs for m in re.finditer(pattern.encode(), btext)] == [
+        m.regs for m in purere.finditer(pattern.encode(), bytearray(btext))
+    ]
+
+
+def inner(pattern, flags=0):
+    res = literals.inner_literal(sre_parse.parse(pattern, flags), flags=flags)
+    return res and res[:3]
+
+
+def test_inner_literal():
+    assert inner(r"[\w.+-]+@[\w.-]+\.[\w.-]+") == ("@", 1, None)
+    assert inner(r"\w+://\S+") == ("://", 1, None)
+    assert inner(r"(\d{1,3})-(\d+)") == ("-", 1, 3)
+    assert inner(r"(?:\d\d)?--\d-") == ("--", 0, 2)
+    # nothing is known about the characters before the literal
+    assert inner(r"[^a]+@") is None
+    assert inner(r"ab") is None
+
+
+inner_patterns = [
+    r"[\w.+-]+@[\w.-]+\.[\w.-]+",
+    r"[\w]+://[^/\s?#]+[^\s?#]+(?:\?[^\s#]*)?(?:#[^\s]*)?",
+    r"(\d{1,3})-(\d+)",
+    r"(\w+)@\1",
+    r"\bfoo\d*bar",
+]
+
+
+@pytest.mark.parametrize("pattern", inner_patterns)
+def test_inner_equal(pattern):
+    purerepat = purere.compile(pattern)
+    assert purerepat._info["inner_literal"] is not None
+    text = " ".join(["foo", "a.b+c@d-e.org", "12-3456", "x@@y.z", "1234-5", "http://a.b/c?d#e", "foo12bar", "ab@ab"] * 20)
+    for args in [(text,), (text, 5), (text, 3, len(text) - 3)]:
+        assert [m.regs for m in re.compile(pattern).finditer(*args)] == [m.regs for m in purerepat.finditer(*args)]
+    btext = text.encode()
+    assert [m.regs for m in re.finditer(pattern.encode(), btext)] == [
+        m.regs for m in purere.finditer(pattern.encode(), bytearray(btext))
+    ]
+    # the checker is also part of the standalone code
+    res = {}
+    exec(purere.get_headers() + "\n\n" + purere._pattern_to_py(pattern), res)
+    assert [m.regs for m in res["regex"].finditer(text)] == [m.regs for m in purerepat.finditer(text)]
+
+
+def test_charset_scanner():
+    scanner = purere.compile(r"[ab]\d")._charset
+    assert list(scanner.candidates("xaxxb" * 100, 0, 500)) == [i for i in range(500) if i % 5 in (1, 4)]
+    assert list(scanner.candidates("xaxxb", 2, 4)) == []
+    bscanner = purere.compile(rb"[^\x00-\x7f]x")._charset
+    assert list(bscanner.candidates(b"a\xffb\x80", 0, 4)) == [1, 3]
+
+
+charset_patterns = [r"[ab]+c?", r"\d+", r"(?:x|y)\w*(?=\s)", r"\d\d?(?!\d)", r"[^\W\d]+", r"[é\d]+"]
+
+
+@pytest.mark.parametrize("pattern", charset_patterns)
+def test_charset_equal(pattern):
+    purerepat = purere.compile(pattern)
+    assert purerepat._charset is not None
+    text = " ".join(["abc", "x12", "y", "1234", "é9", "ba", "yy z"] * 100)
+    for args in [(text,), (text, 5), (text, 3, len(text) - 3)]:
+        assert [m.regs for m in re.compile(pattern).finditer(*args)] == [m.regs for m in purerepat.finditer(*args)]
+    if pattern.isascii():
+        btext = text.encode()
+        assert [m.regs for m in re.finditer(pattern.encode(), btext)] == [
+            m.regs for m in purere.finditer(pattern.encode(), bytearray(btext))
+        ]
@@ -0,0 +1,72 @@
+import concurrent.futures
+import mmap
+import pytest
+import re
+import purere
+from purere import parallel
+
+text = "foo bar\nbaz qux 12 34\nend ab-cd\naaaaab xxx\n" * 40
+
+parallel_patterns = [
+    (r"\w+", None, 10),
+    (r"^\w+$", "\n", None),
+    (r"(?<=a)\w", None, 5),
+    (r"\b\d+\b", None, 5),
+    (r"x*", None, 3),
+    (r"(b)(a)?(z)", None, None),
+    (r"a.*?b", "\n", None),
+    (r"(?P<w>\w)-(?=c)", None, 5),
+    (r"", None, None),
+]
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(parallel, "MIN_CHUNK", 7)
+
+
+@pytest.mark.parametrize("pattern,separator,max_match_len", parallel_patterns)
+def test_parallel_equal(small_chunks, pattern, separator, max_match_len):
+    expected = re.findall(pattern, text, re.M)
+    spans = [m.regs for m in re.finditer(pattern, text, re.M)]
+    purerepat = purere.compile(pattern, purere.M)
+    with concurrent.futures.ThreadPoolExecutor(3) as executor:
+        for workers in [1, 2, 5, 50]:
+            kwargs = dict(workers=workers, separator=separator, max_match_len=max_match_len, executor=executor)
+            assert purerepat.findall_parallel(text, **kwargs) == expected
+            assert [m.regs for m in purerepat.finditer_parallel(text, **kwargs)] == spans
+        bpattern = purere.compile(pattern.encode(), purere.M)
+        bseparator = separator and separator.encode()
+        found = bpattern.findall_parallel(text.encode(), 7, bseparator, max_match_len, executor=executor)
+        assert found == [tuple(g.encode() for g in m) if isinstance(m, tuple) else m.encode() for m in expected]
+
+
+def test_parallel(small_chunks):
+    # the pattern is pickled to the processes
+    string = "ab aab " * 1000
+    assert purere.compile(r"a{1,2}b").findall_parallel(string, workers=2) == re.findall(r"a{1,2}b", string)
+    with mmap.mmap(-1, len(string)) as buffer:
+        buffer.write(string.encode())
+        assert purere.compile(rb"(a)b").findall_parallel(buffer, workers=2) == [b"a"] * 2000
+    with pytest.raises(ValueError):
+        purere.compile(r"\w+").findall_parallel("abc")
+    with pytest.raises(TypeError):
+        purere.compile(r"\w").findall_parallel(b"abc")
+
+
+def test_parallel_lazy(small_chunks):
+    # chunks are sliced and submitted while the results are merged, and the rest is cancelled when the caller stops
+    submitted = []
+
+    class Executor(concurrent.futures.ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            submitted.append(args[2])
+            return super().submit(*args, **kwargs)
+
+    with Executor(2) as executor:
+        matches = purere.compile(r"\w+").finditer_parallel(text, workers=2, max_match_len=10, executor=executor)
+        assert next(matches).group() == "foo"
+        # one more chunk is submitted for every result that is taken
+        assert len(submitted) == 2 * parallel.AHEAD + 1
+        matches.close()
+    assert len(submitted) < len(parallel.chunk_bounds(text, 8))
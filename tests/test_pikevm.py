@@ -0,0 +1,66 @@
+import pytest
+import purere
+import re
+from purere import pikevm
+from .re_tests import tests
+
+
+# same as test_equal but forcing the Pike VM, also checking match and fullmatch
+@pytest.mark.parametrize("test", tests)
+def test_equal(test):
+    reg = test[0]
+    s = test[1]
+
+    try:
+        repat = re.compile(reg)
+        purerepat = purere.compile(reg, purere.LINEAR)
+    except re.error as e:
+        return
+    if purerepat._engine is None:
+        return
+    assert isinstance(purerepat._engine, pikevm.PikeVM)
+
+    for method in ["search", "match", "fullmatch"]:
+        reresult = getattr(repat, method)(s)
+        purereresult = getattr(purerepat, method)(s)
+        if reresult is None or purereresult is None:
+            assert reresult == purereresult
+        else:
+            assert reresult.regs == purereresult.regs
+    assert [m.regs for m in repat.finditer(s * 3)] == [m.regs for m in purerepat.finditer(s * 3)]
+
+
+def test_empty_iterations():
+    # an iteration that matches the empty string is the last one, like in re
+    for reg, s in [
+        (r"(a*)*b", "aaab"),
+        (r"(a|)*x", "aax"),
+        (r"((a)|b|)*c", "abac"),
+        (r"(a*)+$", "aa"),
+        (r"(\w(a*)*)\W$", "_ "),
+        (r"(?:[^a]??)*", "b"),
+        (r"(?:|a)*", "aab"),
+        (r"(a??)*b??", "ab"),
+        (r"(a*?)*", "aa"),
+        (r"(?:b*?()b*?)+", "bb"),
+        (r"(?:(?:(|b))+)*", "bba"),
+        (r"(?:(?:[ab]*?){0,3})+", "baaa"),
+    ]:
+        expected = [m.regs for m in re.finditer(reg, s)]
+        assert [m.regs for m in purere.finditer(reg, s, purere.LINEAR)] == expected
+
+
+def test_fallback():
+    # backreferences and asserts can not run on the VM and use the backtracker
+    pat = purere.compile(r"(a)\1", purere.LINEAR)
+    assert pat._engine is None
+    assert pat.search("baab").span() == (1, 3)
+    # without the flag the DFA is used
+    assert not isinstance(purere.compile(r"(a+)b")._engine, pikevm.PikeVM)
+
+
+def test_linear():
+    # would take exponential time without the done set, the VM does not need it at all
+    pat = purere.compile(r"(x+x+)+y", purere.LINEAR)
+    assert pat.search("x" * 5000) is None
+    assert pat.search("x" * 5000 + "y").span() == (0, 5001)
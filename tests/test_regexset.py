@@ -0,0 +1,84 @@
+import pytest
+import re
+import purere
+
+set_patterns = [
+    r"foo",
+    r"ba[rz]",
+    r"\d+",
+    r"(\w+)-(\w+)",
+    r"^end",
+    r"(?m)^end",
+    r"(?i)QUX",
+    r"(?<=a)b",
+    r"\bab\b",
+    r"(a)\1",
+    r"x*",
+    r"a|b|x",
+    r"a+b?",
+    r"nothing",
+]
+
+texts = ["foo bar\nbaz qux 12 34\nend ab-cd\naaaaab xxx\n", "ca", "", "end QUx aa", "zzz"]
+
+
+@pytest.mark.parametrize("text", texts)
+def test_regexset_equal(text):
+    patterns = set_patterns
+    regexset = purere.RegexSet(patterns)
+    assert len(regexset) == len(patterns)
+    expected = [re.search(pattern, text) for pattern in patterns]
+    assert regexset.matches(text) == [i for i, m in enumerate(expected) if m]
+    assert [m and m.regs for m in regexset.first_matches(text)] == [m and m.regs for m in expected]
+    expected = [re.compile(pattern).search(text, 2, 30) for pattern in patterns]
+    assert [m and m.regs for m in regexset.first_matches(text, 2, 30)] == [m and m.regs for m in expected]
+
+    bregexset = purere.RegexSet([pattern.encode() for pattern in patterns])
+    expected = [re.search(pattern.encode(), text.encode()) for pattern in patterns]
+    assert bregexset.matches(text.encode()) == [i for i, m in enumerate(expected) if m]
+
+
+def test_regexset():
+    # one pattern, or patterns that start with the same literal
+    assert purere.RegexSet(["a+b?"]).matches("xab") == [0]
+    regexset = purere.RegexSet(["abc", "abd", "ab", "(?P<x>b)(?P<y>d)"])
+    assert regexset.matches("xxabd") == [1, 2, 3]
+    first = regexset.first_matches("xxabd")
+    assert first[0] is None and first[1].span() == (2, 5)
+    assert first[3].groupdict() == {"x": "b", "y": "d"}
+    assert purere.RegexSet(["A", "b"], purere.I).matches("ab") == [0, 1]
+    assert purere.RegexSet([purere.compile("a"), "b"]).matches("b") == [1]
+    assert purere.RegexSet([]).matches("abc") == []
+    assert purere.RegexSet([]).first_matches("abc") == []
+    with pytest.raises(TypeError):
+        purere.RegexSet(["a", b"b"])
+    with pytest.raises(TypeError):
+        purere.RegexSet(["a"]).matches(b"a")
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        r"(?:^)+",
+        r"(?:$)+",
+        r"(?:\b)+",
+        r"(?:\b)+c",
+        r"(?:^|a)+b",
+        r"(?:)*",
+        r"(?:)+",
+        r"(?:)*a",
+        r"(?:)*?a",
+        r"(?:(?:(?:()){0,3})*?)+",
+    ],
+)
+def test_regexset_empty_loop(pattern):
+    # a loop around something that matches the empty string stops instead of trying the same iteration forever
+    for text in ["", "ab c", "x", "aab"]:
+        expected = [i for i, p in enumerate([pattern, "c"]) if re.search(p, text)]
+        assert purere.RegexSet([pattern, "c"]).matches(text) == expected
+        m = purere.RegexSet([pattern]).first_matches(text)[0]
+        expected = re.search(pattern, text)
+        assert (m and m.regs) == (expected and expected.regs)
+        # the backtracker on its own, as used with STATS or a limit
+        for m in [purere.compile(pattern, purere.STATS).search(text), purere.compile(pattern).search(text, max_steps=1000)]:
+            assert (m and m.regs) == (expected and expected.regs)
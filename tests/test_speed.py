@@ -3,13 +3,8 @@ import purere
 import timeit
 import re
 
-regexes = r"""
-[\w\.+-]+@[\w\.-]+\.[\w\.-]+
-[\w]+://[^/\s?#]+[^\s?#]+(?:\?[^\s#]*)?(?:#[^\s]*)?
-(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9])\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9])
-""".strip().split(
-    "\n"
-)
+from benchmarks.cases import regexes
+from benchmarks.corpora import corpus
 
 
 @pytest.mark.parametrize("regex", regexes)
@@ -33,7 +28,7 @@ def test_time_compile(regex):
 #@pytest.mark.skip("Not now, to slow")
 @pytest.mark.parametrize("regex", regexes)
 def test_time_run(regex):
-    data = open("tests/bench.txt").read()
+    data = corpus("logs", 200000)
 
     pat = purere.compile(regex)
     start = timeit.default_timer()
@@ -111,3 +106,31 @@ def test_re_benchmarks(bench):
     print("localtime:", localtime)
     print("othertime:", othertime)
     print("slowdown:", localtime / othertime)
+
+
+from purere import compiler
+from .test_bugs import tokenizer_re, code
+
+
+@pytest.mark.parametrize("dispatch", ["chain", "tree"])
+def test_time_dispatch(dispatch):
+    # The tokenizer has many parts, so the way of jumping to a part matters
+    data = code * 200
+    info, func = compiler.compile_regex(tokenizer_re, flags=purere.M, dispatch=dispatch)
+    info["pattern"] = tokenizer_re
+    pat = purere.Pattern(info, func)
+
+    start = timeit.default_timer()
+    pat.findall(data)
+    stop = timeit.default_timer()
+    localtime = stop - start
+
+    pat = re.compile(tokenizer_re, re.M)
+    start = timeit.default_timer()
+    pat.findall(data)
+    stop = timeit.default_timer()
+    othertime = stop - start
+
+    print("localtime:", localtime)
+    print("othertime:", othertime)
+    print("slowdown:", localtime / othertime)
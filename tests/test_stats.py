@@ -0,0 +1,52 @@
+import pytest
+import re
+import purere
+
+
+def test_stats():
+    pattern = purere.compile(r"(\w+)(?:\s\w+)*?x", purere.STATS)
+    assert pattern.findall("ab cd ef " * 20 + "x") == []
+    stats = pattern.stats()
+    assert stats.calls > 0
+    assert stats.pushes == stats.pops > 0
+    assert stats.done_hits + stats.done_misses <= stats.pops
+    assert stats.max_stack > 0 and stats.max_done > 0
+    # the repeated group is where the time goes
+    hot = stats.hot_parts(2)
+    assert len(hot) == 2 and hot[0][1] >= hot[1][1] > 0
+    assert any("LS_BRANCH" in line for part, visits, opcodes in hot for line in opcodes)
+    visits = sum(stats.visits)
+    stats.reset()
+    assert stats.calls == 0 and sum(stats.visits) == 0
+    pattern.findall("ab cd ef " * 20 + "x")
+    assert sum(stats.visits) == visits
+
+    # patterns without backtracking only count visits
+    linear = purere.compile(rb"\d+", purere.STATS)
+    assert linear.findall(b"12 34") == [b"12", b"34"]
+    assert linear.stats().calls == 2 and linear.stats().pops == 0
+    assert linear.stats().hot_parts()[0][1] == 2
+
+    with pytest.raises(ValueError):
+        purere.compile(r"\d+").stats()
+    # the normal code does not count anything
+    code = purere.compiler.compile_regex(r"(\w+)(?:\s\w+)*?x", only_code=True)[1]
+    assert "visits" not in code and "stats" not in code
+
+
+@pytest.mark.parametrize("pattern", [r"(a|ab)(c|bcd)(d*)", r"(?<=x)\w+?y", r"(a*)*b", r"x(?=y)"])
+def test_stats_equal(pattern):
+    text = "abcd abcbcd xay xyyy aab " * 3
+    purerepat = purere.compile(pattern, purere.STATS)
+    assert [m.regs for m in purerepat.finditer(text)] == [m.regs for m in re.finditer(pattern, text)]
+    # with a limit the code that counts steps is used, which does not collect statistics
+    assert purerepat.findall(text, max_steps=10**6) == re.findall(pattern, text)
+
+
+def test_stats_assert():
+    # states that an assert drops from the stack were pushed as well
+    pattern = purere.compile(r"(?=(a|b)*)c", purere.STATS)
+    assert pattern.match("ababab") is None
+    stats = pattern.stats()
+    assert stats.pushes >= stats.max_stack >= 7
+    assert stats.pushes >= stats.pops
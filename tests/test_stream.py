@@ -0,0 +1,49 @@
+import io
+import pytest
+import re
+import purere
+
+text = "foo bar\nbaz qux 12 34\nend ab-cd\n" * 40
+
+stream_patterns = [
+    (r"\w+", 10),
+    (r"^\w+$", 20),
+    (r"(?<=a)\w", 5),
+    (r"\b\d+\b", 5),
+    (r"x*", 3),
+    (r"(b)(a)?(z)", None),
+    (r"qux \d+$", 30),
+    (r"(?P<w>\w)-(?=c)", 5),
+    (r"\Bd", None),
+]
+
+
+@pytest.mark.parametrize("pattern,max_match_len", stream_patterns)
+def test_stream_equal(pattern, max_match_len):
+    expected = [(m.regs, m.group()) for m in re.finditer(pattern, text, re.M)]
+    purerepat = purere.compile(pattern, purere.M)
+    for chunk_size in [1, 2, 3, 7, 64, 10000]:
+        found = purerepat.finditer_stream(io.StringIO(text), max_match_len, chunk_size=chunk_size)
+        assert [(m.regs, m.group()) for m in found] == expected
+    chunks = [text[i : i + 5] for i in range(0, len(text), 5)]
+    assert [m.regs for m in purerepat.finditer_stream(iter(chunks), max_match_len)] == [r for r, _ in expected]
+    bpattern = purere.compile(pattern.encode(), purere.M)
+    found = bpattern.finditer_stream(io.BytesIO(text.encode()), max_match_len, chunk_size=4)
+    assert [(m.regs, m.group()) for m in found] == [(r, g.encode()) for r, g in expected]
+
+
+def test_stream():
+    # a match longer than max_match_len makes the block grow
+    assert [m.span() for m in purere.compile(r"\w+").finditer_stream(["a" * 1000, " b"], 3, chunk_size=7)] == [
+        (0, 1000),
+        (1001, 1002),
+    ]
+    match = next(purere.compile(r"(?P<x>b)(c)?").finditer_stream(["aaa"] * 1000 + ["bd"]))
+    assert isinstance(match, purere.StreamMatch)
+    assert match.span() == (3000, 3001) and match.groupdict() == {"x": "b"} and match.groups() == ("b", None)
+    assert match.string[match.start() - match.offset] == "b"
+    assert list(purere.compile("a").finditer_stream([])) == []
+    with pytest.raises(ValueError):
+        next(purere.compile(r"\w+").finditer_stream(["abc"]))
+    with pytest.raises(TypeError):
+        next(purere.compile(r"\w").finditer_stream([b"abc"], 1))
@@ -0,0 +1,63 @@
+import pytest
+import purere
+
+
+def test_no_counting():
+    pattern = purere.compile(r"(a|aa)+b")
+    assert pattern.search("aaab").span() == (0, 4)
+    # the counting version is only compiled when it is used
+    assert pattern._budget_function is None
+    code = purere.compiler.compile_regex(r"(a|aa)+b", only_code=True)[1]
+    assert "steps" not in code and "budget" not in code
+    code = purere.compiler.compile_regex(r"(a|aa)+b", only_code=True, budget=True)[1]
+    assert "steps -= 1" in code
+
+
+def test_max_steps():
+    pattern = purere.compile(r"(a|aa)+b")
+    with pytest.raises(purere.MatchTimeout) as info:
+        pattern.search("a" * 300, max_steps=1000)
+    assert info.value.steps == 1000
+    assert 0 <= info.value.pos <= 300
+    with pytest.raises(purere.MatchTimeout):
+        pattern.match("aab", max_steps=0)
+    # the steps of all positions of a search count towards the same limit
+    budget = pattern._budget(None, 10**6)
+    assert pattern._search("a" * 100, budget=budget)[0] is None
+    steps = budget.steps
+    with pytest.raises(purere.MatchTimeout):
+        pattern.search("a" * 100, max_steps=steps - 1)
+    assert pattern.search("a" * 100, max_steps=steps) is None
+    with pytest.raises(purere.MatchTimeout):
+        purere.findall(r"(a|aa)+b", "a" * 300, max_steps=1000)
+
+
+def test_timeout():
+    pattern = purere.compile(r"(\w+\s?)+$")
+    with pytest.raises(purere.MatchTimeout) as info:
+        pattern.search("ab " * 3000 + "!", timeout=0.01)
+    assert info.value.steps > 0
+
+
+limited = [
+    (r"(\w+)@(\w+)", "a@b cc@dd @ e@"),
+    (r"x*", "axxb"),
+    (r"(?<=a)(b|c)", "abacad"),
+    (r"\d+", "12 345 6"),
+]
+
+
+@pytest.mark.parametrize("pattern,string", limited)
+def test_limited_equal(pattern, string):
+    # large limits do not change any results
+    pat = purere.compile(pattern)
+    for limits in [{"max_steps": 10**6}, {"timeout": 10.0}, {"timeout": 10.0, "max_steps": 10**6}]:
+        assert pat.findall(string, **limits) == pat.findall(string)
+        assert [m.regs for m in pat.finditer(string, **limits)] == [m.regs for m in pat.finditer(string)]
+        assert pat.split(string, **limits) == pat.split(string)
+        assert pat.subn("-", string, **limits) == pat.subn("-", string)
+        assert pat.search(string, 2, **limits).regs == pat.search(string, 2).regs
+        for end in range(len(string) + 1):
+            limited_match, match = pat.fullmatch(string, 0, end, **limits), pat.fullmatch(string, 0, end)
+            assert (limited_match and limited_match.regs) == (match and match.regs)
+        assert pat.scanner(string, **limits).search().regs == pat.scanner(string).search().regs
@@ -1,6 +1,10 @@
+import importlib
+import json
 import pytest
 import purere
 import re
+from purere import bundle
+from purere import topy
 from .re_tests import tests
 
 
@@ -43,3 +47,241 @@ def test_equal(test):
         assert reresult == purereresult
     else:
         assert reresult.regs == purereresult.regs
+
+
+# all patterns in one module, as written by the bundle command
+def bundled_tests():
+    patterns = {}
+    for i, test in enumerate(tests):
+        try:
+            re.compile(test[0])
+        except re.error:
+            continue
+        patterns[f"regex{i}"] = (test[0], 0)
+    return patterns
+
+
+def test_bundle():
+    patterns = bundled_tests()
+    res = {}
+    exec(bundle.bundle(patterns), res)
+    for name, (pattern, flags) in patterns.items():
+        s = tests[int(name[5:])][1]
+        reresult = re.search(pattern, s)
+        purereresult = res[name].search(s)
+        if reresult is None or purereresult is None:
+            assert reresult == purereresult
+        else:
+            assert reresult.regs == purereresult.regs
+
+
+def test_bundle_main(tmp_path, monkeypatch):
+    manifest = {
+        "word": r"\w+",
+        "mail": {"pattern": r"(\w+)@example\.com", "flags": ["IGNORECASE"]},
+        "charset": {"pattern": r"[ab]c", "bytes": True},
+    }
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    bundle.main([str(tmp_path / "manifest.json"), "-o", str(tmp_path / "bundled.py")])
+    monkeypatch.syspath_prepend(str(tmp_path))
+    bundled = importlib.import_module("bundled")
+    assert bundled.__all__ == ["word", "mail", "charset"]
+    assert bundled.mail.search("to: Joe@EXAMPLE.com").group(1) == "Joe"
+    assert bundled.charset.findall(b"xacbc") == [b"ac", b"bc"]
+    with pytest.raises(TypeError, match="bundled"):
+        bundled.word.search("abc", max_steps=10)
+    # same info as when compiling normally
+    for name, pattern, flags in [("mail", r"(\w+)@example\.com", purere.I), ("charset", rb"[ab]c", 0)]:
+        info = purere.compile(pattern, flags)._info
+        assert getattr(bundled, name)._info["fixed_prefix"] == info["fixed_prefix"]
+        assert (getattr(bundled, name)._info["prefix_checker"] is None) == (info["prefix_checker"] is None)
+
+    with pytest.raises(ValueError):
+        bundle.bundle({"Pattern": ("a", 0)})
+
+
+linear_patterns = [
+    (r"abc(\d+)", True),
+    (r"(\w+)@(\w+)\.com", True),
+    (r"(\w+)\d", False),
+    (r"(\d{4})-(\d\d)-(\d\d)", True),
+    (r"(?:ab){3}(c*)", True),
+    (r"x(.*)", True),
+    (r"(?s)x.{2,}", True),
+    (r"(a)(?(1)b|c)", True),
+    (r"(a)\1(b+)", True),
+    (r"a|bc", False),
+    (r"a(?=b)", False),
+    (r"a+?", False),
+]
+
+
+@pytest.mark.parametrize("pattern,linear", linear_patterns)
+def test_linear(pattern, linear):
+    # patterns without backtracking get a function without stack
+    info, code = purere.compiler.compile_regex(pattern, only_code=True)
+    assert ("stack" not in code) == linear
+    repat = re.compile(pattern)
+    purerepat = purere.compile(pattern)
+    text = "abc123 ab@cd.com aabbbb 2024-01-02 abababcc x12345678\nxy ac"
+    for args in [(text,), (text, 2), (text, 1, 30)]:
+        assert [m.regs for m in repat.finditer(*args)] == [m.regs for m in purerepat.finditer(*args)]
+    for s in ["abc12", "abababccc", "xabcdef", "aabbb", "ab"]:
+        for method in ["match", "fullmatch"]:
+            reres = getattr(repat, method)(s)
+            purereres = getattr(purerepat, method)(s)
+            assert (reres and reres.regs) == (purereres and purereres.regs)
+
+
+possessive_patterns = [
+    (r"(\d+)\s|q", True),
+    (r"([^,]*),|q", True),
+    (r"(?:[\w.]+)@x|q", True),
+    (r"\w+\b\s|q", True),
+    (r"(\d+)x+(\s+)(?:y|z)", True),
+    (r"(\w+)\d|q", False),
+    (r"(?i)(a+)A|q", False),
+    (r"(?i)(a+)\s|q", False),
+    (r"\w+(?=a)|\w+\B", False),
+    (r"(\d+)\w*b|q", False),
+    (r"(\d+)(?:a|1)", False),
+    (rb"(\d+)\s|q", True),
+]
+
+
+@pytest.mark.parametrize("pattern,possessive", possessive_patterns)
+def test_possessive(pattern, possessive):
+    # repeats that can not give back a character to what follows do not push their shorter versions
+    info, code = purere.compiler.compile_regex(pattern, only_code=True)
+    assert ("ABS_POSSESSIVE_REPEAT_ONE" in code) == possessive
+    repat = re.compile(pattern)
+    purerepat = purere.compile(pattern)
+    text = "abc123 1234 ab@cd.com a.b@x aaAB 12x  y 123a 1111 AAAb\n1 q"
+    if isinstance(pattern, bytes):
+        text = text.encode()
+    for args in [(text,), (text, 2), (text, 1, 32)]:
+        assert [m.regs for m in repat.finditer(*args)] == [m.regs for m in purerepat.finditer(*args)]
+        assert [m.regs for m in repat.finditer(*args)] == [
+            m.regs for m in purerepat.finditer(*args, max_steps=10**6)
+        ]
+    for s in [text[:4], text[7:12], text[-4:]]:
+        for method in ["match", "fullmatch"]:
+            reres = getattr(repat, method)(s)
+            purereres = getattr(purerepat, method)(s, max_steps=10**6)
+            assert (reres and reres.regs) == (purereres and purereres.regs)
+
+
+run_patterns = [
+    (r"([a-z]*)(\d)", "lstrip"),
+    (r"([a-z]*)([a-z])", "lstrip"),
+    (r'"([^"]*)"', "find"),
+    (r"([^,;]*)[,;]", "find"),
+    (r"(\w+)\s", "rest."),
+    (r"(\s*)(\w+)", "rest."),
+    (r"(\d*)(\d)", "rest."),
+    (r"(?a)(\w*)x", "lstrip"),
+    (r"(\S*)\s", None),
+    (r"(?i)(a*)b", None),
+]
+
+
+@pytest.mark.parametrize("pattern,method", run_patterns)
+def test_runs(pattern, method):
+    # long runs of a single character repeat are found with string methods instead of a loop
+    info, code = purere.compiler.compile_regex(pattern, only_code=True)
+    if method is None:
+        assert "rest" not in code and "find" not in code
+    else:
+        assert method in code
+    for text in ["abc" * 50 + '1, "' + "x" * 100 + '"; é\u0663\u0663' * 30 + "\u2003 " * 40 + "AAAb", "ab1 a"]:
+        for bpattern, btext in [(pattern, text), (pattern.encode(), text.encode())]:
+            purerepat = purere.compile(bpattern)
+            repat = re.compile(bpattern)
+            for args in [(btext,), (btext, 3), (btext, 1, 70), (btext, 20, 300)]:
+                assert [m.regs for m in repat.finditer(*args)] == [m.regs for m in purerepat.finditer(*args)]
+                assert [m.regs for m in repat.finditer(*args)] == [
+                    m.regs for m in purerepat.finditer(*args, max_steps=10**7)
+                ]
+            for name in ["match", "fullmatch"]:
+                reres = getattr(repat, name)(btext, 0, 60)
+                purereres = getattr(purerepat, name)(btext, 0, 60, max_steps=10**7)
+                assert (reres and reres.regs) == (purereres and purereres.regs)
+
+
+memo_patterns = [
+    (r"(a|b)*c", "bytearray"),
+    (r"(\w+)(?:\s\w+)*?x", "bytearray"),
+    (r"(a|b)+\1c", "set"),
+    (r"(?<=a)(b|c)+", "set"),
+    (r"(?:a|bc){30,40}?d", "set"),
+    (r"(a|b)(?:(\w|\s)*\2)", "set"),
+]
+
+
+@pytest.mark.parametrize("pattern,memo", memo_patterns)
+def test_memo(pattern, memo):
+    # the states that were visited are kept in a bytearray if possible, otherwise in a set of packed integers
+    info, code = purere.compiler.compile_regex(pattern, only_code=True)
+    assert f"done = [pos, {memo}()" in code
+    text = "abcbcbcbac aab bcbcbcbcbcbcbcbcbcbcbcbcbcbcbcbcbcbcbcbcbcbcbcbcbcd aa xbx x ab ba" * 3
+    for args in [(text,), (text, 2), (text, 1, 100)]:
+        assert [m.regs for m in re.compile(pattern).finditer(*args)] == [
+            m.regs for m in purere.compile(pattern).finditer(*args)
+        ]
+
+
+def test_forget_done():
+    done = [0, bytearray(range(1, 9)), 2, 0]
+    assert purere._forget_done(done, 1) is done
+    assert done[:2] == [1, bytearray(range(3, 9))]
+    purere._forget_done(done, 2, strict=True)
+    assert done[:2] == [2, bytearray([0, 0, 7, 8])]
+    # positions before the start of memo are not known
+    assert purere._forget_done(done, 1) is None
+
+    done = [0, {0, 1, 2, 3, 4, 5}, 2, 0]
+    purere._forget_done(done, 2)
+    # small sets are not rebuilt
+    assert done[1] == {0, 1, 2, 3, 4, 5}
+    purere._forget_done(done, 1, strict=True)
+    assert done[1] == {4, 5} and done[3] == 2
+
+
+def pattern_parts(pattern, monkeypatch):
+    # the parts that compile_regex hands to the code generator
+    captured = []
+    parts_to_py = topy.parts_to_py
+
+    def capture(parts, **kwargs):
+        captured.append(parts)
+        return parts_to_py(parts, **kwargs)
+
+    with monkeypatch.context() as m:
+        m.setattr(topy, "parts_to_py", capture)
+        purere.compiler.compile_regex(pattern, only_code=True)
+    return captured[0]
+
+
+def test_backtrack_targets(monkeypatch):
+    # only parts that can be popped from the stack are marked in done, not the parts where branches join again
+    # parts: 0 foo or branch to 1, 1 bar, 2 baz and the optional group or branch to 4, 3 end of the group, 4 x
+    parts = pattern_parts(r"(?:foo|bar)baz(\d+)?x", monkeypatch)
+    assert topy.backtrack_targets(parts) == {0, 1, 4}
+    pat = purere.compile(r"(?:foo|bar)baz(\d+)?x")
+    assert [m.span() for m in pat.finditer("foobazx barbaz12x barbaz1")] == [(0, 7), (8, 17)]
+
+    # parts: 0 the first iteration of the group, a or branch to 1, 1 aa, 2 end of the group,
+    # 3 start of the loop or branch to 6, 4 the second alternative in the loop, 5 end of the loop, 6 b
+    parts = pattern_parts(r"(a|aa)+b", monkeypatch)
+    assert topy.backtrack_targets(parts) == {0, 1, 4, 6}
+    # the start of the loop is marked as well, to end a loop whose body matched the empty string
+    assert topy.loop_exits(parts) == {3: 6}
+    assert topy.backtrack_targets(pattern_parts(r"a(?:b|c)d", monkeypatch)) == {0}
+
+    # every state is only tried once, so a nested quantifier does not take exponential time
+    visits = []
+    for n in [1000, 4000]:
+        pat = purere.compile(r"(a|aa)+b", purere.STATS)
+        assert pat.search("a" * n) is None
+        visits.append(sum(pat.stats().visits))
+    assert visits[1] < 8 * visits[0]